@@ -0,0 +1,379 @@
+"""Offline benchmark suite: every agent package against a scripted stand-in model.
+
+Each package's `root_agent` is loaded and every model in its tree (LlmAgents,
+the fan-out researchers, AgentTool sub-agents) is replaced by `ScriptedLlm`,
+which answers from a per-agent script of canned tool calls and text after
+`--latency-ms`. Tools, callbacks, caches and storage are the real ones,
+so the numbers isolate framework, tool and storage cost from Gemini latency.
+All storage paths point to a temporary directory.
+
+Per agent, `--runs` invocations (each a fresh session, after one warm-up
+run) report:
+- wall-time p50/p95/p99/mean and events per second
+- model_calls, model_ms (time inside the stand-in model) and other_ms
+  (wall minus model and tool time: framework, callbacks, session/storage work;
+  approximate where calls overlap, as in parallel_workflow's fan-out)
+- tools: calls, mean and total ms per tool (an AgentTool's time includes its
+  sub-agent's model calls)
+- allocations over `--alloc-runs` extra runs under tracemalloc: peak and
+  retained KiB per run, and the top allocation sites
+
+Output is one JSON line per agent; `--output` also writes the whole report
+(with Python/ADK versions, git commit and settings) for release-over-release
+comparison. mcp_generator needs its MCP server (Node.js + npm packages);
+`--mcp-server-command` points the pool at another stdio server, and the agent
+is reported as skipped when no server starts.
+
+Run (from the Agents folder):
+    python benchmarks/bench_agents.py
+    python benchmarks/bench_agents.py --agents my_agent,loop_workflow --runs 50 --latency-ms 100
+    python benchmarks/bench_agents.py --output bench_agents.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_TMP = tempfile.mkdtemp(prefix="bench_agents_")
+for _name, _value in {
+    "MEMORY_DB_DIR": _TMP,
+    "SESSION_STATE_DIR": os.path.join(_TMP, "session_state"),
+    "CURRENCY_RATE_CACHE": os.path.join(_TMP, "rates.json"),
+    "CURRENCY_RATE_SOURCE": "fixture",
+    "CHECKPOINT_DB": os.path.join(_TMP, "checkpoints.sqlite3"),
+    "MODEL_CACHE_PATH": os.path.join(_TMP, "model_cache.json"),
+    "MODEL_CACHE_TTL_SECONDS": "0",  # measure the uncached research path
+    "GOOGLE_API_KEY": "fake-key",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+from google.adk.models import BaseLlm, LlmResponse  # noqa: E402
+from google.adk.runners import InMemoryRunner  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from common.callbacks import add_callback  # noqa: E402
+
+AGENTS = [
+    "my_agent", "sequential_workflow", "parallel_workflow", "loop_workflow",
+    "currency_converter", "memory_demo", "session_demo", "mcp_generator",
+]
+USAGE = types.GenerateContentResponseUsageMetadata(
+    prompt_token_count=200, candidates_token_count=50, total_token_count=250)
+
+
+def call(name, **args):
+    return types.FunctionCall(name=name, args=args)
+
+
+def scenario(package, module, run):
+    """(user prompt, {agent name: steps}) for one run; a step is text or a list of calls."""
+    if package == "my_agent":
+        return "Sum 4, 8, 15 and 16, then multiply by 1.2", {
+            "math_chat_agent": [[call("evaluate_expressions", expressions=["sum([4, 8, 15, 16]) * 1.2"])], "52.2"],
+        }
+    if package == "sequential_workflow":
+        return f"Benefits of urban gardens (request {run})", {
+            "TopicExpander": ["- food access\n- cooler streets\n- community"],
+            "ResearchDraft": ["Urban gardens improve food access, cool streets and build community."],
+            "CritiqueImprove": ["Urban gardens improve food access, reduce heat and strengthen communities."],
+        }
+    if package == "parallel_workflow":
+        return "Topics: solar power, wind power, tidal power", {
+            "SynthesisAgent": ["# Report\n## Solar\n...\n## Wind\n...\n## Tidal\n...\nConclusion."],
+        }
+    if package == "loop_workflow":
+        return f"Write about coral reefs (request {run})", {
+            "InitialWriter": ["Coral reefs are marine ecosystems built by corals."],
+            "CriticAgent": ["- Mention why reefs matter.", module.COMPLETION_PHRASE],
+            "DocumentRefiner": ["Coral reefs, built by corals, shelter a quarter of marine species."],
+        }
+    if package == "currency_converter":
+        return "Convert 250 USD to EUR", {
+            "currency_converter_agent": [
+                [call("convert_currency", amount=250, from_currency="USD", to_currency="EUR")],
+                "250 USD is about 230 EUR.",
+            ],
+        }
+    if package == "memory_demo":
+        return f"Remember that my favourite fruit is mango ({run})", {
+            "memory_demo_agent": [
+                [call("save_memory", memory_key=f"favourite_fruit_{run}", memory_content="mango", category="preferences")],
+                [call("search_memories", query="favourite fruit")],
+                "Saved: your favourite fruit is mango.",
+            ],
+        }
+    if package == "session_demo":
+        return "My favourite colour is teal", {
+            "session_demo_agent": [
+                [call("save_user_preference", preference_key="favourite_colour", preference_value="teal")],
+                [call("get_user_preference", preference_key="favourite_colour")],
+                "Saved your favourite colour: teal.",
+            ],
+        }
+    if package == "mcp_generator":
+        return "Echo hello world, add 2 and 3, and make a tiny image", {
+            "mcp_generator_agent": [
+                [call("echo", text="hello world"), call("addNumbers", a=2, b=3)],
+                [call("getTinyImage")],
+                "Done: echoed text, 2 + 3 = 5 and a tiny image.",
+            ],
+        }
+    raise ValueError(f"unknown agent package: {package}")
+
+
+class ScriptedLlm(BaseLlm):
+    """Plays the agent's script turn by turn (text or function calls) after a fixed latency."""
+
+    agent_name: str = ""
+    latency_ms: float = 0.0
+    steps: list = []
+    turn: int = 0
+    recorder: object = None
+
+    async def generate_content_async(self, llm_request, stream=False):
+        start = time.perf_counter()
+        step = self.steps[self.turn] if self.turn < len(self.steps) else f"{self.agent_name}: done."
+        self.turn += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if isinstance(step, str):
+            parts = [types.Part(text=step)]
+        else:
+            parts = [types.Part(function_call=function_call) for function_call in step]
+        self.recorder.model_call(time.perf_counter() - start)
+        yield LlmResponse(content=types.Content(role="model", parts=parts), usage_metadata=USAGE)
+
+
+class Recorder:
+    """Per-run model and tool timings, fed by ScriptedLlm and tool callbacks."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.model_calls = 0
+        self.model_seconds = 0.0
+        self.tools = defaultdict(list)
+        self._started = {}
+
+    def model_call(self, seconds):
+        self.model_calls += 1
+        self.model_seconds += seconds
+
+    def before_tool(self, tool, args, tool_context):
+        self._started[tool_context.function_call_id] = time.perf_counter()
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        started = self._started.pop(tool_context.function_call_id, None)
+        if started is not None:
+            self.tools[tool.name].append(time.perf_counter() - started)
+        return None
+
+
+def walk(agent, seen=None):
+    """Every agent in the tree, including AgentTool sub-agents."""
+    seen = seen if seen is not None else set()
+    if id(agent) in seen:
+        return
+    seen.add(id(agent))
+    yield agent
+    for sub_agent in getattr(agent, "sub_agents", None) or []:
+        yield from walk(sub_agent, seen)
+    for tool in getattr(agent, "tools", None) or []:
+        if getattr(tool, "agent", None) is not None:
+            yield from walk(tool.agent, seen)
+
+
+def prepare(root_agent, recorder, latency_ms):
+    """Swap in scripted models and timing callbacks; returns the scripted models."""
+    models = []
+    for agent in walk(root_agent):
+        if not hasattr(agent, "model"):
+            continue
+        model = ScriptedLlm(model="gemini-2.0-flash", agent_name=agent.name, latency_ms=latency_ms, recorder=recorder)
+        agent.model = model
+        models.append(model)
+        if hasattr(agent, "before_tool_callback"):
+            # Last before-callback and first after-callback, so the window covers only the tool.
+            add_callback(agent, "before_tool_callback", recorder.before_tool)
+            add_callback(agent, "after_tool_callback", recorder.after_tool, first=True)
+    return models
+
+
+def script_models(models, script):
+    for model in models:
+        model.turn = 0
+        # Fan-out researchers share their parent's model and are not scripted: they answer with text.
+        model.steps = script.get(model.agent_name, [])
+
+
+async def run_once(runner, models, package, module, run):
+    prompt, script = scenario(package, module, run)
+    script_models(models, script)
+    session = await runner.session_service.create_session(app_name=package, user_id="bench")
+    message = types.Content(role="user", parts=[types.Part(text=prompt)])
+    events = 0
+    start = time.perf_counter()
+    async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+        events += 1
+    return time.perf_counter() - start, events
+
+
+def short_path(filename):
+    """site-packages/google/adk/x.py -> google/adk/x.py; repo files relative to Agents/."""
+    head, marker, tail = filename.rpartition("site-packages" + os.sep)
+    return tail if marker else os.path.relpath(filename)
+
+
+def percentile_ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 3)
+
+
+async def bench_agent(package, args):
+    module = importlib.import_module(f"{package}.agent")
+    if package == "mcp_generator":
+        if args.mcp_server_command:
+            command = shlex.split(args.mcp_server_command)
+            module.mcp_pool.server_params = module.StdioServerParameters(command=command[0], args=command[1:])
+        try:
+            await module.mcp_pool.warm()
+        except Exception as error:  # no Node.js / npm packages: report instead of failing the suite
+            await module.mcp_pool.close()
+            return {"agent": package, "status": "skipped", "error": f"MCP server did not start: {error!r}"}
+
+    recorder = Recorder()
+    models = prepare(module.root_agent, recorder, args.latency_ms)
+    runner = InMemoryRunner(agent=module.root_agent, app_name=package)
+    try:
+        first_run, _ = await run_once(runner, models, package, module, 0)
+
+        walls, event_counts, model_ms, other_ms, model_calls = [], [], [], [], []
+        tool_times = defaultdict(list)
+        for run in range(1, args.runs + 1):
+            recorder.reset()
+            wall, events = await run_once(runner, models, package, module, run)
+            tool_seconds = sum(sum(times) for times in recorder.tools.values())
+            walls.append(wall)
+            event_counts.append(events)
+            model_calls.append(recorder.model_calls)
+            model_ms.append(recorder.model_seconds * 1000)
+            other_ms.append(max(0.0, wall - recorder.model_seconds - tool_seconds) * 1000)
+            for name, times in recorder.tools.items():
+                tool_times[name].extend(times)
+
+        tracemalloc.start(25)
+        peaks, retained = [], []
+        before_snapshot = tracemalloc.take_snapshot()
+        for run in range(args.runs + 1, args.runs + 1 + args.alloc_runs):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await run_once(runner, models, package, module, run)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - baseline) / 1024)
+            retained.append((current - baseline) / 1024)
+        top = tracemalloc.take_snapshot().compare_to(before_snapshot, "lineno")[:args.top_allocations]
+        tracemalloc.stop()
+    finally:
+        if package == "mcp_generator":
+            await module.mcp_pool.close()
+
+    return {
+        "agent": package,
+        "status": "ok",
+        "runs": args.runs,
+        "latency_ms": {
+            "first_run": round(first_run * 1000, 3),
+            "p50": percentile_ms(walls, 50),
+            "p95": percentile_ms(walls, 95),
+            "p99": percentile_ms(walls, 99),
+            "mean": round(float(np.mean(walls)) * 1000, 3),
+        },
+        "events_per_run": round(float(np.mean(event_counts)), 2),
+        "events_per_s": round(sum(event_counts) / sum(walls), 1),
+        "model_calls_per_run": round(float(np.mean(model_calls)), 2),
+        "model_ms_mean": round(float(np.mean(model_ms)), 3),
+        "other_ms_mean": round(float(np.mean(other_ms)), 3),
+        "tools": {
+            name: {
+                "calls": len(times),
+                "mean_ms": round(float(np.mean(times)) * 1000, 3),
+                "total_ms": round(sum(times) * 1000, 3),
+            }
+            for name, times in sorted(tool_times.items())
+        },
+        "allocations": {
+            "runs": args.alloc_runs,
+            "peak_kib_per_run": round(float(np.mean(peaks)), 1) if peaks else None,
+            "retained_kib_per_run": round(float(np.mean(retained)), 1) if retained else None,
+            "top_sites": [
+                {"site": f"{short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                 "kib": round(stat.size_diff / 1024, 1), "blocks": stat.count_diff}
+                for stat in top
+            ],
+        },
+    }
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    try:
+        from google.adk import version as adk_version
+        adk = adk_version.__version__
+    except ImportError:
+        adk = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "adk": adk,
+        "platform": platform.platform(),
+        "settings": {"runs": args.runs, "latency_ms": args.latency_ms, "alloc_runs": args.alloc_runs},
+    }
+
+
+async def main_async(args):
+    results = []
+    for package in args.agents:
+        result = await bench_agent(package, args)
+        print(json.dumps(result), flush=True)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", default=",".join(AGENTS), help="comma-separated agent packages")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="stand-in model latency per call")
+    parser.add_argument("--alloc-runs", type=int, default=3, help="extra runs under tracemalloc")
+    parser.add_argument("--top-allocations", type=int, default=5)
+    parser.add_argument("--mcp-server-command", default=None, help="stdio MCP server for mcp_generator")
+    parser.add_argument("--output", default=None, help="also write the full JSON report here")
+    args = parser.parse_args()
+    args.agents = [name.strip() for name in args.agents.split(",") if name.strip()]
+
+    results = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump({"environment": environment(args), "agents": results}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Context-size benchmark: large MCP tool results inline vs offloaded as artifacts.
+
+One session runs `--turns` turns against mcp_generator's root agent with a
+fake model (no network). Each turn the model calls one tool and then answers;
+the tools return the same MCP-shaped results as simple_mcp_server.js:
+`getTinyImage` (the real ~33 KB base64 PNG) and `echo` of `--echo-bytes` of
+text, alternating. Modes:
+- inline: the previous behaviour, results go into the conversation as-is
+- offloaded: the agent's `ArtifactOffloader` (common/artifacts.py) stores
+  large payloads in the artifact service and leaves a short reference
+  (the echo call's own arguments stay in the conversation in both modes)
+
+Reported per mode:
+- prompt bytes sent to the model on the last turn and over all turns
+  (~4 bytes per token), and wall time
+- for offloaded: stores, dedup hits, hit_rate and bytes_saved
+
+Run (from the Agents folder):
+    python benchmarks/bench_artifacts.py
+    python benchmarks/bench_artifacts.py --turns 20 --echo-bytes 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MCP_POOL", "0")  # the tools below stand in for the MCP server
+
+from common.artifacts import ArtifactOffloader  # noqa: E402
+from mcp_generator import agent as mcp_generator  # noqa: E402
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(mcp_generator.__file__), "simple_mcp_server.js")
+TINY_IMAGE_BASE64 = re.search(r"TINY_IMAGE_BASE64 = '([^']+)'", open(SERVER_SCRIPT, encoding="utf-8").read()).group(1)
+USAGE = types.GenerateContentResponseUsageMetadata(
+    prompt_token_count=20, candidates_token_count=10, total_token_count=30)
+ECHO_TEXT = {"value": ""}
+
+
+def getTinyImage() -> dict:
+    """Generate a tiny sample image."""
+    return {"content": [
+        {"type": "text", "text": "This is a tiny image:"},
+        {"type": "image", "data": TINY_IMAGE_BASE64, "mimeType": "image/png"},
+        {"type": "text", "text": "The image above is the MCP tiny image."},
+    ]}
+
+
+def echo(text: str) -> dict:
+    """Echo back text."""
+    return {"content": [{"type": "text", "text": f"Echo: {text}"}]}
+
+
+class FakeLlm(BaseLlm):
+    """Calls the tool named in the user message, then answers; records prompt sizes."""
+
+    prompt_bytes: list = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.prompt_bytes.append(sum(len(content.model_dump_json(exclude_none=True)) for content in llm_request.contents))
+        last = llm_request.contents[-1]
+        if any(part.function_response for part in last.parts):
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="Done.")]), usage_metadata=USAGE)
+            return
+        name = last.parts[0].text
+        call = types.FunctionCall(name=name, args={"text": ECHO_TEXT["value"]} if name == "echo" else {})
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]), usage_metadata=USAGE)
+
+
+async def run(mode, args):
+    model = FakeLlm(model="gemini-2.0-flash", prompt_bytes=[])
+    offloader = ArtifactOffloader()
+    agent = mcp_generator.root_agent.model_copy(update={
+        "model": model,
+        "tools": [getTinyImage, echo],
+        "after_tool_callback": offloader.after_tool if mode == "offloaded" else None,
+    })
+    runner = InMemoryRunner(agent=agent, app_name="bench_artifacts")
+    session = await runner.session_service.create_session(app_name="bench_artifacts", user_id="bench")
+    start = time.perf_counter()
+    for turn in range(args.turns):
+        message = types.Content(role="user", parts=[types.Part(text="getTinyImage" if turn % 2 == 0 else "echo")])
+        async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+            pass
+    wall = time.perf_counter() - start
+    result = {
+        "mode": mode,
+        "turns": args.turns,
+        "last_turn_prompt_bytes": model.prompt_bytes[-1],
+        "total_prompt_bytes": sum(model.prompt_bytes),
+        "approx_total_prompt_tokens": sum(model.prompt_bytes) // 4,
+        "wall_ms": round(wall * 1000, 1),
+    }
+    if mode == "offloaded":
+        result["offloader"] = dict(offloader.stats, hit_rate=offloader.hit_rate())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--echo-bytes", type=int, default=20000)
+    args = parser.parse_args()
+    ECHO_TEXT["value"] = ("lorem ipsum " * (args.echo_bytes // 12 + 1))[:args.echo_bytes]
+
+    for mode in ("inline", "offloaded"):
+        print(json.dumps(asyncio.run(run(mode, args))))
+
+
+if __name__ == "__main__":
+    main()
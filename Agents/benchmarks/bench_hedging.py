@@ -0,0 +1,108 @@
+"""Tail-latency benchmark: plain model calls vs HedgedLlm on a heavy-tailed fake model.
+
+The fake model answers after a log-normal delay around `--median-ms`; a
+fraction of calls (`--slow-rate`) takes 5-10x longer, like the occasional slow
+Gemini call. The same request stream runs twice:
+- plain:  calls go straight to the fake model
+- hedged: calls go through `common.hedging.HedgedLlm` (p95 threshold, 10% budget)
+
+Reported per mode:
+- p50/p95/p99 latency in milliseconds and the p99 improvement over plain
+- model_calls_per_request: extra load caused by hedging
+- hedge_rate / hedge_wins / censored from HedgedLlm.stats(), and the hedge
+  delay it derived from the first attempts' latencies
+
+Run (from the Agents folder):
+    python benchmarks/bench_hedging.py
+    python benchmarks/bench_hedging.py --requests 2000 --concurrency 20 --slow-rate 0.03
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.hedging import HedgedLlm  # noqa: E402
+
+
+class HeavyTailLlm(BaseLlm):
+    """Fake model with log-normal latency and occasional 5-10x stragglers."""
+
+    median_ms: float = 200.0
+    slow_rate: float = 0.05
+    seed: int = 3
+    calls: int = 0
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self._rng = random.Random(self.seed)
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        delay = self.median_ms * self._rng.lognormvariate(0, 0.25)
+        if self._rng.random() < self.slow_rate:
+            delay *= self._rng.uniform(5, 10)
+        await asyncio.sleep(delay / 1000)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="summary")]))
+
+
+async def run(model, requests, concurrency):
+    limiter = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with limiter:
+            request = LlmRequest(model=model.model, contents=[
+                types.Content(role="user", parts=[types.Part(text="research")])])
+            start = time.perf_counter()
+            async for _ in model.generate_content_async(request):
+                pass
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--median-ms", type=float, default=200.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--percentile", type=float, default=95.0)
+    parser.add_argument("--budget", type=float, default=0.1)
+    args = parser.parse_args()
+
+    baseline_p99 = None
+    for mode in ("plain", "hedged"):
+        fake = HeavyTailLlm(model="gemini-2.0-flash", median_ms=args.median_ms, slow_rate=args.slow_rate)
+        model = fake if mode == "plain" else HedgedLlm.wrap(fake, percentile=args.percentile, budget=args.budget)
+        latencies = asyncio.run(run(model, args.requests, args.concurrency))
+        p99 = float(np.percentile(latencies, 99))
+        baseline_p99 = baseline_p99 or p99
+        result = {
+            "mode": mode,
+            "requests": args.requests,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+            "p99_ms": round(p99, 1),
+            "p99_improvement_pct": round(100 * (baseline_p99 - p99) / baseline_p99, 1),
+            "model_calls_per_request": round(fake.calls / args.requests, 3),
+        }
+        if mode == "hedged":
+            stats = model.stats()
+            result.update({key: stats[key] for key in (
+                "hedge_rate", "hedge_wins", "censored", "budget_denied", "hedge_delay_ms")})
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Round-trip benchmark: my_agent's scalar add/multiply tools vs evaluate_expressions.
+
+A fixed prompt set (sums, a dot product, a mean, a markup over a price list,
+a bracketed expression) runs through my_agent's root agent with a scripted
+fake model that sleeps `--model-latency-ms` per call (no network). The
+tools are the agent's real tools. Policies:
+- scalar: only add_numbers / multiply_numbers, the way the model had to work
+  before. Independent operations are issued as parallel calls in one turn;
+  dependent ones (a running sum) need one turn each.
+- batch: one evaluate_expressions call with the whole calculation.
+
+Reported per mode and per prompt:
+- model_turns (model calls), tool_calls, wall_ms
+- the final answers, which must match between the modes
+
+Run (from the Agents folder):
+    python benchmarks/bench_math_tools.py
+    python benchmarks/bench_math_tools.py --model-latency-ms 800
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_agent import agent as math_agent  # noqa: E402
+
+USAGE = types.GenerateContentResponseUsageMetadata(
+    prompt_token_count=20, candidates_token_count=10, total_token_count=30)
+NUMBERS_30 = [round(1.5 + index * 0.75, 2) for index in range(30)]
+NUMBERS_12 = [4, 8, 15, 16, 23, 42, 7, 9, 11, 3, 5, 21]
+VECTOR_A = [1, 2, 3, 4, 5, 6, 7, 8]
+VECTOR_B = [8, 7, 6, 5, 4, 3, 2, 1]
+PRICES = [19.99, 5.49, 120, 33.5, 8, 42.25, 15, 60, 2.75, 99.9]
+
+PROMPTS = {
+    "sum_then_scale": f"Sum these numbers then multiply by 1.2: {NUMBERS_30}",
+    "dot_product": f"Dot product of {VECTOR_A} and {VECTOR_B}",
+    "mean": f"Average of {NUMBERS_12}",
+    "markup": f"Add a 15% markup to each price: {PRICES}",
+    "bracketed": "(3 + 4) * (5 + 6)",
+}
+
+
+def add(a, b):
+    return types.FunctionCall(name="add_numbers", args={"a": a, "b": b})
+
+
+def mul(a, b):
+    return types.FunctionCall(name="multiply_numbers", args={"a": a, "b": b})
+
+
+def running_sum(values):
+    """Chained add_numbers calls; each needs the previous result."""
+    total = values[0]
+    for value in values[1:]:
+        (total,) = yield [add(total, value)]
+    return total
+
+
+def scalar_plan(name):
+    """Scalar-tool calls per turn; receives each turn's results, returns the answer."""
+    if name == "sum_then_scale":
+        total = yield from running_sum(NUMBERS_30)
+        (answer,) = yield [mul(total, 1.2)]
+    elif name == "dot_product":
+        products = yield [mul(a, b) for a, b in zip(VECTOR_A, VECTOR_B)]
+        answer = yield from running_sum(products)
+    elif name == "mean":
+        total = yield from running_sum(NUMBERS_12)
+        (answer,) = yield [mul(total, 1 / len(NUMBERS_12))]
+    elif name == "markup":
+        answer = yield [mul(price, 1.15) for price in PRICES]
+    else:
+        left, right = yield [add(3, 4), add(5, 6)]
+        (answer,) = yield [mul(left, right)]
+    return answer
+
+
+def batch_plan(name):
+    expression = {
+        "sum_then_scale": f"sum({NUMBERS_30}) * 1.2",
+        "dot_product": f"dot({VECTOR_A}, {VECTOR_B})",
+        "mean": f"mean({NUMBERS_12})",
+        "markup": f"{PRICES} * 1.15",
+        "bracketed": "(3 + 4) * (5 + 6)",
+    }[name]
+    (answer,) = yield [types.FunctionCall(name="evaluate_expressions", args={"expressions": [expression]})]
+    return answer
+
+
+def tool_result(response):
+    if "results" in response:
+        return response["results"][0]["result"]
+    return response["result"]
+
+
+def normalize(answer):
+    values = answer if isinstance(answer, list) else [answer]
+    return [round(float(value), 6) for value in values]
+
+
+class ScriptedLlm(BaseLlm):
+    """Plays one plan: sends its calls turn by turn, then answers with the result."""
+
+    latency_ms: float = 400.0
+    calls: int = 0
+    plan: object = None
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        await asyncio.sleep(self.latency_ms / 1000)
+        responses = [part.function_response.response for part in llm_request.contents[-1].parts
+                     if part.function_response]
+        try:
+            calls = self.plan.send([tool_result(response) for response in responses] if responses else None)
+        except StopIteration as done:
+            text = json.dumps(normalize(done.value))
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), usage_metadata=USAGE)
+            return
+        parts = [types.Part(function_call=call) for call in calls]
+        yield LlmResponse(content=types.Content(role="model", parts=parts), usage_metadata=USAGE)
+
+
+async def run(mode, args):
+    model = ScriptedLlm(model="gemini-2.0-flash", latency_ms=args.model_latency_ms)
+    runner = InMemoryRunner(agent=math_agent.root_agent.model_copy(update={"model": model}), app_name="bench_math")
+    prompts = {}
+    for name, prompt in PROMPTS.items():
+        model.calls = 0
+        model.plan = scalar_plan(name) if mode == "scalar" else batch_plan(name)
+        session = await runner.session_service.create_session(app_name="bench_math", user_id="bench")
+        tool_calls, answer = 0, None
+        start = time.perf_counter()
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        async for event in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+            tool_calls += len(event.get_function_calls())
+            if event.is_final_response() and event.content and event.content.parts:
+                answer = json.loads(event.content.parts[0].text)
+        prompts[name] = {
+            "model_turns": model.calls,
+            "tool_calls": tool_calls,
+            "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+            "answer": answer if len(answer) > 1 else answer[0],
+        }
+    return {
+        "mode": mode,
+        "model_turns": sum(result["model_turns"] for result in prompts.values()),
+        "tool_calls": sum(result["tool_calls"] for result in prompts.values()),
+        "wall_ms": round(sum(result["wall_ms"] for result in prompts.values()), 1),
+        "prompts": prompts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-latency-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    results = [asyncio.run(run(mode, args)) for mode in ("scalar", "batch")]
+    for result in results:
+        print(json.dumps(result))
+    scalar, batch = results
+    answers_match = all(scalar["prompts"][name]["answer"] == batch["prompts"][name]["answer"] for name in PROMPTS)
+    print(json.dumps({
+        "answers_match": answers_match,
+        "model_turns_saved": scalar["model_turns"] - batch["model_turns"],
+        "speedup": round(scalar["wall_ms"] / batch["wall_ms"], 2),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""MCP server benchmark: a new stdio server per session vs the warm McpServerPool.
+
+`--sessions` sessions each make `--calls` `echo` calls (`--concurrency`
+sessions at a time) against the MCP generator's server:
+- per_session: every session spawns its own server process, does the MCP
+  handshake and `tools/list`, calls, then shuts the process down (what a
+  cold `McpToolset` pays per session)
+- pooled: all sessions share one `McpServerPool` (mcp_generator/pool.py);
+  the pool is warmed once and the tool list comes from its cache
+
+Reported per mode:
+- first-call latency per session (session start -> first tool result), p50/p95
+- per-call latency of the remaining calls, p50/p95, and wall time
+- processes spawned; for pooled, the pool's stats (restarts, cache hits, ...)
+- pool warm-up time, paid once per process instead of once per session
+
+Run (from the Agents folder, needs Node.js and the server's npm packages):
+    python benchmarks/bench_mcp_pool.py
+    python benchmarks/bench_mcp_pool.py --sessions 50 --concurrency 10
+    python benchmarks/bench_mcp_pool.py --server-command "python my_server.py"  # any stdio MCP server with echo
+"""
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import sys
+import time
+
+import numpy as np
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_generator.pool import McpServerPool  # noqa: E402
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp_generator", "simple_mcp_server.js")
+
+
+async def per_session(params, calls):
+    start = time.perf_counter()
+    latencies = []
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            await session.list_tools()
+            for index in range(calls):
+                call_start = time.perf_counter()
+                await session.call_tool("echo", {"text": f"hello {index}"})
+                latencies.append(time.perf_counter() - (start if index == 0 else call_start))
+    return latencies
+
+
+async def pooled_session(pool, calls):
+    start = time.perf_counter()
+    latencies = []
+    await pool.list_tools()
+    for index in range(calls):
+        call_start = time.perf_counter()
+        await pool.call_tool("echo", {"text": f"hello {index}"})
+        latencies.append(time.perf_counter() - (start if index == 0 else call_start))
+    return latencies
+
+
+def percentiles(values):
+    values = np.asarray(values) * 1000
+    if not len(values):
+        return {}
+    return {"p50_ms": round(float(np.percentile(values, 50)), 1), "p95_ms": round(float(np.percentile(values, 95)), 1)}
+
+
+async def run(mode, params, args):
+    gate = asyncio.Semaphore(args.concurrency)
+    pool = McpServerPool(params, size=args.pool_size) if mode == "pooled" else None
+    warmup = 0.0
+    if pool:
+        warm_start = time.perf_counter()
+        await pool.warm()
+        warmup = time.perf_counter() - warm_start
+
+    async def session():
+        async with gate:
+            return await (pooled_session(pool, args.calls) if pool else per_session(params, args.calls))
+
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(session() for _ in range(args.sessions)))
+        wall = time.perf_counter() - start
+        stats = pool.stats() if pool else None
+    finally:
+        if pool:
+            await pool.close()
+    result = {
+        "mode": mode,
+        "sessions": args.sessions,
+        "processes_spawned": stats["process_starts"] if pool else args.sessions,
+        "first_call": percentiles([latencies[0] for latencies in results]),
+        "later_calls": percentiles([value for latencies in results for value in latencies[1:]]),
+        "wall_s": round(wall, 2),
+    }
+    if pool:
+        result["warmup_s"] = round(warmup, 2)
+        result["pool"] = stats
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=3, help="tool calls per session")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--server-command", default=f"node {shlex.quote(SCRIPT_PATH)}")
+    args = parser.parse_args()
+
+    command = shlex.split(args.server_command)
+    params = StdioServerParameters(command=command[0], args=command[1:])
+    for mode in ("per_session", "pooled"):
+        print(json.dumps(asyncio.run(run(mode, params, args))))
+
+
+if __name__ == "__main__":
+    main()
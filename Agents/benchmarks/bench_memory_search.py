@@ -0,0 +1,169 @@
+"""Recall/latency benchmark: semantic (ANN) memory search vs the original regex search.
+
+Builds a synthetic memory store, then for each size runs the same queries through:
+- regex:  `re.search(query, content)` over every memory (what TinyDB's
+          `Query().content.search(query)` does in the original `search_memories`)
+- exact:  brute-force cosine similarity over all embeddings
+- ann:    `SemanticIndex` (IVF centroids + exact re-rank)
+
+Queries are paraphrases of a target memory (different word forms / order), which
+is exactly where regex search needs several retries with different wordings.
+
+Reported per size:
+- hit@k:      fraction of queries whose target memory is returned (top-k for vectors)
+- ann_recall: overlap of the ANN top-k with the exact top-k
+- p50/p95 latency per query in milliseconds
+
+Run (from the Agents folder):
+    python benchmarks/bench_memory_search.py --sizes 10000,100000
+    python benchmarks/bench_memory_search.py --sizes 1000000 --dim 128 --queries 50
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_demo.vectors import HashingEmbedder, SemanticIndex  # noqa: E402
+
+SUBJECTS = ["guitar", "piano", "marathon", "sushi", "ramen", "python", "garden", "chess",
+            "hiking", "painting", "coffee", "yoga", "camera", "violin", "tennis", "cycling",
+            "baking", "poetry", "astronomy", "swimming", "kayak", "pottery", "salsa", "climbing"]
+VERBS = [("enjoys", "enjoying"), ("practices", "practicing"), ("loves", "loving"),
+         ("studies", "studying"), ("collects", "collecting"), ("teaches", "teaching")]
+TIMES = ["on weekends", "every morning", "after work", "during holidays", "twice a week",
+         "in the evening", "with friends", "since childhood"]
+PLACES = ["in Berlin", "at the park", "at home", "in the studio", "by the lake", "downtown",
+          "near the office", "at the club"]
+
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tor", "sa", "vel", "qui", "dan", "po", "zu", "fen",
+             "gri", "hal", "jor", "nex", "bri", "cal", "dor", "eth"]
+
+
+def make_vocabulary(size, rng):
+    """Real hobbies plus made-up topic words, so the store is not one dense cluster."""
+    words = set(SUBJECTS)
+    target = max(len(SUBJECTS), size // 20)
+    while len(words) < target:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_corpus(size, rng):
+    vocabulary = make_vocabulary(size, rng)
+    memories = []
+    for i in range(size):
+        subject = rng.choice(vocabulary)
+        verb = rng.choice(VERBS)
+        memories.append({
+            'key': f"memory_{i}",
+            'content': f"User {verb[0]} {subject} {rng.choice(TIMES)} {rng.choice(PLACES)} (note {i})",
+            'subject': subject,
+            'verb': verb,
+        })
+    return memories
+
+
+def make_query(memory, rng):
+    """Paraphrase: other verb form, plural subject, reordered, note id kept as anchor."""
+    content = memory['content']
+    note = re.search(r"note \d+", content).group(0)
+    when = next(t for t in TIMES if t in content)
+    where = next(p for p in PLACES if p in content)
+    parts = [f"{memory['verb'][1]} {memory['subject']}s", where, when, note]
+    rng.shuffle(parts)
+    return " ".join(parts)
+
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct)) * 1000.0 if values else 0.0
+
+
+def bench(size, args):
+    rng = random.Random(args.seed + size)
+    embedder = HashingEmbedder(dim=args.dim)
+    memories = make_corpus(size, rng)
+
+    started = time.perf_counter()
+    vectors = np.vstack([embedder.embed(f"{m['key'].replace('_', ' ')} {m['content']}") for m in memories])
+    embed_seconds = time.perf_counter() - started
+
+    index = SemanticIndex(dim=args.dim, n_probe=args.n_probe)
+    started = time.perf_counter()
+    keys = [m['key'] for m in memories]
+    for start in range(0, size, 10000):
+        index.add_many(keys[start:start + 10000], vectors[start:start + 10000])
+    index_seconds = time.perf_counter() - started
+
+    targets = rng.sample(memories, min(args.queries, size))
+    results = {"regex": [], "exact": [], "ann": []}
+    hits = {"regex": 0, "exact": 0, "ann": 0}
+    ann_overlap = 0.0
+
+    for target in targets:
+        query = make_query(target, rng)
+
+        started = time.perf_counter()
+        pattern = re.compile(query)
+        regex_hits = [m['key'] for m in memories if pattern.search(m['content'])]
+        results["regex"].append(time.perf_counter() - started)
+        hits["regex"] += target['key'] in regex_hits
+
+        query_vector = embedder.embed(query)
+        started = time.perf_counter()
+        exact = index.search(query_vector, k=args.k, exact=True)
+        results["exact"].append(time.perf_counter() - started)
+        exact_keys = {key for key, _ in exact}
+        hits["exact"] += target['key'] in exact_keys
+
+        started = time.perf_counter()
+        approx = index.search(query_vector, k=args.k)
+        results["ann"].append(time.perf_counter() - started)
+        approx_keys = {key for key, _ in approx}
+        hits["ann"] += target['key'] in approx_keys
+        ann_overlap += len(approx_keys & exact_keys) / max(len(exact_keys), 1)
+
+    n = len(targets)
+    return {
+        "size": size,
+        "dim": args.dim,
+        "queries": n,
+        "k": args.k,
+        "embed_seconds": round(embed_seconds, 2),
+        "index_build_seconds": round(index_seconds, 2),
+        "ann_recall_vs_exact": round(ann_overlap / n, 4),
+        "methods": {
+            name: {
+                "hit_at_k": round(hits[name] / n, 4),
+                "p50_ms": round(percentile(times, 50), 3),
+                "p95_ms": round(percentile(times, 95), 3),
+            }
+            for name, times in results.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="Comma-separated store sizes (e.g. 10000,100000,1000000)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--n-probe", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(json.dumps(bench(size, args)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
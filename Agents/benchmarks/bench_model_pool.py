@@ -0,0 +1,93 @@
+"""Connection-pool benchmark: one Gemini client per model object vs the shared registry.
+
+`--models` model objects (one per agent package by default) send `--rounds`
+rounds of `--concurrency` concurrent calls to a local fake Gemini server
+(fake_model_server.py):
+- per_instance: plain `Gemini(...)` objects, each with its own API client
+  and connection pool (the previous setup)
+- pooled: `common.models.get_model(...)`, all sharing one keep-alive pool
+
+Reported per mode:
+- tcp_connections opened (counted by the server) and connections per request
+- p50/p99 latency and wall time
+- for pooled: the registry's connection_reuse_rate and per-model peaks
+
+Run (from the Agents folder):
+    python benchmarks/bench_model_pool.py
+    python benchmarks/bench_model_pool.py --models 8 --concurrency 64 --rounds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+os.environ.setdefault("MODEL_RPM", "1000000")  # measure pooling, not the rate limiter
+
+from google.adk.models import LlmRequest  # noqa: E402
+from google.adk.models.google_llm import Gemini  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from common.models import get_model, registry  # noqa: E402
+from fake_model_server import start_server  # noqa: E402
+
+
+async def call(model):
+    request = LlmRequest(model=model.model, contents=[types.Content(role="user", parts=[types.Part(text="hi")])])
+    start = time.perf_counter()
+    async for _ in model.generate_content_async(request):
+        pass
+    return time.perf_counter() - start
+
+
+async def run(mode, args):
+    server = start_server(latency_ms=args.latency_ms)
+    try:
+        if mode == "pooled":
+            models = [get_model("gemini-2.0-flash", base_url=server.url) for _ in range(args.models)]
+        else:
+            models = [Gemini(model="gemini-2.0-flash", base_url=server.url) for _ in range(args.models)]
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            latencies += await asyncio.gather(*(call(models[i % len(models)]) for i in range(args.concurrency)))
+        wall = time.perf_counter() - start
+        latencies = np.asarray(latencies) * 1000
+        requests = server.counters["requests"]
+        result = {
+            "mode": mode,
+            "models": args.models,
+            "requests": requests,
+            "tcp_connections": server.counters["connections"],
+            "connections_per_request": round(server.counters["connections"] / requests, 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+            "wall_s": round(wall, 2),
+        }
+        if mode == "pooled":
+            result["registry"] = registry.stats()
+        return result
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    for mode in ("per_instance", "pooled"):
+        print(json.dumps(asyncio.run(run(mode, args))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Retry-storm benchmark: per-instance Gemini retries vs the shared ModelGuard.
+
+A local fake Gemini server (fake_model_server.py) enforces a quota of
+`--quota-per-second` requests and answers 429 + Retry-After above it. A burst
+of `--requests` concurrent calls is spread over three model instances (like
+the three Gemini objects of currency_converter):
+- legacy:  each instance retries on its own with the previous
+           HttpRetryOptions(attempts=5, exp_base=7, initial_delay=1)
+- guarded: GuardedLlm instances sharing one ModelGuard (token bucket at the
+           quota, jittered backoff, Retry-After pauses every caller)
+
+Then, for the guarded mode only, the server has an outage (all 503s) and
+`--outage-calls` calls show the circuit breaker failing fast.
+
+Reported per mode:
+- ok / failed calls, p50/p99 latency, wall time
+- upstream_requests and upstream_429s seen by the server (retry amplification)
+
+Run (from the Agents folder):
+    python benchmarks/bench_rate_limit.py
+    python benchmarks/bench_rate_limit.py --requests 100 --quota-per-second 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from google.adk.models import LlmRequest
+from google.adk.models.google_llm import Gemini
+from google.genai import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+
+from common.resilience import CircuitOpenError, GuardedLlm, ModelGuard, TokenBucket  # noqa: E402
+from fake_model_server import start_server  # noqa: E402
+
+LEGACY_RETRY = types.HttpRetryOptions(attempts=5, exp_base=7, initial_delay=1, http_status_codes=[429, 500, 503, 504])
+
+
+def build_models(mode, url, guard):
+    if mode == "legacy":
+        return [Gemini(model="gemini-2.0-flash", base_url=url, retry_options=LEGACY_RETRY) for _ in range(3)]
+    return [GuardedLlm.wrap(Gemini(model="gemini-2.0-flash", base_url=url), guard=guard) for _ in range(3)]
+
+
+async def call(model, timeout):
+    request = LlmRequest(model=model.model, contents=[types.Content(role="user", parts=[types.Part(text="hi")])])
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            async for _ in model.generate_content_async(request):
+                pass
+        return True, time.perf_counter() - start, None
+    except Exception as error:  # report, do not stop the burst
+        return False, time.perf_counter() - start, type(error).__name__
+
+
+async def burst(models, requests, timeout):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(models[index % len(models)], timeout) for index in range(requests)))
+    return results, time.perf_counter() - start
+
+
+def summarize(mode, results, wall, server, extra=None):
+    latencies = np.asarray([latency for _, latency, _ in results]) * 1000
+    errors = {}
+    for ok, _, error in results:
+        if not ok:
+            errors[error] = errors.get(error, 0) + 1
+    summary = {
+        "mode": mode,
+        "ok": sum(1 for ok, _, _ in results if ok),
+        "failed": len(results) - sum(1 for ok, _, _ in results if ok),
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+        "wall_s": round(wall, 2),
+        "upstream_requests": server.counters["requests"],
+        "upstream_429s": server.counters["rate_limited"],
+    }
+    summary.update(extra or {})
+    return summary
+
+
+async def run_mode(mode, args):
+    server = start_server(latency_ms=args.latency_ms, quota_per_second=args.quota_per_second)
+    # Burst of one second's quota, then the steady quota rate.
+    guard = ModelGuard(failure_threshold=5, reset_seconds=5)
+    guard.requests = TokenBucket(args.quota_per_second * 60, burst=args.quota_per_second)
+    models = build_models(mode, server.url, guard)
+    try:
+        results, wall = await burst(models, args.requests, args.call_timeout)
+        summaries = [summarize(mode, results, wall, server, {"guard": guard.stats()} if mode == "guarded" else None)]
+        if mode == "guarded":
+            server.outage_until = time.monotonic() + 60
+            before = server.counters["requests"]
+            results, wall = await burst(models, args.outage_calls, args.call_timeout)
+            outage = summarize("guarded_outage", results, wall, server, {"guard": guard.stats()})
+            outage["upstream_requests"] = server.counters["requests"] - before
+            outage["fail_fast"] = sum(1 for _, _, error in results if error == CircuitOpenError.__name__)
+            summaries.append(outage)
+        return summaries
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--quota-per-second", type=float, default=10.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--call-timeout", type=float, default=30.0, help="give up on a call after this long")
+    parser.add_argument("--outage-calls", type=int, default=20)
+    args = parser.parse_args()
+
+    for mode in ("legacy", "guarded"):
+        for summary in asyncio.run(run_mode(mode, args)):
+            print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Coalescing benchmark: concurrent identical rate lookups through currency_converter.
+
+N sessions ask for the same currency pair at the same moment. The root agent
+and `currency_fetcher_agent` are driven by fake models (no network): the root
+model calls the fetcher tool with the pair, the fetcher model answers after
+`--fetch-ms` with the rate JSON. The run is repeated with a plain `AgentTool`
+and with the `SingleFlightAgentTool` used by the agent.
+
+Reported per mode:
+- fetcher_calls: upstream (search-backed) model calls actually made
+- coalesced: calls that shared another session's in-flight lookup
+- wall_ms for all sessions
+
+Run (from the Agents folder):
+    python benchmarks/bench_single_flight.py
+    python benchmarks/bench_single_flight.py --sessions 200 --pairs 3 --fetch-ms 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import AgentTool
+from google.genai import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CURRENCY_RATE_CACHE", os.path.join(tempfile.mkdtemp(), "rates.json"))
+
+from currency_converter import agent as currency  # noqa: E402
+
+USAGE = types.GenerateContentResponseUsageMetadata(
+    prompt_token_count=20, candidates_token_count=10, total_token_count=30)
+PAIRS = [("USD", "EUR"), ("USD", "GBP"), ("EUR", "JPY"), ("GBP", "INR"), ("USD", "LKR")]
+
+
+class FakeRootLlm(BaseLlm):
+    """Calls the fetcher tool once for the pair in the user message, then answers."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        last = llm_request.contents[-1]
+        if any(part.function_response for part in last.parts):
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="done")]), usage_metadata=USAGE)
+            return
+        call = types.FunctionCall(name=currency.currency_agent.name, args={"request": last.parts[0].text})
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]), usage_metadata=USAGE)
+
+
+class FakeFetcherLlm(BaseLlm):
+    """Answers a rate request after a fixed delay, like a search-backed call."""
+
+    fetch_ms: float = 200.0
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        await asyncio.sleep(self.fetch_ms / 1000)
+        text = llm_request.contents[-1].parts[0].text
+        base, target = text.split()[0], text.split()[2]
+        answer = json.dumps({"base_currency": base, "target_currency": target, "exchange_rate": 1.5})
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer)]), usage_metadata=USAGE)
+
+
+async def run(mode, sessions, pairs, fetch_ms):
+    fetcher_model = FakeFetcherLlm(model="gemini-2.0-flash", fetch_ms=fetch_ms)
+    fetcher = currency.currency_agent.model_copy(update={"model": fetcher_model, "parent_agent": None})
+    if mode == "single_flight":
+        tool = currency.SingleFlightAgentTool(agent=fetcher, key_fn=currency.rate_request_key)
+    else:
+        tool = AgentTool(agent=fetcher)
+    root = currency.root_agent.model_copy(
+        update={"model": FakeRootLlm(model="gemini-2.0-flash"), "tools": [tool], "after_tool_callback": None}
+    )
+    runner = InMemoryRunner(agent=root, app_name="bench_single_flight")
+
+    async def one(index):
+        base, target = PAIRS[index % pairs]
+        session = await runner.session_service.create_session(app_name="bench_single_flight", user_id=f"u{index}")
+        message = types.Content(role="user", parts=[types.Part(text=f"{base} to {target} exchange rate")])
+        async for _ in runner.run_async(user_id=f"u{index}", session_id=session.id, new_message=message):
+            pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(sessions)))
+    result = {
+        "mode": mode,
+        "sessions": sessions,
+        "pairs": pairs,
+        "fetcher_calls": fetcher_model.calls,
+        "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    if mode == "single_flight":
+        result.update(tool.flight.stats, coalesce_rate=tool.flight.coalesce_rate())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--pairs", type=int, default=1, choices=range(1, len(PAIRS) + 1))
+    parser.add_argument("--fetch-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    for mode in ("agent_tool", "single_flight"):
+        print(json.dumps(asyncio.run(run(mode, args.sessions, args.pairs, args.fetch_ms))))
+
+
+if __name__ == "__main__":
+    main()
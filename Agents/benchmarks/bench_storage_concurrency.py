@@ -0,0 +1,156 @@
+"""Concurrency benchmark: blocking storage tools vs their async (executor) variants.
+
+Simulates N concurrent sessions on one event loop, the way `adk api_server`
+runs them. Every session is an asyncio task issuing a mix of memory_demo and
+session_demo tool calls (save / search / semantic search / get / preferences):
+
+- sync:  the plain tool functions called directly on the event loop (what ADK
+         did before the tools were wrapped)
+- async: the `read_tool` / `write_tool` variants from `common.storage_executor`
+
+Reported per mode and session count:
+- ops_per_s:    tool calls completed per second across all sessions
+- p50/p95/p99:  per-call latency in milliseconds
+- loop_lag_ms:  worst and p95 delay of a 1 ms heartbeat task; this is how long
+                every other request on the server was stalled
+
+The stores are created in a temporary directory (MEMORY_DB_DIR /
+SESSION_STATE_DIR), so the agents' real data files are not touched.
+
+Run (from the Agents folder):
+    python benchmarks/bench_storage_concurrency.py
+    python benchmarks/bench_storage_concurrency.py --sessions 1,10,50,100 --ops 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ["guitar", "piano", "marathon", "sushi", "ramen", "python", "garden", "chess",
+         "hiking", "painting", "coffee", "yoga", "camera", "violin", "tennis", "cycling"]
+
+
+def make_context(user_id, session_id):
+    """Minimal stand-in for ADK's ToolContext (only what the tools read)."""
+    return SimpleNamespace(
+        state={},
+        session=SimpleNamespace(user_id=user_id, id=session_id),
+    )
+
+
+def build_tools(memory_agent, session_agent, mode):
+    from common.storage_executor import read_tool, write_tool
+
+    tools = {
+        "save_memory": (memory_agent.save_memory, "write"),
+        "search_memories": (memory_agent.search_memories, "read"),
+        "semantic_search_memories": (memory_agent.semantic_search_memories, "read"),
+        "get_memory_by_key": (memory_agent.get_memory_by_key, "read"),
+        "save_user_preference": (session_agent.save_user_preference, "write"),
+        "get_user_preference": (session_agent.get_user_preference, "read"),
+        "list_all_preferences": (session_agent.list_all_preferences, "read"),
+    }
+    if mode == "sync":
+        return {name: fn for name, (fn, _) in tools.items()}
+    return {name: (write_tool(fn) if kind == "write" else read_tool(fn)) for name, (fn, kind) in tools.items()}
+
+
+async def call(tool, *args):
+    result = tool(*args)
+    if asyncio.iscoroutine(result):
+        result = await result
+    return result
+
+
+async def run_session(tools, session_index, ops, rng, latencies):
+    ctx = make_context(f"user{session_index % 10}", f"session{session_index}")
+    for op in range(ops):
+        word = rng.choice(WORDS)
+        key = f"s{session_index}-{op % 8}"
+        roll = rng.random()
+        start = time.perf_counter()
+        if roll < 0.2:
+            await call(tools["save_memory"], ctx, key, f"User enjoys {word} {rng.choice(WORDS)}", "hobbies")
+        elif roll < 0.35:
+            await call(tools["save_user_preference"], ctx, f"pref{op % 4}", word)
+        elif roll < 0.5:
+            await call(tools["search_memories"], ctx, word)
+        elif roll < 0.65:
+            await call(tools["semantic_search_memories"], ctx, f"likes {word}")
+        elif roll < 0.8:
+            await call(tools["get_memory_by_key"], ctx, key)
+        elif roll < 0.9:
+            await call(tools["get_user_preference"], ctx, f"pref{op % 4}")
+        else:
+            await call(tools["list_all_preferences"], ctx)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def heartbeat(lags, stop):
+    """Sleep 1 ms at a time and record how late each wake-up is."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((time.perf_counter() - start) * 1000 - 1.0)
+
+
+async def run(tools, sessions, ops, seed):
+    rng = random.Random(seed)
+    latencies, lags = [], []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(tools, index, ops, random.Random(rng.random()), latencies) for index in range(sessions)
+    ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    lat = np.asarray(latencies)
+    lag = np.asarray(lags or [0.0])
+    return {
+        "ops": len(latencies),
+        "ops_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "p95_ms": round(float(np.percentile(lat, 95)), 2),
+        "p99_ms": round(float(np.percentile(lat, 99)), 2),
+        "loop_lag_p95_ms": round(float(np.percentile(lag, 95)), 2),
+        "loop_lag_max_ms": round(float(lag.max()), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,10,50,100", help="comma-separated concurrent session counts")
+    parser.add_argument("--ops", type=int, default=20, help="tool calls per session")
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--backend", default=os.environ.get("MEMORY_BACKEND", "sqlite"), help="sqlite or tinydb")
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-storage-") as root:
+        # The agent modules open their stores at import time.
+        os.environ["MEMORY_DB_DIR"] = root
+        os.environ["SESSION_STATE_DIR"] = os.path.join(root, "session_state")
+        os.environ["MEMORY_BACKEND"] = args.backend
+        from memory_demo import agent as memory_agent
+        from session_demo import agent as session_agent
+
+        for sessions in [int(value) for value in args.sessions.split(",")]:
+            for mode in args.modes.split(","):
+                tools = build_tools(memory_agent, session_agent, mode)
+                result = asyncio.run(run(tools, sessions, args.ops, args.seed))
+                print(json.dumps({"mode": mode, "backend": args.backend, "sessions": sessions, **result}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Overhead benchmark: common/tracing.py on vs off, on the offline agent suite.
+
+Uses bench_agents.py's setup (scripted stand-in models, real tools, callbacks
+and storage in a temporary directory). Per agent the tree is prepared once
+and `--runs` pairs of invocations run with tracing off and on, in random
+order within each pair (after one warm-up pair), so both sides see the same
+caches, storage size and machine noise. "Off" runs the bare root agent (no
+plugin: an uninstrumented tree), "on" runs the package's `app` with the tracer
+plugin, so the difference also covers ADK dispatching the plugin callbacks,
+not only the tracer's own work. The acceptance bar is an overall overhead
+below 1%.
+Tracing runs with its exports enabled: OTLP/JSON files in a temporary
+directory and the Prometheus endpoint on a free port (scraped once at the end).
+
+Reported per agent:
+- mean and p50 wall ms with tracing off and on, and the overhead in percent
+  on both (p50 is the steadier one: GC pauses land on either side)
+- spans recorded per run
+
+Run (from the Agents folder):
+    python benchmarks/bench_tracing.py
+    python benchmarks/bench_tracing.py --agents my_agent,parallel_workflow --runs 400 --latency-ms 5
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_agents  # noqa: E402  (sets the temporary storage paths before the agents load)
+from google.adk.runners import InMemoryRunner  # noqa: E402
+
+from common.tracing import tracer  # noqa: E402
+
+AGENTS = [name for name in bench_agents.AGENTS if name != "mcp_generator"]
+
+
+async def bench(package, args):
+    module = importlib.import_module(f"{package}.agent")
+    models = bench_agents.prepare(module.root_agent, bench_agents.Recorder(), args.latency_ms)
+    runners = {False: InMemoryRunner(agent=module.root_agent, app_name=package), True: InMemoryRunner(app=module.app)}
+    rng = random.Random(args.seed)
+    walls = {False: [], True: []}
+    spans_before = tracer.stats["spans"]
+    for pair in range(args.runs + 1):
+        for index, enabled in enumerate(rng.sample([False, True], 2)):
+            wall, _ = await bench_agents.run_once(runners[enabled], models, package, module, 2 * pair + index)
+            if pair:
+                walls[enabled].append(wall)
+    summary = {}
+    for name, statistic in (("mean", np.mean), ("p50", np.median)):
+        off, on = float(statistic(walls[False])), float(statistic(walls[True]))
+        summary[name] = {"off_ms": round(off * 1000, 3), "on_ms": round(on * 1000, 3),
+                         "overhead_pct": round((on - off) / off * 100, 2)}
+    return {
+        "agent": package,
+        "runs": args.runs,
+        **summary,
+        "spans_per_run": round((tracer.stats["spans"] - spans_before) / (args.runs + 1), 1),
+    }
+
+
+async def main_async(args):
+    results = []
+    for package in args.agents:
+        result = await bench(package, args)
+        print(json.dumps(result), flush=True)
+        results.append(result)
+    overall = {}
+    for name in ("mean", "p50"):
+        off = sum(result[name]["off_ms"] for result in results)
+        on = sum(result[name]["on_ms"] for result in results)
+        overall[f"overall_{name}_overhead_pct"] = round((on - off) / off * 100, 2)
+    metrics = httpx.get(f"http://127.0.0.1:{tracer.metrics_port}/metrics").text
+    print(json.dumps({
+        **overall,
+        "traces": tracer.stats["traces"],
+        "metrics_lines": len(metrics.splitlines()),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", default=",".join(AGENTS), help="comma-separated agent packages")
+    parser.add_argument("--runs", type=int, default=200, help="runs per side")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="stand-in model latency per call")
+    args = parser.parse_args()
+    args.agents = [name.strip() for name in args.agents.split(",") if name.strip()]
+
+    tracer.export_dir = tempfile.mkdtemp(prefix="bench_tracing_")
+    tracer.metrics_port = "0"
+    tracer.start_exports()
+    tracer.metrics_port = str(tracer._metrics_server.server_address[1])
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
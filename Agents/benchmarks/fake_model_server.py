@@ -0,0 +1,169 @@
+"""Local stand-in for the Gemini REST API, for offline load and failure tests.
+
+Serves `POST /v1beta/models/<model>:generateContent` with a canned answer
+after `--latency-ms`, and misbehaves on purpose:
+- `--quota-per-second`: requests over this rate (1 s sliding window) get a
+  429 RESOURCE_EXHAUSTED with a Retry-After header and a RetryInfo body, like
+  the real API when a quota is exceeded
+- `--error-rate`: that fraction of requests gets a 503 UNAVAILABLE
+- `POST /admin/outage?seconds=N`: every request gets a 503 for N seconds
+- `GET /stats`: TCP connection, request, 429 and 503 counts as JSON
+
+Point a model at it with `Gemini(model=..., base_url="http://127.0.0.1:8765")`,
+or all agents with MODEL_BASE_URL=http://127.0.0.1:8765 (see common/models.py);
+any GOOGLE_API_KEY value works. Benchmarks start it in-process with
+`start_server()`.
+
+Run standalone (from the Agents folder):
+    python benchmarks/fake_model_server.py --port 8765 --quota-per-second 10
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeModelServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency_ms: float = 50.0,
+                 quota_per_second: Optional[float] = None, error_rate: float = 0.0,
+                 retry_after: float = 1.0, reply: str = "OK"):
+        super().__init__(address, _Handler)
+        self.latency_ms = latency_ms
+        self.quota_per_second = quota_per_second
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.reply = reply
+        self.outage_until = 0.0
+        self._window: deque = deque()
+        self._lock = threading.Lock()
+        self._rng = random.Random(7)
+        self.counters: Dict[str, int] = {"connections": 0, "requests": 0, "ok": 0, "rate_limited": 0, "unavailable": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def decide(self) -> int:
+        """HTTP status for the next request."""
+        with self._lock:
+            now = time.monotonic()
+            self.counters["requests"] += 1
+            if now < self.outage_until or self._rng.random() < self.error_rate:
+                self.counters["unavailable"] += 1
+                return 503
+            if self.quota_per_second is not None:
+                while self._window and now - self._window[0] >= 1.0:
+                    self._window.popleft()
+                if len(self._window) >= self.quota_per_second:
+                    self.counters["rate_limited"] += 1
+                    return 429
+                self._window.append(now)
+            self.counters["ok"] += 1
+            return 200
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeModelServer
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server._lock:
+            self.server.counters["connections"] += 1
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path == "/stats":
+            self._send(200, dict(self.server.counters))
+        else:
+            self._send(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        url = urlparse(self.path)
+        if url.path == "/admin/outage":
+            seconds = float(parse_qs(url.query).get("seconds", ["10"])[0])
+            self.server.outage_until = time.monotonic() + seconds
+            self._send(200, {"outage_seconds": seconds})
+            return
+        if not url.path.endswith(":generateContent"):
+            self._send(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+            return
+
+        status = self.server.decide()
+        if status == 429:
+            retry_after = self.server.retry_after
+            self._send(429, {"error": {
+                "code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                "status": "RESOURCE_EXHAUSTED",
+                "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{retry_after:g}s"}],
+            }}, headers={"Retry-After": f"{retry_after:g}"})
+            return
+        if status == 503:
+            self._send(503, {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}})
+            return
+
+        time.sleep(self.server.latency_ms / 1000)
+        prompt_chars = sum(len(part.get("text", "")) for content in request.get("contents", [])
+                           for part in content.get("parts", []))
+        prompt_tokens = max(1, prompt_chars // 4)
+        self._send(200, {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": self.server.reply}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": 2,
+                "totalTokenCount": prompt_tokens + 2,
+            },
+        })
+
+
+def start_server(port: int = 0, **kwargs: Any) -> FakeModelServer:
+    """Start a FakeModelServer on a background thread (port 0 = any free port)."""
+    server = FakeModelServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--quota-per-second", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = FakeModelServer(("127.0.0.1", args.port), latency_ms=args.latency_ms,
+                             quota_per_second=args.quota_per_second, error_rate=args.error_rate,
+                             retry_after=args.retry_after)
+    print(f"Fake model server on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""Load generator and session replay for `adk api_server`.
+
+Sessions are transcripts: an app name plus the user messages of each turn.
+They come from a running server (`record`), from the built-in synthetic set
+(`synthetic`, one short conversation per deployed app), or from a JSONL file
+with lines like {"app": "my_agent", "turns": ["hi", "add 2 and 3"]}.
+
+`replay` sends them to the server: each session is created with
+POST /apps/{app}/users/{user}/sessions and its turns are posted one after
+another to /run_sse. Load shapes:
+- closed loop: `--concurrency` sessions in flight for `--duration` seconds
+- open loop: `--rate` new sessions per second (Poisson arrivals), capped at
+  `--concurrency` in flight; `--rates 1,2,4,8` steps through several rates
+  (`--duration` seconds each) to find the saturation point
+
+Per app and overall it reports: sessions and turns completed, throughput
+(turns/s), turn latency p50/p95/p99, time to first event (first SSE `data:`
+line) p50/p95/p99, and the error rate with error kinds (HTTP status, SSE
+error payloads, timeouts, connection errors). In step mode a rate is marked
+saturated when the achieved session rate falls below 90% of the offered rate,
+or errors exceed 1%.
+
+`--start-server` runs the whole thing offline: it starts the local fake
+Gemini endpoint (fake_model_server.py) and an `adk api_server` subprocess
+whose agents talk to it through MODEL_BASE_URL (common/models.py). The server
+runs on a temporary copy of the replayed apps (and common/), so the sessions,
+memories, caches and `.adk/` files written during the run never land in the
+working tree; the copy is deleted afterwards.
+
+Run (from the Agents folder):
+    python benchmarks/load_api_server.py record --url http://127.0.0.1:8080 --out sessions.jsonl
+    python benchmarks/load_api_server.py replay --start-server --concurrency 16 --duration 30
+    python benchmarks/load_api_server.py replay --url http://127.0.0.1:8080 --sessions sessions.jsonl --rates 1,2,4,8,16
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Apps packaged by Agents/Dockerfile, plus the other local agents.
+SYNTHETIC_SESSIONS = [
+    {"app": "my_agent", "turns": ["Hi there!", "What is 12.5 * 4?", "Now add 7 to that."]},
+    {"app": "sequential_workflow", "turns": ["Benefits of community gardens"]},
+    {"app": "parallel_workflow", "turns": ["Topics: solar power, wind power, tidal power"]},
+    {"app": "loop_workflow", "turns": ["Write a short overview of coral reefs"]},
+    {"app": "currency_converter", "turns": ["Convert 250 USD to EUR"]},
+    {"app": "memory_demo", "turns": ["Remember that my favourite fruit is mango", "What do you remember about me?"]},
+    {"app": "session_demo", "turns": ["My favourite colour is teal", "What is my favourite colour?"]},
+]
+DEFAULT_APPS = "my_agent,sequential_workflow,parallel_workflow,loop_workflow"
+
+
+# ============================================================================
+# Transcripts
+# ============================================================================
+
+def load_sessions(path, apps):
+    if path:
+        with open(path, encoding="utf-8") as handle:
+            sessions = [json.loads(line) for line in handle if line.strip()]
+    else:
+        sessions = SYNTHETIC_SESSIONS
+    sessions = [session for session in sessions if not apps or session["app"] in apps]
+    if not sessions:
+        raise SystemExit("no sessions to replay for the selected apps")
+    return sessions
+
+
+async def record(args):
+    """Save the user turns of the server's existing sessions as replayable transcripts."""
+    written = 0
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        apps = args.apps or (await client.get("/list-apps")).json()
+        with open(args.out, "w", encoding="utf-8") as out:
+            for app in apps:
+                listing = await client.get(f"/apps/{app}/users/{args.user}/sessions")
+                if listing.status_code != 200:
+                    continue
+                for summary in listing.json():
+                    session = (await client.get(f"/apps/{app}/users/{args.user}/sessions/{summary['id']}")).json()
+                    turns = [
+                        "".join(part.get("text") or "" for part in (event.get("content") or {}).get("parts") or [])
+                        for event in session.get("events") or []
+                        if event.get("author") == "user"
+                    ]
+                    turns = [turn for turn in turns if turn]
+                    if turns:
+                        out.write(json.dumps({"app": app, "turns": turns}) + "\n")
+                        written += 1
+    print(json.dumps({"recorded_sessions": written, "out": args.out}))
+
+
+# ============================================================================
+# Replay
+# ============================================================================
+
+class Stats:
+    """Turn-level results per app."""
+
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.first_event = defaultdict(list)
+        self.sessions = defaultdict(int)
+        self.turns = defaultdict(int)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def error(self, app, kind):
+        self.errors[app][kind] += 1
+
+    def summary(self, app, elapsed):
+        latency = self.latency[app]
+        errors = sum(self.errors[app].values())
+        attempted = self.turns[app] + errors
+        return {
+            "app": app,
+            "sessions": self.sessions[app],
+            "turns": self.turns[app],
+            "throughput_turns_s": round(self.turns[app] / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": percentiles(latency),
+            "time_to_first_event_ms": percentiles(self.first_event[app]),
+            "error_rate": round(errors / attempted, 4) if attempted else 0.0,
+            "errors": dict(self.errors[app]),
+        }
+
+    def merged(self):
+        merged = Stats()
+        for app in set(self.turns) | set(self.errors) | set(self.sessions):
+            merged.latency["all"] += self.latency[app]
+            merged.first_event["all"] += self.first_event[app]
+            merged.sessions["all"] += self.sessions[app]
+            merged.turns["all"] += self.turns[app]
+            for kind, count in self.errors[app].items():
+                merged.errors["all"][kind] += count
+        return merged
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = np.asarray(values) * 1000
+    return {f"p{q}": round(float(np.percentile(values, q)), 1) for q in (50, 95, 99)}
+
+
+async def run_turn(client, stats, app, user, session_id, text, timeout):
+    body = {
+        "appName": app,
+        "userId": user,
+        "sessionId": session_id,
+        "newMessage": {"role": "user", "parts": [{"text": text}]},
+        "streaming": False,
+    }
+    start = time.perf_counter()
+    first_event = None
+    try:
+        async with asyncio.timeout(timeout):
+            async with client.stream("POST", "/run_sse", json=body) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    stats.error(app, f"http_{response.status_code}")
+                    return False
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    if first_event is None:
+                        first_event = time.perf_counter() - start
+                    if '"error"' in line and "error" in json.loads(line[5:]):
+                        stats.error(app, "sse_error")
+                        return False
+    except TimeoutError:
+        stats.error(app, "timeout")
+        return False
+    except httpx.HTTPError as error:
+        stats.error(app, type(error).__name__)
+        return False
+    if first_event is None:
+        stats.error(app, "no_events")
+        return False
+    stats.latency[app].append(time.perf_counter() - start)
+    stats.first_event[app].append(first_event)
+    stats.turns[app] += 1
+    return True
+
+
+async def run_session(client, stats, transcript, args):
+    app, user = transcript["app"], f"load-{uuid.uuid4().hex[:8]}"
+    try:
+        response = await client.post(f"/apps/{app}/users/{user}/sessions", json={})
+    except httpx.HTTPError as error:
+        stats.error(app, type(error).__name__)
+        return
+    if response.status_code != 200:
+        stats.error(app, f"create_http_{response.status_code}")
+        return
+    session_id = response.json()["id"]
+    for text in transcript["turns"]:
+        if not await run_turn(client, stats, app, user, session_id, text, args.turn_timeout):
+            return
+    stats.sessions[app] += 1
+
+
+async def closed_loop(client, sessions, args):
+    stats = Stats()
+    deadline = time.perf_counter() + args.duration
+    rng = random.Random(args.seed)
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await run_session(client, stats, rng.choice(sessions), args)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return stats, time.perf_counter() - start, None
+
+
+async def open_loop(client, sessions, args, rate):
+    """Poisson arrivals at `rate` sessions/s for `--duration` seconds; returns the offered count too."""
+    stats = Stats()
+    rng = random.Random(args.seed)
+    slots = asyncio.Semaphore(args.concurrency)
+    tasks = []
+
+    async def arrival(transcript):
+        async with slots:
+            await run_session(client, stats, transcript, args)
+
+    start = time.perf_counter()
+    next_arrival = start
+    while next_arrival < start + args.duration:
+        await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        tasks.append(asyncio.create_task(arrival(rng.choice(sessions))))
+        next_arrival += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    return stats, time.perf_counter() - start, len(tasks)
+
+
+def report(stats, elapsed, extra):
+    lines = [dict(stats.summary(app, elapsed), **extra) for app in sorted(stats.turns.keys() | stats.errors.keys())]
+    overall = dict(stats.merged().summary("all", elapsed), **extra)
+    overall["wall_s"] = round(elapsed, 2)
+    return lines, overall
+
+
+async def replay(args):
+    sessions = load_sessions(args.sessions, args.apps)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=None) as client:
+        if args.rates:
+            for rate in args.rates:
+                stats, elapsed, offered = await open_loop(client, sessions, args, rate)
+                lines, overall = report(stats, elapsed, {"offered_rate": rate})
+                achieved = stats.merged().sessions["all"] / elapsed
+                overall["offered_sessions"] = offered
+                overall["achieved_session_rate"] = round(achieved, 2)
+                # Arrivals actually drawn this step vs sessions finished per second, backlog drain included.
+                overall["saturated"] = achieved < 0.9 * offered / args.duration or overall["error_rate"] > 0.01
+                for line in lines + [overall]:
+                    print(json.dumps(line), flush=True)
+        else:
+            if args.rate:
+                stats, elapsed, _ = await open_loop(client, sessions, args, args.rate)
+                extra = {"offered_rate": args.rate}
+            else:
+                stats, elapsed, _ = await closed_loop(client, sessions, args)
+                extra = {"concurrency": args.concurrency}
+            lines, overall = report(stats, elapsed, extra)
+            for line in lines + [overall]:
+                print(json.dumps(line), flush=True)
+
+
+# ============================================================================
+# Offline server (fake model + adk api_server)
+# ============================================================================
+
+# State the agents write next to their code (see the repository .gitignore); not copied.
+_RUNTIME_FILES = shutil.ignore_patterns(
+    "__pycache__", ".adk", "session_state", "*.sqlite3*", "*.db.log*", "*.db.tmp",
+    ".model_cache.json*", ".rate_cache.json*", "batch_progress.jsonl",
+)
+
+
+def copy_agents(apps, directory):
+    """Copy the apps and common/ into `directory`, without their runtime state."""
+    for name in [*apps, "common"]:
+        shutil.copytree(os.path.join(AGENTS_DIR, name), os.path.join(directory, name), ignore=_RUNTIME_FILES)
+
+
+def start_offline_server(args):
+    from fake_model_server import start_server
+
+    workdir = tempfile.TemporaryDirectory(prefix="adk-load-")
+    agents_dir = workdir.name
+    copy_agents(args.apps, agents_dir)
+    model_server = start_server(latency_ms=args.model_latency_ms)
+    env = dict(os.environ)
+    env.update({
+        "MODEL_BASE_URL": model_server.url,
+        "GOOGLE_API_KEY": env.get("GOOGLE_API_KEY", "fake-key"),
+        # Let the server's own limits show, not the shared model guard's default quota.
+        "MODEL_RPM": env.get("MODEL_RPM", "1000000"),
+        "PYTHONPATH": os.pathsep.join(filter(None, [agents_dir, env.get("PYTHONPATH")])),
+    })
+    port = args.url.rsplit(":", 1)[-1].strip("/")
+    process = subprocess.Popen(
+        ["adk", "api_server", agents_dir, "--port", port, "--host", "127.0.0.1"],
+        cwd=agents_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            model_server.shutdown()
+            workdir.cleanup()
+            raise SystemExit(f"adk api_server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{args.url}/list-apps", timeout=1).status_code == 200:
+                return model_server, process, workdir
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    process.wait(timeout=10)
+    model_server.shutdown()
+    workdir.cleanup()
+    raise SystemExit("adk api_server did not start within 60 s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="save a running server's sessions as transcripts")
+    record_parser.add_argument("--url", default="http://127.0.0.1:8080")
+    record_parser.add_argument("--user", default="user", help="user id whose sessions to record")
+    record_parser.add_argument("--apps", default="", help="comma-separated apps (default: all)")
+    record_parser.add_argument("--out", default="sessions.jsonl")
+
+    replay_parser = commands.add_parser("replay", help="replay transcripts against the server")
+    replay_parser.add_argument("--url", default="http://127.0.0.1:8080")
+    replay_parser.add_argument("--sessions", default=None, help="JSONL transcripts (default: synthetic set)")
+    replay_parser.add_argument("--apps", default=DEFAULT_APPS, help="comma-separated apps to replay")
+    replay_parser.add_argument("--concurrency", type=int, default=8, help="sessions in flight")
+    replay_parser.add_argument("--rate", type=float, default=None, help="open loop: new sessions per second")
+    replay_parser.add_argument("--rates", default="", help="step through these open-loop rates, e.g. 1,2,4,8")
+    replay_parser.add_argument("--duration", type=float, default=20.0, help="seconds (per step with --rates)")
+    replay_parser.add_argument("--turn-timeout", type=float, default=60.0)
+    replay_parser.add_argument("--seed", type=int, default=7)
+    replay_parser.add_argument("--start-server", action="store_true",
+                               help="start the fake model endpoint and adk api_server locally")
+    replay_parser.add_argument("--model-latency-ms", type=float, default=200.0, help="fake model latency")
+    args = parser.parse_args()
+    args.apps = [app.strip() for app in args.apps.split(",") if app.strip()]
+
+    if args.command == "record":
+        asyncio.run(record(args))
+        return
+    args.rates = [float(rate) for rate in args.rates.split(",") if rate.strip()]
+    servers = start_offline_server(args) if args.start_server else None
+    try:
+        asyncio.run(replay(args))
+    finally:
+        if servers:
+            model_server, process, workdir = servers
+            process.terminate()
+            process.wait(timeout=10)
+            model_server.shutdown()
+            workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
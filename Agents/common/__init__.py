@@ -0,0 +1,4 @@
+"""Shared helpers used by the agent packages (storage, callbacks, model clients).
+
+This package holds no agent; the frontend only lists the known agent apps.
+"""
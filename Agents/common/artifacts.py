@@ -0,0 +1,157 @@
+"""
+Out-of-band artifact passing for large tool results.
+
+A tool result goes back to the model as part of the conversation, and every
+later turn resends it: one `getTinyImage` call is ~33 KB of base64 (~8k
+prompt tokens) carried by all the turns after it. `ArtifactOffloader` is an
+after_tool_callback that moves large payloads into ADK's artifact service:
+
+- Image/audio content items (base64 `data`) and text items over
+  ARTIFACT_THRESHOLD_BYTES (default 2048) are saved once as artifacts and
+  replaced in the result by a short reference: artifact name, version, MIME
+  type, size and the api_server URL of the artifact. The web UI renders image
+  references from `/api` + that URL, where its proxy route serves the stored
+  bytes (adk web also lists them in its Artifacts panel).
+- Binary payloads are base64-decoded exactly once; the decoded `bytes` are
+  hashed and handed to the artifact service as-is (no re-encoding, no
+  copies). Text is encoded to UTF-8 once.
+- Artifacts are named by content hash, so a payload the session already
+  stored is referenced again instead of being saved twice.
+- `offloader.stats` counts results seen, payloads offloaded, stores, dedup
+  hits (hit_rate) and the bytes kept out of the conversation.
+
+Results are left untouched when the runner has no artifact service (e.g. a
+bare Runner in a script); adk web / api_server always configure one.
+
+Usage:
+    offloader = ArtifactOffloader()
+    offloader.install(agent)   # or after_tool_callback=offloader.after_tool
+"""
+
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from .callbacks import add_callback
+
+DEFAULT_THRESHOLD_BYTES = int(os.environ.get("ARTIFACT_THRESHOLD_BYTES", "2048"))
+# Session state: artifact name -> version, for the payloads this session already stored.
+ARTIFACT_INDEX_KEY = "offloaded_artifacts"
+BINARY_TYPES = ("image", "audio")
+
+
+class ArtifactOffloader:
+    """Moves large tool-result payloads into the artifact service."""
+
+    def __init__(self, threshold_bytes: int = DEFAULT_THRESHOLD_BYTES):
+        self.threshold_bytes = threshold_bytes
+        self.stats: Dict[str, int] = {
+            "results": 0,
+            "offloaded": 0,
+            "stores": 0,
+            "hits": 0,
+            "bytes_offloaded": 0,
+            "bytes_saved": 0,
+            "no_artifact_service": 0,
+        }
+
+    def install(self, agent: Any) -> Any:
+        add_callback(agent, "after_tool_callback", self.after_tool)
+        return agent
+
+    def hit_rate(self) -> float:
+        offloaded = self.stats["offloaded"]
+        return round(self.stats["hits"] / offloaded, 4) if offloaded else 0.0
+
+    # ------------------------------------------------------------
+    # Callback
+    # ------------------------------------------------------------
+
+    async def after_tool(
+        self, tool: Any, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+    ) -> Optional[Dict[str, Any]]:
+        """Replace large content items of an MCP-style result ({"content": [...]}) by references."""
+        self.stats["results"] += 1
+        if not isinstance(tool_response, dict) or not isinstance(tool_response.get("content"), list):
+            return None
+        content = []
+        changed = False
+        for item in tool_response["content"]:
+            payload = self._payload(item)
+            if payload is None:
+                content.append(item)
+                continue
+            data, mime_type, inline_size = payload
+            try:
+                reference = await self._store(tool.name, data, mime_type, tool_context)
+            except ValueError:
+                # No artifact service configured for this runner.
+                self.stats["no_artifact_service"] += 1
+                return None
+            self.stats["offloaded"] += 1
+            self.stats["bytes_offloaded"] += len(data)
+            self.stats["bytes_saved"] += inline_size - len(str(reference))
+            content.append(reference)
+            changed = True
+        if not changed:
+            return None
+        result = dict(tool_response, content=content)
+        # Some servers repeat text results as structured content, which would put the payload back.
+        result.pop("structured_content", None)
+        result.pop("structuredContent", None)
+        return result
+
+    def _payload(self, item: Any):
+        """(bytes, mime_type, inline size) for a content item worth offloading, else None."""
+        if not isinstance(item, dict):
+            return None
+        if item.get("type") in BINARY_TYPES and isinstance(item.get("data"), str):
+            encoded = item["data"]
+            if len(encoded) < self.threshold_bytes:
+                return None
+            try:
+                data = base64.b64decode(encoded, validate=True)
+            except (binascii.Error, ValueError):
+                return None
+            mime_type = item.get("mimeType") or item.get("mime_type") or "application/octet-stream"
+            return data, mime_type, len(encoded)
+        if item.get("type") == "text" and isinstance(item.get("text"), str):
+            text = item["text"]
+            # Cheap check first: a str never takes fewer UTF-8 bytes than it has characters.
+            if len(text) < self.threshold_bytes:
+                return None
+            data = text.encode("utf-8")
+            return data, "text/plain", len(data)
+        return None
+
+    async def _store(self, tool_name: str, data: bytes, mime_type: str, tool_context: ToolContext) -> Dict[str, Any]:
+        extension = mimetypes.guess_extension(mime_type) or ".bin"
+        name = f"{tool_name}-{hashlib.sha256(data).hexdigest()[:16]}{extension}"
+        index = dict(tool_context.state.get(ARTIFACT_INDEX_KEY) or {})
+        version = index.get(name)
+        if version is None:
+            version = await tool_context.save_artifact(name, types.Part.from_bytes(data=data, mime_type=mime_type))
+            index[name] = version
+            tool_context.state[ARTIFACT_INDEX_KEY] = index
+            self.stats["stores"] += 1
+        else:
+            self.stats["hits"] += 1
+        session = tool_context.session
+        path = "/".join(quote(str(segment), safe="") for segment in (
+            session.app_name, "users", session.user_id, "sessions", session.id, "artifacts", name, "versions", version))
+        return {
+            "type": "artifact",
+            "artifact": name,
+            "version": version,
+            "mime_type": mime_type,
+            "size_bytes": len(data),
+            # Served as raw bytes by the web UI's /api proxy route (web/src/app/api/apps/...).
+            "url": f"/apps/{path}",
+        }
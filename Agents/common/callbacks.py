@@ -0,0 +1,46 @@
+"""
+Helpers for attaching callbacks to existing agents.
+
+ADK agent callback fields accept either a single callable or a list. These
+helpers append to whatever is already configured, so several features (cache,
+checkpointing, telemetry, ...) can be installed on the same agent.
+"""
+
+from typing import Any, Callable, Iterator, Optional
+
+
+def add_callback(agent: Any, field: str, callback: Callable[..., Any], first: bool = False) -> None:
+    """Add `callback` to `agent.<field>` (e.g. "before_model_callback").
+
+    Args:
+        agent: Any ADK agent with the callback field
+        field: Callback attribute name
+        callback: The callback to add
+        first: Run it before the callbacks already configured
+    """
+    existing = getattr(agent, field, None)
+    if existing is None:
+        callbacks = []
+    elif isinstance(existing, list):
+        callbacks = list(existing)
+    else:
+        callbacks = [existing]
+    if first:
+        callbacks.insert(0, callback)
+    else:
+        callbacks.append(callback)
+    setattr(agent, field, callbacks)
+
+
+def walk_agents(agent: Any, seen: Optional[set] = None) -> Iterator[Any]:
+    """Every agent in the tree under `agent`, including AgentTool agents."""
+    seen = seen if seen is not None else set()
+    if id(agent) in seen:
+        return
+    seen.add(id(agent))
+    yield agent
+    for sub_agent in getattr(agent, "sub_agents", None) or []:
+        yield from walk_agents(sub_agent, seen)
+    for tool in getattr(agent, "tools", None) or []:
+        if getattr(tool, "agent", None) is not None:
+            yield from walk_agents(tool.agent, seen)
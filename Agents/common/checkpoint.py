@@ -0,0 +1,165 @@
+"""
+Stage checkpoints for multi-step pipelines (SequentialAgent of LlmAgents).
+
+`StageCheckpointer.install(pipeline)` adds agent callbacks to every stage that
+has an `output_key`:
+- after a stage finishes, its output is stored under the stage's input hash
+- before a stage runs, a stored output for the same input hash is written
+  back to state and the stage is skipped (no model call)
+
+A stage's input hash covers its name, model and instruction, the user
+message, the outputs of the stages before it, and the caller's scope. So:
+- a pipeline re-invoked after a failure resumes at the first stage that has
+  no checkpoint (earlier outputs are reused, not paid for again)
+- editing one stage's instruction only reruns that stage and the stages after
+  it whose inputs actually changed
+
+Checkpoints live in a small SQLite file and expire after `ttl_seconds`.
+
+`scope` (CHECKPOINT_SCOPE) decides who can reuse a checkpoint:
+- "session" (default): only the same user's same session, i.e. a retry of
+  the pipeline in the conversation that failed
+- "user": any session of the same user
+- "shared": anyone sending the same message. Opt-in only: the store then
+  acts as a cross-user cache for `ttl_seconds`, and one user's outputs are
+  served to another user
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from .callbacks import add_callback
+
+DEFAULT_TTL_SECONDS = float(os.environ.get("CHECKPOINT_TTL_SECONDS", str(7 * 24 * 3600)))
+DEFAULT_SCOPE = os.environ.get("CHECKPOINT_SCOPE", "session")
+SCOPES = ("session", "user", "shared")
+
+
+class StageCheckpointer:
+    """Persists each stage's output keyed by a hash of the stage's inputs."""
+
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS, scope: str = DEFAULT_SCOPE):
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown checkpoint scope {scope!r}; expected one of {', '.join(SCOPES)}")
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " input_hash TEXT PRIMARY KEY, stage TEXT NOT NULL,"
+            " output TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM checkpoints WHERE created_at < ?", (time.time() - ttl_seconds,))
+        self._conn.commit()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0}
+
+    # ------------------------------------------------------------
+    # Installation
+    # ------------------------------------------------------------
+
+    def install(self, pipeline: Any) -> Any:
+        """Checkpoint every sub-agent of `pipeline` that has an output_key."""
+        stages = [agent for agent in pipeline.sub_agents if getattr(agent, "output_key", None)]
+        for index, stage in enumerate(stages):
+            upstream_keys = [agent.output_key for agent in stages[:index]]
+            self._install_stage(stage, upstream_keys)
+        return pipeline
+
+    def _install_stage(self, stage: Any, upstream_keys: List[str]) -> None:
+
+        def input_hash(callback_context: CallbackContext) -> str:
+            identity = {
+                "stage": stage.name,
+                "model": stage.model if isinstance(stage.model, str) else getattr(stage.model, "model", ""),
+                # Instruction providers are functions; fall back to their qualified name.
+                "instruction": stage.instruction if isinstance(stage.instruction, str)
+                else getattr(stage.instruction, "__qualname__", ""),
+                **self.scope_of(callback_context),
+            }
+            return self.input_hash(identity, callback_context.user_content, callback_context.state, upstream_keys)
+
+        def restore(callback_context: CallbackContext) -> Optional[types.Content]:
+            output = self.get(input_hash(callback_context))
+            if output is None:
+                return None
+            callback_context.state[stage.output_key] = output
+            return types.Content(role="model", parts=[types.Part(text=output)])
+
+        def save(callback_context: CallbackContext) -> None:
+            output = callback_context.state.get(stage.output_key)
+            if isinstance(output, str) and output:
+                self.put(input_hash(callback_context), stage.name, output)
+            return None
+
+        add_callback(stage, "before_agent_callback", restore, first=True)
+        add_callback(stage, "after_agent_callback", save)
+
+    def scope_of(self, callback_context: CallbackContext) -> Dict[str, str]:
+        """The part of the key that keeps one caller's checkpoints from another's."""
+        if self.scope == "shared":
+            return {}
+        session = callback_context.session
+        scope = {"app_name": session.app_name, "user_id": session.user_id}
+        if self.scope == "session":
+            scope["session_id"] = session.id
+        return scope
+
+    @staticmethod
+    def input_hash(
+        identity: Dict[str, Any],
+        user_content: Optional[types.Content],
+        state: Any,
+        upstream_keys: List[str],
+    ) -> str:
+        user_text = ""
+        if user_content and user_content.parts:
+            user_text = "".join(part.text or "" for part in user_content.parts)
+        material = {
+            **identity,
+            "user": user_text,
+            "upstream": {key: state.get(key) for key in upstream_keys},
+        }
+        encoded = json.dumps(material, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------
+    # Store
+    # ------------------------------------------------------------
+
+    def get(self, input_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output FROM checkpoints WHERE input_hash = ? AND created_at >= ?",
+                (input_hash, time.time() - self.ttl_seconds),
+            ).fetchone()
+            self.stats["hits" if row else "misses"] += 1
+        return row[0] if row else None
+
+    def put(self, input_hash: str, stage: str, output: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (input_hash, stage, output, created_at) VALUES (?, ?, ?, ?)",
+                (input_hash, stage, output, time.time()),
+            )
+            self._conn.commit()
+            self.stats["stores"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
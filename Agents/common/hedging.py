@@ -0,0 +1,201 @@
+"""
+Hedged model requests: cut tail latency by racing a duplicate call.
+
+`HedgedLlm` wraps any ADK model (`BaseLlm`). It records how long its own
+calls take and, when a call has not answered by the configured latency
+percentile (`percentile`, default p95), it sends the same request again. The
+first attempt to finish wins and the other one is cancelled.
+
+- Hedging starts only after `min_samples` calls, so the threshold reflects
+  real latencies.
+- A budget caps the extra load: every call earns `budget` hedge tokens
+  (default 0.1, i.e. at most ~10% extra requests) and a hedge spends one.
+- Streaming calls are passed through unchanged.
+- The threshold comes from the first attempts' own latencies, not from what
+  callers waited (that would feed hedged latencies back into the
+  threshold). The loser is always cancelled, so a won hedge never holds two
+  model calls (and their rate-limiter slots) to the end. An outrun first
+  attempt is recorded as a censored sample: its time at cancellation, a
+  lower bound of its latency. That bound is already past the threshold, so
+  the share of samples above the threshold, which is what the percentile
+  measures, is unchanged.
+- `stats()` reports hedge rate, how often the hedge won, the number of
+  censored samples, and p50/p99 of the latency callers saw next to p50/p99
+  of the first attempts. The first-attempt percentiles are lower bounds
+  (censored attempts count at their cancellation time); for the real
+  improvement compare against unhedged calls, as benchmarks/bench_hedging.py
+  does.
+
+Usage:
+    model = HedgedLlm.wrap("gemini-2.0-flash")
+    agent = LlmAgent(name=..., model=model, ...)
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Tuple
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from pydantic import PrivateAttr
+
+DEFAULT_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))
+DEFAULT_BUDGET = float(os.environ.get("HEDGE_BUDGET", "0.1"))
+
+
+class LatencyTracker:
+    """Rolling window of latencies (seconds) with nearest-rank percentiles."""
+
+    def __init__(self, window: int = 500):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+
+class HedgedLlm(BaseLlm):
+    """Model wrapper that duplicates calls slower than its own latency percentile."""
+
+    inner: BaseLlm
+    percentile: float = DEFAULT_PERCENTILE
+    budget: float = DEFAULT_BUDGET
+    max_budget_tokens: float = 5.0
+    min_samples: int = 20
+    window: int = 500
+
+    _observed: LatencyTracker = PrivateAttr()  # what callers waited
+    _primary: LatencyTracker = PrivateAttr()  # first attempts' own latency (censored if outrun); drives the threshold
+    _tokens: float = PrivateAttr(default=0.0)
+    _counters: Dict[str, int] = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        self._observed = LatencyTracker(self.window)
+        self._primary = LatencyTracker(self.window)
+        self._counters = {"requests": 0, "hedges": 0, "hedge_wins": 0, "budget_denied": 0, "censored": 0}
+
+    @classmethod
+    def wrap(cls, model: Any, **kwargs: Any) -> "HedgedLlm":
+        """Wrap a model name (resolved through ADK's registry) or a BaseLlm."""
+        inner = LLMRegistry.new_llm(model) if isinstance(model, str) else model
+        return cls(model=inner.model, inner=inner, **kwargs)
+
+    @property
+    def capabilities(self) -> Any:
+        return self.inner.capabilities
+
+    def connect(self, llm_request: LlmRequest) -> Any:
+        return self.inner.connect(llm_request)
+
+    # ------------------------------------------------------------
+    # Hedging
+    # ------------------------------------------------------------
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data."""
+        if len(self._primary) < self.min_samples:
+            return None
+        return self._primary.percentile(self.percentile)
+
+    def _take_budget(self) -> bool:
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        self._counters["budget_denied"] += 1
+        return False
+
+    async def _attempt(self, llm_request: LlmRequest, stream: bool) -> List[LlmResponse]:
+        return [response async for response in self.inner.generate_content_async(llm_request, stream=stream)]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if stream:
+            async for response in self.inner.generate_content_async(llm_request, stream=True):
+                yield response
+            return
+
+        self._counters["requests"] += 1
+        self._tokens = min(self.max_budget_tokens, self._tokens + self.budget)
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(self._attempt(llm_request, stream))
+        primary.add_done_callback(lambda attempt: self._record_primary(attempt, start))
+        attempts = [primary]
+        winner = None
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done and self._take_budget():
+                    self._counters["hedges"] += 1
+                    hedge_request = llm_request.model_copy(deep=True)
+                    attempts.append(asyncio.ensure_future(self._attempt(hedge_request, stream)))
+            responses, winner = await self._first_success(attempts)
+        finally:
+            for index, attempt in enumerate(attempts):
+                if attempt.done():
+                    continue
+                attempt.cancel()
+                if index == 0 and winner:
+                    # Outrun first attempt: its latency is at least this long.
+                    self._primary.record(time.perf_counter() - start)
+                    self._counters["censored"] += 1
+
+        self._observed.record(time.perf_counter() - start)
+        if winner:
+            self._counters["hedge_wins"] += 1
+        for response in responses:
+            yield response
+
+    def _record_primary(self, attempt: "asyncio.Future", start: float) -> None:
+        if attempt.cancelled() or attempt.exception() is not None:
+            return
+        self._primary.record(time.perf_counter() - start)
+
+    async def _first_success(self, attempts: List["asyncio.Future"]) -> Tuple[List[LlmResponse], int]:
+        """Return (responses, index) of the first attempt that succeeds; raise if all fail."""
+        pending = set(attempts)
+        first_error: Optional[BaseException] = None
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                error = attempt.exception()
+                if error is not None:
+                    first_error = first_error or error
+                    continue
+                return attempt.result(), attempts.index(attempt)
+            if not pending:
+                raise first_error
+
+    # ------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self._counters["requests"]
+
+        def ms(tracker: LatencyTracker, pct: float) -> Optional[float]:
+            value = tracker.percentile(pct)
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            **self._counters,
+            "hedge_rate": round(self._counters["hedges"] / requests, 4) if requests else 0.0,
+            "hedge_delay_ms": None if self.hedge_delay() is None else round(self.hedge_delay() * 1000, 1),
+            "p50_ms": ms(self._observed, 50),
+            "p99_ms": ms(self._observed, 99),
+            "p50_first_attempt_ms": ms(self._primary, 50),
+            "p99_first_attempt_ms": ms(self._primary, 99),
+        }
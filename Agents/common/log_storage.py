@@ -0,0 +1,390 @@
+"""
+Append-only log storage for TinyDB.
+
+TinyDB's default JSONStorage rewrites the whole database file on every insert,
+update or remove. `AppendLogStorage` keeps the database in memory and only
+appends the documents that changed to a `<path>.log` file:
+
+- Group commit: writes arriving within `commit_window_ms` share one fsync.
+  `write()` returns only after its records are on disk, so every acknowledged
+  write survives a crash. Inside `deferred_durability()` a write returns as
+  soon as it is applied and queued; the caller collects a ticket and waits for
+  the fsync later (see `AppendLogStorage.durable`). A single writer thread
+  can then apply many writes back to back and still share one fsync.
+- Shared flusher: each storage runs a group-commit thread of its own, unless
+  it is given a `LogFlusher`; stores that keep many small files open pass one
+  to all of them, so a single thread fsyncs whichever files have pending writes.
+- Compaction: once the log grows past `compact_bytes` it is rotated and a
+  background thread folds it into a fresh snapshot at `<path>`. The snapshot
+  uses the same JSON layout as JSONStorage, so existing `.db` files open as-is.
+- Recovery: on open the snapshot is loaded and the logs are replayed. Log
+  records are idempotent (set/delete by document id), so replaying a log that
+  was already folded into the snapshot is harmless.
+
+Usage:
+    db = TinyDB(DB_PATH, storage=AppendLogStorage)
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from tinydb.storages import Storage
+
+DEFAULT_COMMIT_WINDOW_MS = float(os.environ.get("STORAGE_COMMIT_WINDOW_MS", "5"))
+DEFAULT_COMPACT_BYTES = int(os.environ.get("STORAGE_COMPACT_BYTES", str(1024 * 1024)))
+
+
+def sidecar_paths(path: str) -> List[str]:
+    """Return the extra files AppendLogStorage keeps next to `path`."""
+    return [f"{path}.log", f"{path}.log.old", f"{path}.tmp"]
+
+
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_durability() -> Iterator[List[Tuple["AppendLogStorage", int]]]:
+    """Let writes on this thread return before their fsync.
+
+    Yields a list that collects one `(storage, seq)` ticket per deferred write;
+    pass each to `storage.durable(seq)` to wait until it is on disk.
+    """
+    previous = getattr(_deferred, 'tickets', None)
+    tickets: List[Tuple[AppendLogStorage, int]] = []
+    _deferred.tickets = tickets
+    try:
+        yield tickets
+    finally:
+        _deferred.tickets = previous
+
+
+def _fsync_dir(path: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform (e.g. Windows)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class LogFlusher:
+    """One group-commit thread shared by many AppendLogStorage files.
+
+    Each commit window it flushes every storage that has pending writes, one
+    fsync per file. The thread starts with the first write.
+    """
+
+    def __init__(self, commit_window_ms: float = DEFAULT_COMMIT_WINDOW_MS, name: str = "log-flush"):
+        self.commit_window = max(commit_window_ms, 0) / 1000.0
+        self.name = name
+        self._cond = threading.Condition()
+        self._dirty: Dict["AppendLogStorage", None] = {}  # insertion-ordered set
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, storage: "AppendLogStorage") -> None:
+        with self._cond:
+            self._dirty[storage] = None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._dirty:
+                    self._cond.wait()
+            # Let other writers join this batch before paying for the fsyncs.
+            time.sleep(self.commit_window)
+            with self._cond:
+                storages = list(self._dirty)
+                self._dirty.clear()
+            for storage in storages:
+                storage._flush_or_fail()
+
+
+class AppendLogStorage(Storage):
+    """TinyDB storage that appends mutations to a log with batched fsync."""
+
+    def __init__(
+        self,
+        path: str,
+        commit_window_ms: float = DEFAULT_COMMIT_WINDOW_MS,
+        compact_bytes: int = DEFAULT_COMPACT_BYTES,
+        create_dirs: bool = False,
+        flusher: Optional[LogFlusher] = None,
+        **kwargs: Any,
+    ):
+        super().__init__()
+        if create_dirs:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.log_path, self.old_log_path, self.tmp_path = sidecar_paths(path)
+        self.commit_window = max(commit_window_ms, 0) / 1000.0
+        self.compact_bytes = compact_bytes
+
+        # _io_lock orders log appends and rotation; _lock guards in-memory state.
+        # Lock order is always _io_lock -> _lock.
+        self._io_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._pending: List[str] = []
+        self._appended_seq = 0
+        self._synced_seq = 0
+        self._flush_error: Optional[BaseException] = None
+        self._waiters: List[Tuple[int, Future]] = []
+        self._compacting = False
+        self._closed = False
+
+        self._tables: Dict[str, Dict[str, Any]] = self._recover()
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+        self._log_size = self._log.tell()
+
+        self._shared_flusher = flusher
+        self._flusher = None
+        if flusher is None and self.commit_window > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name=f"log-flush:{os.path.basename(path)}", daemon=True
+            )
+            self._flusher.start()
+
+    # ------------------------------------------------------------
+    # Recovery
+    # ------------------------------------------------------------
+
+    def _recover(self) -> Dict[str, Dict[str, Any]]:
+        tables: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as handle:
+                raw = handle.read().strip()
+            if raw:
+                tables = json.loads(raw)
+
+        replayed = 0
+        for log_path in (self.old_log_path, self.log_path):
+            replayed += self._replay(log_path, tables)
+
+        if replayed or os.path.exists(self.old_log_path):
+            # Fold the recovered logs into a snapshot before accepting new writes.
+            self._write_snapshot(tables)
+            if os.path.exists(self.old_log_path):
+                os.remove(self.old_log_path)
+            open(self.log_path, 'w').close()
+            _fsync_dir(self.path)
+        return tables
+
+    @staticmethod
+    def _replay(log_path: str, tables: Dict[str, Dict[str, Any]]) -> int:
+        if not os.path.exists(log_path):
+            return 0
+        applied = 0
+        with open(log_path, 'r', encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn tail from a crash mid-append; it was never acknowledged.
+                AppendLogStorage._apply(record, tables)
+                applied += 1
+        return applied
+
+    @staticmethod
+    def _apply(record: Dict[str, Any], tables: Dict[str, Dict[str, Any]]) -> None:
+        if 'drop' in record:
+            tables.pop(record['drop'], None)
+            return
+        table = tables.setdefault(record['t'], {})
+        for doc_id in record.get('del', ()):
+            table.pop(doc_id, None)
+        table.update(record.get('set', {}))
+
+    # ------------------------------------------------------------
+    # TinyDB Storage interface
+    # ------------------------------------------------------------
+
+    def read(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            if not self._tables:
+                return None
+            # TinyDB mutates documents in place during updates, so hand out copies
+            # and keep our own state untouched until write() diffs against it.
+            return {
+                name: {doc_id: dict(doc) for doc_id, doc in table.items()}
+                for name, table in self._tables.items()
+            }
+
+    def write(self, data: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock:
+            if self._closed:
+                raise IOError("Cannot write to a closed database")
+            records = self._diff(data)
+            if not records:
+                return
+            for record in records:
+                self._apply(record, self._tables)
+            self._pending.extend(json.dumps(record) + "\n" for record in records)
+            self._appended_seq += 1
+            seq = self._appended_seq
+            if self._shared_flusher is not None:
+                self._shared_flusher.schedule(self)
+            if self._flusher is not None or self._shared_flusher is not None:
+                self._flushed.notify_all()
+                tickets = getattr(_deferred, 'tickets', None)
+                if tickets is not None:
+                    tickets.append((self, seq))
+                    return
+                while self._synced_seq < seq and self._flush_error is None:
+                    self._flushed.wait()
+                if self._flush_error is not None:
+                    raise IOError("Log flush failed") from self._flush_error
+                return
+
+        self._flush()
+
+    def durable(self, seq: int) -> Future:
+        """Future that resolves once write `seq` has been fsynced."""
+        future: Future = Future()
+        with self._lock:
+            if self._flush_error is not None:
+                future.set_exception(IOError("Log flush failed"))
+            elif self._synced_seq >= seq:
+                future.set_result(None)
+            else:
+                self._waiters.append((seq, future))
+        return future
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flushed.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+        self._flush()
+        with self._io_lock:
+            self._log.close()
+
+    # ------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------
+
+    def _diff(self, data: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Compute the log records that turn the current state into `data`."""
+        records: List[Dict[str, Any]] = []
+        for name in self._tables.keys() - data.keys():
+            records.append({'drop': name})
+        for name, table in data.items():
+            old = self._tables.get(name)
+            if old is None:
+                records.append({'t': name, 'set': dict(table)})
+                continue
+            changed = {doc_id: doc for doc_id, doc in table.items() if old.get(doc_id) != doc}
+            removed = [doc_id for doc_id in old.keys() - table.keys()]
+            if changed or removed:
+                record: Dict[str, Any] = {'t': name}
+                if changed:
+                    record['set'] = changed
+                if removed:
+                    record['del'] = removed
+                records.append(record)
+        return records
+
+    def _flush(self) -> None:
+        """Append and fsync every pending record, then wake the waiting writers."""
+        with self._io_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                payload = "".join(self._pending)
+                self._pending.clear()
+                seq = self._appended_seq
+            self._log.write(payload)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log_size += len(payload)
+            self._maybe_compact()
+        with self._lock:
+            self._synced_seq = max(self._synced_seq, seq)
+            self._flushed.notify_all()
+            self._resolve_waiters()
+
+    def _resolve_waiters(self) -> None:
+        """Complete durable() futures that are now on disk (or failed). Caller holds _lock."""
+        pending = []
+        for seq, future in self._waiters:
+            if self._flush_error is not None:
+                future.set_exception(IOError("Log flush failed"))
+            elif self._synced_seq >= seq:
+                future.set_result(None)
+            else:
+                pending.append((seq, future))
+        self._waiters = pending
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._flushed.wait()
+                if self._closed:
+                    return
+            # Let other writers join this batch before paying for the fsync.
+            time.sleep(self.commit_window)
+            if not self._flush_or_fail():
+                return
+
+    def _flush_or_fail(self) -> bool:
+        """Flush on a flusher thread; a failure is surfaced to the waiting writers."""
+        try:
+            self._flush()
+            return True
+        except BaseException as exc:
+            with self._lock:
+                self._flush_error = exc
+                self._flushed.notify_all()
+                self._resolve_waiters()
+            return False
+
+    def _maybe_compact(self) -> None:
+        """Rotate the log and compact it in the background. Caller holds _io_lock."""
+        if self._log_size < self.compact_bytes:
+            return
+        with self._lock:
+            # A leftover .old log means a previous compaction has not finished
+            # (or failed); it is folded in on the next open instead.
+            if self._compacting or os.path.exists(self.old_log_path):
+                return
+            self._compacting = True
+            snapshot = {name: dict(table) for name, table in self._tables.items()}
+        # New writes go to a fresh log while the old one is folded into a snapshot.
+        self._log.close()
+        os.replace(self.log_path, self.old_log_path)
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+        self._log_size = 0
+        threading.Thread(
+            target=self._compact, args=(snapshot,), name="log-compact", daemon=True
+        ).start()
+
+    def _compact(self, snapshot: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            self._write_snapshot(snapshot)
+            os.remove(self.old_log_path)
+            _fsync_dir(self.path)
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def _write_snapshot(self, tables: Dict[str, Dict[str, Any]]) -> None:
+        with open(self.tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(tables, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(self.tmp_path, self.path)
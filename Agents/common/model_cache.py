@@ -0,0 +1,227 @@
+"""
+TTL cache for model responses, installable on any LlmAgent.
+
+`ModelResponseCache.install(agent)` adds a before-model callback that returns
+a stored `LlmResponse` instead of calling the model, and an after-model
+callback that stores fresh final responses. Entries are keyed on:
+- the model name
+- the system instruction (after `{state}` templating, so state the
+  instruction reads is part of the key)
+- the tool declarations sent to the model
+- any extra `state_keys` given to `install`, and optionally the conversation
+  contents (`include_contents=True`)
+
+Entries expire after `ttl_seconds`, the cache is bounded to `max_entries`
+(least recently used entries are evicted first) and it is persisted as one
+JSON file, so it survives a restart. The file is rewritten by a background
+thread (changes made while it writes are folded into its next write) and once
+more at exit, so the event loop never waits on that I/O. Responses that are partial, errored or
+contain function calls are never cached.
+
+Use it only on agents whose answer depends on nothing but the key, such as
+researchers with a fixed instruction.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+from .callbacks import add_callback
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = float(os.environ.get("MODEL_CACHE_TTL_SECONDS", "3600"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("MODEL_CACHE_MAX_ENTRIES", "256"))
+# Model calls of cached agents that may be in flight at once
+MAX_PENDING = 1024
+
+
+class ModelResponseCache:
+    """Disk-backed, size-bounded TTL cache of LlmResponses."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (stored_at, response dict); ordered from least to most recently used
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # (invocation_id, agent_name) -> key of the request waiting for its response; oldest first
+        self._pending: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+        self._save_requested = threading.Event()
+        self._save_lock = threading.Lock()  # one writer of the file at a time
+        self._saver: Optional[threading.Thread] = None
+        self._load()
+
+    # ------------------------------------------------------------
+    # Installation
+    # ------------------------------------------------------------
+
+    def install(self, agent: Any, state_keys: Sequence[str] = (), include_contents: bool = False) -> Any:
+        """Attach the cache to `agent` (an LlmAgent) and return the agent."""
+
+        def before_model(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+            key = self.request_key(llm_request, callback_context.state, state_keys, include_contents)
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            with self._lock:
+                self._pending[(callback_context.invocation_id, callback_context.agent_name)] = key
+                # Without an agent-level error callback (ADK 1.x) a failed call leaves its key
+                # behind; bound them (a dropped key only means that response is not cached).
+                while len(self._pending) > MAX_PENDING:
+                    self._pending.popitem(last=False)
+            return None
+
+        def after_model(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+            if llm_response.partial:
+                return None
+            with self._lock:
+                key = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+            if key is not None:
+                self.put(key, llm_response)
+            return None
+
+        def on_model_error(
+            callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+        ) -> Optional[LlmResponse]:
+            # No response will come for this request; forget its key.
+            with self._lock:
+                self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+            return None
+
+        add_callback(agent, "before_model_callback", before_model)
+        add_callback(agent, "after_model_callback", after_model)
+        if "on_model_error_callback" in type(agent).model_fields:
+            add_callback(agent, "on_model_error_callback", on_model_error)
+        return agent
+
+    @staticmethod
+    def request_key(
+        llm_request: LlmRequest,
+        state: Any = None,
+        state_keys: Sequence[str] = (),
+        include_contents: bool = False,
+    ) -> str:
+        config = llm_request.config
+        material = {
+            "model": llm_request.model,
+            "instruction": _dump(config.system_instruction) if config else None,
+            "tools": [_dump(tool) for tool in (config.tools or [])] if config else [],
+            "state": {key: state.get(key) for key in state_keys} if state is not None else {},
+        }
+        if include_contents:
+            material["contents"] = [_dump(content) for content in llm_request.contents]
+        encoded = json.dumps(material, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------
+    # Cache operations
+    # ------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[LlmResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            stored_at, response = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        return LlmResponse.model_validate(response)
+
+    def put(self, key: str, llm_response: LlmResponse) -> None:
+        if llm_response.error_code or llm_response.content is None:
+            return
+        if any(part.function_call for part in llm_response.content.parts or []):
+            return  # Tool-calling turns depend on what the tools return next.
+        response = llm_response.model_dump(mode="json", exclude_none=True)
+        with self._lock:
+            self._entries[key] = (time.time(), response)
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        self._schedule_save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self._schedule_save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                stored = json.load(handle)
+        except (OSError, ValueError):
+            return  # A damaged cache file only costs a few model calls.
+        now = time.time()
+        for key, stored_at, response in stored.get("entries", []):
+            if now - stored_at <= self.ttl_seconds:
+                self._entries[key] = (stored_at, response)
+
+    def _schedule_save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            if self._saver is None:
+                self._saver = threading.Thread(target=self._save_loop, name="model-cache-save", daemon=True)
+                self._saver.start()
+                atexit.register(self.flush)
+        self._save_requested.set()
+
+    def _save_loop(self) -> None:
+        while True:
+            self._save_requested.wait()
+            self._save_requested.clear()
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Could not save the model response cache to %s", self.path)
+
+    def flush(self) -> None:
+        """Write the current entries to `path` now."""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                # Stored response dicts are never mutated, so the file is written outside the lock.
+                entries = [[key, stored_at, response] for key, (stored_at, response) in self._entries.items()]
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump({"entries": entries}, handle)
+            os.replace(tmp_path, self.path)
+
+
+def _dump(value: Any) -> Any:
+    return value.model_dump(mode="json", exclude_none=True) if hasattr(value, "model_dump") else value
@@ -0,0 +1,234 @@
+"""
+Central model client registry: one pooled keep-alive HTTP client for every agent.
+
+Each agent package used to build its own model objects, and every `Gemini`
+instance opened its own google-genai `Client` with its own HTTP connection
+pool. `get_model(name, ...)` returns a model whose API client comes from this
+registry instead:
+
+- Every model's google-genai `Client` is built by ADK's own
+  `Gemini.api_client` (API version, base URL, enterprise/Vertex settings,
+  `client_kwargs`), then switched to the shared `httpx.AsyncClient` of the
+  running loop, whose keep-alive pool is sized by MODEL_POOL_SIZE (default 20
+  connections) and MODEL_KEEPALIVE_SECONDS (default 30). HTTP clients are
+  bound to the loop they run on, so a second loop (e.g. a script calling
+  asyncio.run twice) gets its own pool.
+- Per-model concurrency caps: at most MODEL_MAX_CONCURRENCY (default 16)
+  calls per model in flight, overridable per model with
+  MODEL_CONCURRENCY_LIMITS="gemini-2.0-flash=8,gemini-2.5-flash-lite=4".
+  Extra calls wait for a slot instead of opening more connections.
+- `registry.stats()` reports requests, new TCP connections and the
+  connection reuse rate (from httpx trace events), plus per-model in-flight
+  peaks and how often calls waited for a slot.
+- MODEL_BASE_URL sends every model to another Gemini-compatible endpoint
+  (e.g. the local fake server in benchmarks/) without touching the agents.
+
+Models are wrapped in `GuardedLlm` (common/resilience.py), so they also share
+the process-wide rate limiter, retries and circuit breaker. Agents therefore
+only call `get_model(name)`; nothing else about the client is set up per agent.
+
+Usage:
+    from common.models import get_model
+    agent = LlmAgent(name=..., model=get_model("gemini-2.0-flash"), ...)
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, AsyncGenerator, Dict, Optional
+
+import httpx
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.models.google_llm import Gemini
+from pydantic import PrivateAttr
+
+from .resilience import GuardedLlm
+
+DEFAULT_POOL_SIZE = int(os.environ.get("MODEL_POOL_SIZE", "20"))
+DEFAULT_KEEPALIVE_SECONDS = float(os.environ.get("MODEL_KEEPALIVE_SECONDS", "30"))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("MODEL_MAX_CONCURRENCY", "16"))
+# Point every agent at another Gemini-compatible endpoint, e.g. benchmarks/fake_model_server.py.
+MODEL_BASE_URL = os.environ.get("MODEL_BASE_URL") or None
+
+
+def parse_concurrency_limits(spec: str) -> Dict[str, int]:
+    """'gemini-2.0-flash=8, gemini-2.5-flash-lite=4' -> {'gemini-2.0-flash': 8, ...}."""
+    limits: Dict[str, int] = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class ModelClientRegistry:
+    """Shares pooled API clients and per-model concurrency slots across all models."""
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        keepalive_seconds: float = DEFAULT_KEEPALIVE_SECONDS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        concurrency_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.pool_size = pool_size
+        self.keepalive_seconds = keepalive_seconds
+        self.max_concurrency = max_concurrency
+        self.concurrency_limits = dict(concurrency_limits or {})
+        self._lock = threading.Lock()
+        # Keyed by loop: pooled connections and semaphores belong to one event loop.
+        self._http_clients: "weakref.WeakKeyDictionary[Any, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._slots: "weakref.WeakKeyDictionary[Any, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+        self._counters: Dict[str, int] = {"clients": 0, "requests": 0, "new_connections": 0}
+        self._models: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ModelClientRegistry":
+        return cls(concurrency_limits=parse_concurrency_limits(os.environ.get("MODEL_CONCURRENCY_LIMITS", "")))
+
+    # ------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------
+
+    def pooled(self, client: Any) -> Any:
+        """Switch a freshly built google-genai Client to the running loop's shared HTTP pool.
+
+        Only the async transport changes; everything else the Client resolved
+        from its arguments (endpoint, API version, credentials) is kept.
+        """
+        api_client = client._api_client
+        http_client = self.http_client()
+        api_client._http_options = api_client._http_options.model_copy(update={"httpx_async_client": http_client})
+        api_client._async_httpx_client = http_client
+        with self._lock:
+            self._counters["clients"] += 1
+        return client
+
+    def http_client(self) -> httpx.AsyncClient:
+        """The shared keep-alive pool of the running loop (a new one outside a loop)."""
+        loop = _running_loop()
+        with self._lock:
+            if loop is not None and loop in self._http_clients:
+                return self._http_clients[loop]
+            http_client = self._new_http_client()
+            if loop is not None:
+                self._http_clients[loop] = http_client
+            return http_client
+
+    def _new_http_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_seconds,
+        )
+        return httpx.AsyncClient(limits=limits, timeout=None, event_hooks={"request": [self._on_request]})
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            self._counters["requests"] += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # Only requests that cannot reuse a pooled connection open a new one.
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self._counters["new_connections"] += 1
+
+    # ------------------------------------------------------------
+    # Concurrency caps
+    # ------------------------------------------------------------
+
+    def limit_for(self, model: str) -> int:
+        return self.concurrency_limits.get(model, self.max_concurrency)
+
+    def _slot(self, model: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = self._slots.setdefault(loop, {})
+            if model not in slots:
+                slots[model] = asyncio.Semaphore(self.limit_for(model))
+            return slots[model]
+
+    async def run_limited(self, model: str, calls: AsyncGenerator[LlmResponse, None]) -> AsyncGenerator[LlmResponse, None]:
+        """Iterate `calls` while holding one of the model's concurrency slots."""
+        slot = self._slot(model)
+        counters = self._models.setdefault(model, {"calls": 0, "waited": 0, "in_flight": 0, "peak_in_flight": 0})
+        counters["calls"] += 1
+        if slot.locked():
+            counters["waited"] += 1
+        async with slot:
+            counters["in_flight"] += 1
+            counters["peak_in_flight"] = max(counters["peak_in_flight"], counters["in_flight"])
+            try:
+                async for response in calls:
+                    yield response
+            finally:
+                counters["in_flight"] -= 1
+
+    # ------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            models = {name: dict(values, limit=self.limit_for(name)) for name, values in self._models.items()}
+        requests = counters["requests"]
+        reused = max(0, requests - counters["new_connections"])
+        return {
+            **counters,
+            "reused_connections": reused,
+            "connection_reuse_rate": round(reused / requests, 4) if requests else 0.0,
+            "pool_size": self.pool_size,
+            "models": models,
+        }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+registry = ModelClientRegistry.from_env()
+
+
+class PooledGemini(Gemini):
+    """Gemini model that takes its API client's HTTP pool and its concurrency slot from the registry."""
+
+    _clients: Any = PrivateAttr(default_factory=weakref.WeakKeyDictionary)  # loop -> Client
+    _loopless_client: Any = PrivateAttr(default=None)
+
+    @property
+    def api_client(self) -> Any:
+        loop = _running_loop()
+        client = self._clients.get(loop) if loop is not None else self._loopless_client
+        if client is None:
+            # ADK's own builder (the function behind its cached api_client property).
+            client = registry.pooled(Gemini.api_client.func(self))
+            if loop is not None:
+                self._clients[loop] = client
+            else:
+                self._loopless_client = client
+        return client
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        calls = super().generate_content_async(llm_request, stream=stream)
+        async for response in registry.run_limited(self.model, calls):
+            yield response
+
+
+def get_model(name: str, **gemini_kwargs: Any) -> GuardedLlm:
+    """A pooled Gemini model behind the shared rate limiter / retry / circuit breaker.
+
+    Args:
+        name: Gemini model name, e.g. "gemini-2.0-flash".
+        **gemini_kwargs: Extra `Gemini` fields (e.g. generation_config, base_url).
+    """
+    if MODEL_BASE_URL and "base_url" not in gemini_kwargs:
+        gemini_kwargs["base_url"] = MODEL_BASE_URL
+    return GuardedLlm.wrap(PooledGemini(model=name, **gemini_kwargs))
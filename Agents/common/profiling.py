@@ -0,0 +1,393 @@
+"""
+On-demand CPU and memory profiling of single agent runs.
+
+Off unless the server is started with PROFILING=1. Then
+`profiler.install(root_agent)` adds agent, model and tool callbacks that do
+nothing until a run asks to be profiled through the `profile` session state
+key, e.g. in the api_server request body (the same body goes through the web
+UI's /api/run_sse):
+
+    {"app_name": "memory_demo", "user_id": "u", "session_id": "s",
+     "new_message": {...}, "state_delta": {"profile": true}}
+
+Any caller can send that, so on a shared server set PROFILE_TOKEN: only runs
+whose `profile` value equals the token are profiled. The flag is consumed
+(the run sets it back to false), so only that request is profiled and the
+server keeps serving everything else as usual. For that run:
+
+- a sampler thread records the Python stack every PROFILE_INTERVAL_MS
+  (default 5) while the run is on the CPU: on the event loop only while one
+  of the run's own tasks is executing, and on storage worker threads
+  (common/storage_executor.py) while they execute one of its tool calls.
+  Stacks are written in the collapsed format (`root;caller;callee count`)
+  read by flamegraph.pl, inferno and speedscope
+- tracemalloc traces allocations for the length of the run; the source
+  lines whose allocations grew the most (still held when the run ended) and
+  the traced peak are written next to the stacks
+
+Output goes to PROFILE_DIR (default `profiles`) as
+`<time>-<app>-<invocation id>.collapsed` and `.alloc.txt`; only the newest
+PROFILE_MAX_FILES (default 50) profiles are kept. The snapshot diff
+and the file writes happen on the sampler thread, not on the event loop. A
+run that never reaches its root agent's after-callback (an exception) is
+closed when its task ends or after PROFILE_MAX_SECONDS (default 120).
+
+tracemalloc is process-wide: objects allocated by other requests served at
+the same time show up in the allocation report too, so profile on a quiet
+server for clean numbers.
+
+Usage:
+    from common.profiling import profiler
+    profiler.install(root_agent)
+"""
+
+import asyncio
+import contextvars
+import hmac
+import linecache
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.adk.tools.tool_context import ToolContext
+
+from .callbacks import add_callback, walk_agents
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.environ.get("PROFILING", "0") == "1"
+DEFAULT_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+DEFAULT_PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+DEFAULT_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "50"))
+DEFAULT_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+DEFAULT_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "120"))
+DEFAULT_TOP_ALLOCATIONS = int(os.environ.get("PROFILE_TOP_ALLOCATIONS", "40"))
+
+# Session state key a request sets (through state_delta) to profile its run
+STATE_KEY = "profile"
+
+_active_profile: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar(
+    "adk_active_profile", default=None)
+
+# Longest first, so a file is named relative to the most specific import root
+_PATH_PREFIXES = sorted(
+    {os.path.join(os.path.abspath(path), "") for path in sys.path if path}
+    | {os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "")},
+    key=len,
+    reverse=True,
+)
+# Left out of the allocation report (filtering grouped lines is far cheaper than filtering traces)
+_SKIPPED_FILES = {
+    tracemalloc.__file__,
+    __file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+}
+
+
+class Profile:
+    """One profiled run: the tasks and worker threads running it, and its samples."""
+
+    def __init__(self, invocation_id: str, app_name: str, session_id: str, agent_name: str):
+        self.invocation_id = invocation_id
+        self.app_name = app_name
+        self.session_id = session_id
+        self.agent_name = agent_name
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.root_task = asyncio.current_task()
+        self.tasks = {self.root_task}
+        self.threads: Dict[int, str] = {}  # worker thread ident -> name, while it runs a call of this run
+        self.stacks: Counter = Counter()
+        self.samples: Counter = Counter()  # per thread label
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.ended_by = ""
+        self.overlapping = 0
+        self.start_traced = 0
+        self.finished = False
+        self.stop = threading.Event()
+
+
+class Profiler:
+    """Profiles the runs that ask for it (see module docstring)."""
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_PROFILE_DIR,
+        interval_ms: float = DEFAULT_INTERVAL_MS,
+        max_seconds: float = DEFAULT_MAX_SECONDS,
+        top_allocations: int = DEFAULT_TOP_ALLOCATIONS,
+        token: str = DEFAULT_TOKEN,
+        max_files: int = DEFAULT_MAX_FILES,
+    ):
+        """
+        Args:
+            directory: Where the .collapsed and .alloc.txt files are written
+            interval_ms: Time between stack samples
+            max_seconds: Longest a profile runs if its run never reports its end
+            top_allocations: Source lines listed in the allocation report
+            token: When set, the value the `profile` state key must hold to profile a run
+            max_files: Profiles kept in `directory`; older ones are deleted (0 keeps all)
+        """
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self.max_seconds = max_seconds
+        self.top_allocations = top_allocations
+        self.token = token
+        self.max_files = max_files
+        self.stats = {"profiles": 0}
+        self._lock = threading.Lock()
+        self._tracemalloc_users = 0
+        self._started_tracemalloc = False
+        self._frame_names: Dict[Any, str] = {}
+
+    # ------------------------------------------------------------
+    # Installation
+    # ------------------------------------------------------------
+
+    def install(self, root_agent: Any) -> Any:
+        """Attach the profiling callbacks to every agent under `root_agent` and return it."""
+        if not PROFILING_ENABLED:
+            return root_agent
+        for agent in walk_agents(root_agent):
+            self.install_agent(agent)
+        return root_agent
+
+    def install_agent(self, agent: Any) -> Any:
+        """Attach the callbacks to one agent (e.g. one built at runtime)."""
+        existing = getattr(agent, "before_agent_callback", None)
+        if not PROFILING_ENABLED or (isinstance(existing, list) and self.before_agent in existing):
+            return agent
+        # First everywhere: a callback that short-circuits the rest must not hide the run's end.
+        add_callback(agent, "before_agent_callback", self.before_agent, first=True)
+        add_callback(agent, "after_agent_callback", self.after_agent, first=True)
+        if hasattr(agent, "before_model_callback"):
+            add_callback(agent, "before_model_callback", self.before_model, first=True)
+            add_callback(agent, "before_tool_callback", self.before_tool, first=True)
+        return agent
+
+    # ------------------------------------------------------------
+    # Callbacks
+    # ------------------------------------------------------------
+
+    def before_agent(self, callback_context: CallbackContext) -> None:
+        profile = _active_profile.get()
+        if profile is not None and not profile.finished:
+            # Sub-agent, fan-out branch or AgentTool run inside a profiled run.
+            profile.tasks.add(asyncio.current_task())
+            return None
+        state = callback_context.state
+        if not self._requested(state.get(STATE_KEY)):
+            return None
+        state[STATE_KEY] = False  # this request only
+        ctx = callback_context._invocation_context
+        profile = Profile(ctx.invocation_id, ctx.app_name, ctx.session.id, ctx.agent.name)
+        _active_profile.set(profile)
+        self._start(profile)
+        return None
+
+    def after_agent(self, callback_context: CallbackContext) -> None:
+        profile = _active_profile.get()
+        if profile is None or profile.finished:
+            return None
+        ctx = callback_context._invocation_context
+        if ctx.invocation_id == profile.invocation_id and ctx.agent.name == profile.agent_name:
+            profile.end = time.perf_counter()
+            profile.finished = True
+            profile.stop.set()
+        return None
+
+    def before_model(self, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        self._track_task()
+        return None
+
+    def before_tool(self, tool: Any, args: Dict[str, Any], tool_context: ToolContext) -> None:
+        # Parallel function calls may each run in a task of their own.
+        self._track_task()
+        return None
+
+    def _requested(self, value: Any) -> bool:
+        if self.token:
+            return isinstance(value, str) and hmac.compare_digest(value.encode(), self.token.encode())
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+
+    def _track_task(self) -> None:
+        profile = _active_profile.get()
+        if profile is not None and not profile.finished:
+            profile.tasks.add(asyncio.current_task())
+
+    # ------------------------------------------------------------
+    # Sampling and output (sampler thread)
+    # ------------------------------------------------------------
+
+    def _start(self, profile: Profile) -> None:
+        with self._lock:
+            if self._tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            profile.overlapping = self._tracemalloc_users
+            self._tracemalloc_users += 1
+            profile.start_traced = tracemalloc.get_traced_memory()[0]
+        self.stats["profiles"] += 1
+        threading.Thread(target=self._run, args=(profile,), name=f"profiler-{profile.invocation_id}",
+                         daemon=True).start()
+
+    def _release_tracemalloc(self) -> None:
+        with self._lock:
+            self._tracemalloc_users -= 1
+            if self._tracemalloc_users == 0 and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def _run(self, profile: Profile) -> None:
+        try:
+            # Traces start empty when this run started tracemalloc; otherwise diff against now.
+            baseline = tracemalloc.take_snapshot() if profile.overlapping or profile.start_traced else None
+            deadline = profile.start + self.max_seconds
+            while not profile.stop.wait(self.interval):
+                if profile.root_task.done() or time.perf_counter() > deadline:
+                    break
+                self._sample(profile)
+            if profile.stop.is_set():
+                profile.ended_by = "run finished"
+            elif profile.root_task.done():
+                profile.ended_by = "task ended without the run's after-callback"
+            else:
+                profile.ended_by = f"PROFILE_MAX_SECONDS ({self.max_seconds:g}s)"
+            profile.finished = True
+            if profile.end is None:
+                profile.end = time.perf_counter()
+            snapshot = tracemalloc.take_snapshot()
+            end_traced, peak_traced = tracemalloc.get_traced_memory()
+        finally:
+            self._release_tracemalloc()
+        if baseline is None:
+            growth = [(stat.size, stat.count, stat.traceback[0]) for stat in snapshot.statistics("lineno")]
+        else:
+            growth = [(stat.size_diff, stat.count_diff, stat.traceback[0])
+                      for stat in snapshot.compare_to(baseline, "lineno") if stat.size_diff > 0]
+        growth = [entry for entry in growth if entry[2].filename not in _SKIPPED_FILES]
+        growth.sort(key=lambda entry: entry[0], reverse=True)
+        try:
+            self._write(profile, growth, end_traced - profile.start_traced, peak_traced - profile.start_traced)
+        except OSError:
+            logger.exception("Could not write the profile of %s", profile.invocation_id)
+
+    def _sample(self, profile: Profile) -> None:
+        task = asyncio.current_task(profile.loop)
+        for ident, frame in sys._current_frames().items():
+            if ident == profile.loop_thread:
+                if task is None or task not in profile.tasks:
+                    continue
+                label = "event-loop"
+            else:
+                label = profile.threads.get(ident)
+                if label is None:
+                    continue
+            profile.samples[label] += 1
+            profile.stacks[self._collapse(label, frame)] += 1
+
+    def _collapse(self, label: str, frame: Any) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            name = self._frame_names.get(code)
+            if name is None:
+                name = self._frame_names[code] = f"{code.co_qualname} ({_short_path(code.co_filename)})"
+            names.append(name)
+            frame = frame.f_back
+        names.append(label)
+        return ";".join(reversed(names))
+
+    def _write(self, profile: Profile, growth: list, held: int, peak: int) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        started = time.strftime("%Y%m%d-%H%M%S", time.localtime(profile.started_at))
+        stem = os.path.join(self.directory, f"{started}-{profile.app_name}-{profile.invocation_id}")
+        with open(stem + ".collapsed", "w", encoding="utf-8") as file:
+            for stack, count in profile.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        samples = ", ".join(f"{label} {count}" for label, count in profile.samples.most_common()) or "none"
+        with open(stem + ".alloc.txt", "w", encoding="utf-8") as file:
+            file.write(f"app: {profile.app_name}\n")
+            file.write(f"invocation: {profile.invocation_id}\n")
+            file.write(f"session: {profile.session_id}\n")
+            file.write(f"wall: {(profile.end - profile.start) * 1000:.1f} ms ({profile.ended_by})\n")
+            file.write(f"cpu samples every {self.interval * 1000:g} ms: {samples}\n")
+            file.write(f"traced memory: {_kib(held)} held at the end, peak {_kib(peak)} above the start\n")
+            file.write(f"profiles running at the same time: {profile.overlapping}\n\n")
+            file.write("Top allocation growth by source line (allocated during the run, still held at its end):\n")
+            for size, count, frame in growth[:self.top_allocations]:
+                file.write(f"{_kib(size):>12}  {count:>7} blocks  "
+                           f"{_short_path(frame.filename)}:{frame.lineno}  "
+                           f"{linecache.getline(frame.filename, frame.lineno).strip()}\n")
+        logger.info("Profile of %s (%s) written to %s.collapsed/.alloc.txt",
+                    profile.app_name, profile.invocation_id, stem)
+        self._prune()
+
+    def _prune(self) -> None:
+        """Delete the oldest profiles beyond `max_files` (names start with their time)."""
+        if self.max_files <= 0:
+            return
+        stems = sorted({name[:-len(".collapsed")] for name in os.listdir(self.directory)
+                        if name.endswith(".collapsed")})
+        for stem in stems[:-self.max_files]:
+            for suffix in (".collapsed", ".alloc.txt"):
+                try:
+                    os.remove(os.path.join(self.directory, stem + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+profiler = Profiler()
+
+
+# ============================================================================
+# Worker threads
+# ============================================================================
+
+def for_worker_thread(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap `fn` before handing it to a thread pool, so a profiled run samples that thread.
+
+    Call it on the event loop (where the run's profile is visible); outside a
+    profiled run it returns `fn` unchanged.
+    """
+    profile = _active_profile.get()
+    if profile is None or profile.finished:
+        return fn
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        ident = threading.get_ident()
+        profile.threads[ident] = threading.current_thread().name
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.threads.pop(ident, None)
+
+    return run
+
+
+# ============================================================================
+# Helpers
+# ============================================================================
+
+def _short_path(filename: str) -> str:
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def _kib(size: int) -> str:
+    return f"{size / 1024:.1f} KiB"
@@ -0,0 +1,392 @@
+"""
+Shared rate limiting, retry and circuit breaking for all model calls.
+
+Every agent package wraps its model in `GuardedLlm`, and all wrappers share
+one process-wide `ModelGuard` (`default_guard()`), so the agents coordinate
+instead of amplifying each other's retry storms:
+
+- `TokenBucket` limiters for requests per minute (MODEL_RPM) and tokens per
+  minute (MODEL_TPM). Tokens are estimated from the request size before the
+  call and corrected with the real usage afterwards.
+- Retries with full-jitter exponential backoff (MODEL_RETRY_ATTEMPTS,
+  MODEL_RETRY_BASE_DELAY, MODEL_RETRY_MAX_DELAY) on 429/5xx/timeouts. A
+  Retry-After header (or the RetryInfo of a 429 body) is honored and pauses
+  the shared request bucket, so every caller backs off, not only the one
+  that was rejected. A call never waits longer than MODEL_RETRY_MAX_WAIT in
+  total; it fails instead of hanging for minutes.
+- `CircuitBreaker`: after BREAKER_FAILURE_THRESHOLD consecutive upstream
+  failures (5xx, timeouts, transport errors) calls fail fast with `CircuitOpenError` for BREAKER_RESET_SECONDS,
+  then a single probe call decides whether to close it again. A 429 is not a
+  failure: the upstream is healthy and only asked us to slow down, which the
+  retry backoff and the paused request bucket already do. Opening the breaker
+  on a quota burst would turn a short pause into BREAKER_RESET_SECONDS of
+  rejected calls.
+
+The wrapped models must not retry on their own: build them without
+`retry_options` (GuardedLlm.wrap does this for model names).
+
+Usage:
+    model = GuardedLlm.wrap("gemini-2.0-flash")
+    agent = LlmAgent(name=..., model=model, ...)
+    default_guard().stats()
+"""
+
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+RATE_LIMITED_STATUS = 429
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, str(default)))
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model while the circuit breaker is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Model upstream unhealthy; circuit open, retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+# ------------------------------------------------------------
+# Rate limiting
+# ------------------------------------------------------------
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `per_minute`, usable from any event loop."""
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill_locked(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Wait until `amount` tokens are available; returns the seconds waited."""
+        # A request larger than the bucket only has to wait for a full bucket.
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill_locked(now)
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                else:
+                    delay = (amount - self._tokens) / self.rate
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or take (negative) tokens, e.g. estimate vs real usage."""
+        with self._lock:
+            self._refill_locked(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for `seconds` (upstream asked everyone to back off)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+# ------------------------------------------------------------
+# Circuit breaker
+# ------------------------------------------------------------
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed."""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(max(0.0, self._opened_at + self.reset_seconds - now))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Model circuit closed")
+            self.state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Model circuit open after %d failures", self._failures)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """A probe ended without telling us anything (e.g. a 400); let the next call probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+# ------------------------------------------------------------
+# Shared guard
+# ------------------------------------------------------------
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status of a google-genai APIError (or anything with .code / .status_code)."""
+    for attribute in ("code", "status_code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header or a RetryInfo `retryDelay` in the error body."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for item in (details.get("error") or {}).get("details", []) or []:
+            if isinstance(item, dict) and str(item.get("@type", "")).endswith("RetryInfo"):
+                match = re.match(r"([\d.]+)s", str(item.get("retryDelay", "")))
+                if match:
+                    return float(match.group(1))
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # httpx transport errors (connect/read timeouts, resets) have no status.
+    return type(error).__module__.startswith("httpx")
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Retryable errors that mean the upstream is unhealthy (everything but a 429)."""
+    return is_retryable(error) and error_status(error) != RATE_LIMITED_STATUS
+
+
+class ModelGuard:
+    """Limiter + retry policy + circuit breaker shared by every GuardedLlm."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60.0,
+        tokens_per_minute: float = 1_000_000.0,
+        attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 20.0,
+        max_wait: float = 60.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {
+            "calls": 0, "attempts": 0, "retries": 0, "rate_limited": 0,
+            "failures": 0, "circuit_rejections": 0, "limiter_wait_s": 0.0, "backoff_s": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "ModelGuard":
+        return cls(
+            requests_per_minute=_env_float("MODEL_RPM", 60),
+            tokens_per_minute=_env_float("MODEL_TPM", 1_000_000),
+            attempts=int(_env_float("MODEL_RETRY_ATTEMPTS", 4)),
+            base_delay=_env_float("MODEL_RETRY_BASE_DELAY", 1.0),
+            max_delay=_env_float("MODEL_RETRY_MAX_DELAY", 20.0),
+            max_wait=_env_float("MODEL_RETRY_MAX_WAIT", 60.0),
+            failure_threshold=int(_env_float("BREAKER_FAILURE_THRESHOLD", 5)),
+            reset_seconds=_env_float("BREAKER_RESET_SECONDS", 30.0),
+        )
+
+    def count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[key] += amount
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Delay before retry number `attempt` (1-based): Retry-After or full jitter."""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # Everyone waits, with a little jitter so they do not return in lockstep.
+            self.requests.pause(retry_after)
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def admit(self, estimated_tokens: float) -> None:
+        """Fail fast if the circuit is open, then wait for request and token budget."""
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.count("circuit_rejections")
+            raise
+        waited = await self.requests.acquire(1)
+        waited += await self.tokens.acquire(estimated_tokens)
+        self.count("limiter_wait_s", waited)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["limiter_wait_s"] = round(counters["limiter_wait_s"], 3)
+        counters["backoff_s"] = round(counters["backoff_s"], 3)
+        counters["circuit"] = self.breaker.state
+        return counters
+
+
+_default_guard: Optional[ModelGuard] = None
+_default_guard_lock = threading.Lock()
+
+
+def default_guard() -> ModelGuard:
+    """The process-wide guard every agent package shares (configured from env)."""
+    global _default_guard
+    with _default_guard_lock:
+        if _default_guard is None:
+            _default_guard = ModelGuard.from_env()
+        return _default_guard
+
+
+# ------------------------------------------------------------
+# Model wrapper
+# ------------------------------------------------------------
+
+def estimate_tokens(llm_request: LlmRequest) -> float:
+    """Rough prompt size (~4 characters per token) plus the output allowance."""
+    chars = 0
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            chars += len(part.text or "")
+    config = llm_request.config
+    if config is not None and isinstance(config.system_instruction, str):
+        chars += len(config.system_instruction)
+    max_output = getattr(config, "max_output_tokens", None) or 0
+    return chars / 4 + max_output
+
+
+class GuardedLlm(BaseLlm):
+    """Model wrapper that routes every call through a shared ModelGuard."""
+
+    inner: BaseLlm
+    guard: Any = None  # ModelGuard; default_guard() when unset
+
+    @classmethod
+    def wrap(cls, model: Any, guard: Optional[ModelGuard] = None) -> "GuardedLlm":
+        """Wrap a model name (resolved through ADK's registry) or a BaseLlm."""
+        inner = LLMRegistry.new_llm(model) if isinstance(model, str) else model
+        return cls(model=inner.model, inner=inner, guard=guard)
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        if self.guard is None:
+            self.guard = default_guard()
+
+    @property
+    def capabilities(self) -> Any:
+        return self.inner.capabilities
+
+    def connect(self, llm_request: LlmRequest) -> Any:
+        return self.inner.connect(llm_request)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        guard = self.guard
+        guard.count("calls")
+        estimate = estimate_tokens(llm_request)
+        waited = 0.0
+        attempt = 0
+        while True:
+            attempt += 1
+            await guard.admit(estimate)
+            guard.count("attempts")
+            yielded = False
+            used_tokens = None
+            try:
+                async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                    if response.usage_metadata and response.usage_metadata.total_token_count:
+                        used_tokens = response.usage_metadata.total_token_count
+                    yielded = True
+                    yield response
+            except BaseException as error:
+                if not isinstance(error, Exception):  # cancelled or closed mid-call
+                    guard.breaker.release_probe()
+                    raise
+                retryable = is_retryable(error)
+                if is_upstream_failure(error):
+                    guard.breaker.record_failure()
+                    guard.count("failures")
+                else:
+                    guard.breaker.release_probe()
+                    if retryable:
+                        guard.count("rate_limited")
+                # Partial streams cannot be replayed; neither can non-transient errors.
+                if not retryable or yielded or attempt >= guard.attempts:
+                    raise
+                delay = guard.backoff(attempt, error)
+                if waited + delay > guard.max_wait:
+                    raise
+                logger.info("Retrying %s in %.1fs after %s (attempt %d)", self.model, delay, error, attempt)
+                guard.count("retries")
+                guard.count("backoff_s", delay)
+                waited += delay
+                await asyncio.sleep(delay)
+                continue
+            guard.breaker.record_success()
+            if used_tokens is not None:
+                guard.tokens.adjust(estimate - used_tokens)
+            return
@@ -0,0 +1,103 @@
+"""
+Single-flight request coalescing for async calls and AgentTool sub-agents.
+
+When many sessions ask the same question at the same moment (e.g. the
+USD->EUR rate), each of them would start its own search-backed model call.
+`SingleFlight.do(key, fn)` runs `fn` once per key while a call for that key
+is in flight; every concurrent caller with the same key awaits the same
+result (or the same exception). Once the call finishes the key is released,
+so later callers start a fresh call - this is coalescing, not caching.
+
+- The shared call runs as its own task: a caller that is cancelled does not
+  cancel the call for the others.
+- `stats` counts requests, executed (upstream) calls and coalesced calls.
+
+`SingleFlightAgentTool` is a drop-in `AgentTool` that coalesces concurrent
+calls with the same key (by default: the normalized tool arguments). Only the
+caller that started the call gets the sub-agent's state changes and
+artifacts; coalesced callers get its result. Use it for sub-agents whose
+answer is the result, not side effects.
+
+Usage:
+    fetcher_tool = SingleFlightAgentTool(agent=fetcher, key_fn=lambda args: ...)
+    root_agent = LlmAgent(..., tools=[fetcher_tool])
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.tools import AgentTool, ToolContext
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls that share a key."""
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._in_flight: Dict[Tuple[int, Hashable], "asyncio.Task"] = {}
+        self.stats: Dict[str, int] = {"requests": 0, "executed": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return fn()'s result, sharing one in-flight call per key."""
+        loop = asyncio.get_running_loop()
+        # Tasks belong to one event loop; keep their keys apart.
+        slot = (id(loop), key)
+        self.stats["requests"] += 1
+        task = self._in_flight.get(slot)
+        if task is None:
+            task = loop.create_task(fn())
+            self._in_flight[slot] = task
+            task.add_done_callback(lambda done: self._release(slot, done))
+            self.stats["executed"] += 1
+        else:
+            self.stats["coalesced"] += 1
+            logger.debug("%s: coalesced call for %r", self.name, key)
+        return await asyncio.shield(task)
+
+    def _release(self, slot: Tuple[int, Hashable], task: "asyncio.Task") -> None:
+        if self._in_flight.get(slot) is task:
+            del self._in_flight[slot]
+        if not task.cancelled():
+            task.exception()  # Retrieved here so an error nobody awaited is not logged as lost.
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def coalesce_rate(self) -> float:
+        requests = self.stats["requests"]
+        return round(self.stats["coalesced"] / requests, 4) if requests else 0.0
+
+
+def default_key(args: Dict[str, Any]) -> str:
+    """Tool arguments with case and whitespace normalized."""
+    normalized = {
+        key: " ".join(value.lower().split()) if isinstance(value, str) else value
+        for key, value in args.items()
+    }
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+class SingleFlightAgentTool(AgentTool):
+    """AgentTool that shares one sub-agent run among concurrent identical calls."""
+
+    def __init__(
+        self,
+        agent: BaseAgent,
+        key_fn: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+        flight: Optional[SingleFlight] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(agent=agent, **kwargs)
+        self.key_fn = key_fn or default_key
+        self.flight = flight or SingleFlight(name=agent.name)
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        key = (self.name, self.key_fn(args))
+        run = super().run_async
+        return await self.flight.do(key, lambda: run(args=args, tool_context=tool_context))
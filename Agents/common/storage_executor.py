@@ -0,0 +1,87 @@
+"""
+Non-blocking storage for tool functions running under `adk api_server`.
+
+ADK awaits async tools on the server's event loop, but the storage tools in
+memory_demo and session_demo do blocking file/SQLite I/O. Calling them directly
+stalls every concurrent session while one disk write completes. This module
+moves that work off the event loop:
+
+- reads run on a bounded thread pool (STORAGE_READ_THREADS, default 8)
+- writes go through a single writer thread, so mutations are applied one at a
+  time in arrival order and concurrent writers can never interleave inside a
+  storage file. Writes to `AppendLogStorage` files are applied on the writer
+  and then awaited for their fsync on the event loop, so the writer moves on
+  to the next mutation and queued writes still share one group commit
+
+Calls made during a profiled run (common/profiling.py) are sampled on the
+worker thread that runs them.
+
+Wrap a synchronous tool with `read_tool` / `write_tool` to get an async variant
+that keeps the original name, docstring and signature (so ADK builds the same
+function declaration):
+
+    tools=[write_tool(save_memory), read_tool(search_memories)]
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from .log_storage import deferred_durability
+from .profiling import for_worker_thread
+
+
+class StorageExecutor:
+    """Bounded read pool plus a single-writer queue for blocking storage calls."""
+
+    def __init__(self, max_readers: int = 8):
+        self.max_readers = max_readers
+        self._readers = ThreadPoolExecutor(max_workers=max_readers, thread_name_prefix="storage-read")
+        # A one-thread pool is a FIFO queue drained by a single writer.
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-write")
+        self.stats: Dict[str, int] = {"reads": 0, "writes": 0}
+
+    async def read(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self.stats["reads"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, for_worker_thread(functools.partial(fn, *args, **kwargs)))
+
+    async def write(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self.stats["writes"] += 1
+        loop = asyncio.get_running_loop()
+
+        def apply() -> Any:
+            with deferred_durability() as tickets:
+                return fn(*args, **kwargs), tickets
+
+        result, tickets = await loop.run_in_executor(self._writer, for_worker_thread(apply))
+        if tickets:
+            await asyncio.gather(*(asyncio.wrap_future(storage.durable(seq)) for storage, seq in tickets))
+        return result
+
+    def shutdown(self) -> None:
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+
+
+storage_executor = StorageExecutor(int(os.environ.get("STORAGE_READ_THREADS", "8")))
+
+
+def _async_tool(fn: Callable[..., Any], run: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def read_tool(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Async variant of a read-only storage tool (runs on the read pool)."""
+    return _async_tool(fn, storage_executor.read)
+
+
+def write_tool(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Async variant of a mutating storage tool (runs on the single writer)."""
+    return _async_tool(fn, storage_executor.write)
@@ -0,0 +1,780 @@
+"""
+Per-invocation tracing and Prometheus metrics for agents, models and tools.
+
+`tracer` is an ADK plugin: `app = tracer.app("<package>", root_agent)` wraps
+the package's root agent in the `App` that `adk api_server` loads, with the
+tracer registered once for the whole runner. Every agent the runner reaches
+is traced (sub-agents, agents built at runtime, and AgentTool runs, which
+inherit the parent runner's plugins). Each run becomes one trace of nested
+spans:
+
+    invocation <app>
+      agent <root agent>
+        agent <sub-agent>
+          model <model name>       tokens, request/response bytes
+          tool <tool name>         argument/response bytes
+            invocation ...         an AgentTool's own run, same trace
+
+Spans carry their duration, token counts (prompt, completion, cached) and
+payload sizes (text length, JSON length of function call arguments and
+responses). The model request size counts the whole conversation, but only the
+contents added since the agent's previous call in the run are measured, so the
+history is not re-encoded on every call. The current span is kept in a
+ContextVar, so fan-out branches and AgentTool runs (which start their own
+invocation) nest under the agent or tool that started them.
+
+ADK runs plugin callbacks before an agent's own callbacks, so model and tool
+spans also cover the agent's before-callbacks. A response served by a
+before-model callback (e.g. the model cache) never reaches the model: its span
+is dropped, not recorded as a model call.
+
+On the event loop the tracer only opens and closes spans: a plugin callback is
+one direct call per event (per-agent callback lists are dispatched, and in
+newer ADK releases signature-checked, on every agent), spans are found by the
+id of the agent's InvocationContext, and payloads are kept by reference.
+Measuring payloads, updating /metrics and encoding OTLP/JSON happen when a
+finished trace is processed, in batches on a background thread every
+TRACE_EXPORT_INTERVAL seconds (default 2), so /metrics lags by up to that.
+
+Exports:
+- TRACE_EXPORT_DIR: finished traces are appended as OTLP/JSON
+  (ExportTraceServiceRequest, one per line) to `traces-<date>.jsonl`, the
+  layout the OpenTelemetry Collector's `otlpjsonfile` receiver reads
+- TRACE_METRICS_PORT (e.g. 9464): Prometheus text format on
+  http://<TRACE_METRICS_HOST>:<port>/metrics next to the api_server:
+  span duration histograms and error counts per kind/agent/name, token and
+  payload byte counters, traces processed and spans still open
+
+TRACING=0 registers no plugin. Spans of a run that never finishes are exported
+as unfinished once more than TRACE_MAX_OPEN_TRACES runs are open.
+
+Usage (at the end of <package>/agent.py):
+    from common.tracing import tracer
+    app = tracer.app("my_agent", root_agent)
+"""
+
+import atexit
+import contextvars
+import json
+import math
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.apps import App
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.tool_context import ToolContext
+
+TRACING_ENABLED = os.environ.get("TRACING", "1") != "0"
+DEFAULT_EXPORT_DIR = os.environ.get("TRACE_EXPORT_DIR", "")
+DEFAULT_EXPORT_INTERVAL = float(os.environ.get("TRACE_EXPORT_INTERVAL", "2"))
+DEFAULT_METRICS_PORT = os.environ.get("TRACE_METRICS_PORT", "")
+DEFAULT_METRICS_HOST = os.environ.get("TRACE_METRICS_HOST", "127.0.0.1")
+DEFAULT_MAX_OPEN_TRACES = int(os.environ.get("TRACE_MAX_OPEN_TRACES", "1000"))
+SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "adk-agents")
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("adk_current_span", default=None)
+
+
+class Span:
+    """One timed operation; `trace` collects the spans of a run.
+
+    `request`/`response` hold the payloads (tool arguments and result, the
+    model's new request contents and response content) until the trace is
+    processed; `previous` is the agent's previous model span in the run, whose
+    request size the new contents add to. Sizes and token counts are plain
+    slots (None when not measured); other attributes go into `attributes`.
+    `key` is the span's entry in the tracer's open-span dict while it runs.
+    IDs are assigned when the trace is exported.
+    """
+
+    __slots__ = ("trace", "parent", "kind", "name", "agent", "key", "start_ns", "end_ns", "attributes", "error",
+                 "request", "response", "previous", "request_bytes", "response_bytes",
+                 "input_tokens", "output_tokens", "cached_tokens")
+
+    def __init__(self, trace: "Trace", parent: Optional["Span"], kind: str, name: str, agent: str, key: Any,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.parent = parent
+        self.kind = kind
+        self.name = name
+        self.agent = agent
+        self.key = key
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.request: Any = None
+        self.response: Any = None
+        self.previous: Optional[Span] = None
+        self.request_bytes: Optional[int] = None
+        self.response_bytes: Optional[int] = None
+        self.input_tokens: Optional[int] = None
+        self.output_tokens: Optional[int] = None
+        self.cached_tokens: Optional[int] = None
+        trace.spans.append(self)
+
+    @property
+    def duration(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, key: str, value: Any) -> None:
+        if self.attributes is None:
+            self.attributes = {}
+        self.attributes[key] = value
+
+
+class Trace:
+    """The spans of one top-level run, its invocations and each agent's last model call."""
+
+    __slots__ = ("root", "spans", "ended", "invocations", "model_calls", "unfinished")
+
+    def __init__(self):
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+        self.ended = 0
+        self.invocations: List[str] = []
+        # (invocation, branch, agent) -> (contents count, model span) of that agent's previous model call
+        self.model_calls: Dict[Tuple[str, Optional[str], str], Tuple[int, Span]] = {}
+        self.unfinished = False
+
+    def release(self) -> None:
+        # Spans point back at their trace; dropping the list lets refcounting free a
+        # finished trace instead of leaving a cycle for the garbage collector.
+        self.spans = []
+        self.model_calls = {}
+
+
+class Tracer(BasePlugin):
+    """Plugin-based span recorder with OTLP/JSON file export and Prometheus metrics."""
+
+    def __init__(
+        self,
+        export_dir: str = DEFAULT_EXPORT_DIR,
+        export_interval: float = DEFAULT_EXPORT_INTERVAL,
+        metrics_port: str = DEFAULT_METRICS_PORT,
+        metrics_host: str = DEFAULT_METRICS_HOST,
+        max_open_traces: int = DEFAULT_MAX_OPEN_TRACES,
+    ):
+        super().__init__(name="tracing")
+        self.enabled = TRACING_ENABLED
+        self.export_dir = export_dir
+        self.export_interval = export_interval
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.max_open_traces = max_open_traces
+        # Open spans. ADK gives each agent run its own InvocationContext and hands that same
+        # object to the agent's model and tool callbacks, so its id() keys agent and model spans.
+        self._agents: Dict[int, Span] = {}
+        self._models: Dict[int, Span] = {}
+        self._tools: Dict[str, Span] = {}  # by function call id
+        # invocation_id -> (trace, invocation span); ordered oldest first
+        self._invocations: "OrderedDict[str, Tuple[Trace, Span]]" = OrderedDict()
+        self.metrics = Metrics()
+        self.stats: Dict[str, int] = {"traces": 0, "spans": 0, "unfinished": 0, "exported": 0, "export_errors": 0}
+        self._processor: Optional[_Processor] = None
+        self._metrics_server: Optional[ThreadingHTTPServer] = None
+
+    # ------------------------------------------------------------
+    # Installation
+    # ------------------------------------------------------------
+
+    def app(self, name: str, root_agent: Any) -> App:
+        """The `App` for agent package `name` (its folder name), with this tracer as a plugin."""
+        if not TRACING_ENABLED:
+            return App(name=name, root_agent=root_agent)
+        self.start_exports()
+        return App(name=name, root_agent=root_agent, plugins=[self])
+
+    def start_exports(self) -> None:
+        """Start the trace processing thread and the metrics endpoint configured for this tracer (once)."""
+        if self._processor is None:
+            self._processor = _Processor(self, self.export_dir, self.export_interval)
+        if self.metrics_port and self._metrics_server is None:
+            self._metrics_server = start_metrics_server(self, int(self.metrics_port), self.metrics_host)
+
+    # ------------------------------------------------------------
+    # Run callbacks
+    # ------------------------------------------------------------
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        if not self.enabled:
+            return None
+        ctx = invocation_context
+        current = _current_span.get()
+        # An AgentTool's run starts inside its (still open) tool span: same trace.
+        nested = current is not None and not current.end_ns
+        trace = current.trace if nested else Trace()
+        invocation = Span(trace, current if nested else None, "invocation", ctx.app_name, ctx.agent.name,
+                          ctx.invocation_id, {
+                              "adk.app_name": ctx.app_name,
+                              "adk.invocation_id": ctx.invocation_id,
+                              "adk.session_id": ctx.session.id,
+                              "adk.user_id": ctx.user_id,
+                          })
+        if trace.root is None:
+            trace.root = invocation
+            self.stats["traces"] += 1
+        trace.invocations.append(ctx.invocation_id)
+        self._invocations[ctx.invocation_id] = (trace, invocation)
+        _current_span.set(invocation)
+        if len(self._invocations) > self.max_open_traces:
+            self._finish(self._invocations[next(iter(self._invocations))][0], unfinished=True)
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        if not self.enabled:
+            return None
+        entry = self._invocations.pop(invocation_context.invocation_id, None)
+        if entry is None:
+            return None
+        trace, invocation = entry
+        self._end(invocation)
+        _current_span.set(invocation.parent)
+        if invocation is trace.root:
+            self._finish(trace)
+        return None
+
+    # ------------------------------------------------------------
+    # Agent callbacks
+    # ------------------------------------------------------------
+
+    async def before_agent_callback(self, *, agent: Any, callback_context: CallbackContext) -> None:
+        if not self.enabled:
+            return None
+        ctx = callback_context._invocation_context
+        entry = self._invocations.get(ctx.invocation_id)
+        if entry is None:
+            return None
+        trace, invocation = entry
+        current = _current_span.get()
+        parent = current if current is not None and current.trace is trace else invocation
+        key = id(ctx)
+        span = self._agents[key] = Span(trace, parent, "agent", agent.name, agent.name, key)
+        _current_span.set(span)
+        return None
+
+    async def after_agent_callback(self, *, agent: Any, callback_context: CallbackContext) -> None:
+        if not self.enabled:
+            return None
+        key = id(callback_context._invocation_context)
+        span = self._agents.pop(key, None)
+        if span is None:
+            return None
+        if key in self._models:
+            self._drop(self._models.pop(key))
+        self._end(span)
+        _current_span.set(span.parent)
+        return None
+
+    # ------------------------------------------------------------
+    # Model callbacks
+    # ------------------------------------------------------------
+
+    async def before_model_callback(self, *, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        if not self.enabled:
+            return None
+        ctx = callback_context._invocation_context
+        key = id(ctx)
+        parent = self._agents.get(key)
+        if parent is None:
+            return None
+        if key in self._models:
+            # The previous call never reached after_model: a before-model callback answered it.
+            self._drop(self._models.pop(key))
+        trace = parent.trace
+        span = self._models[key] = Span(trace, parent, "model", llm_request.model or "", parent.agent, key)
+        # Within a run an agent's history only grows: keep just the contents added since its last call.
+        contents = llm_request.contents
+        calls_key = (ctx.invocation_id, ctx.branch, parent.agent)
+        previous = trace.model_calls.get(calls_key)
+        if previous is not None and previous[0] <= len(contents):
+            span.request = contents[previous[0]:]
+            span.previous = previous[1]
+        else:
+            span.request = list(contents)
+        trace.model_calls[calls_key] = (len(contents), span)
+        return None
+
+    async def after_model_callback(self, *, callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+        if not self.enabled:
+            return None
+        key = id(callback_context._invocation_context)
+        if llm_response.partial:
+            # Streaming: remember the first chunk, end the span on the final response.
+            span = self._models.get(key)
+            if span is not None and not (span.attributes and "adk.first_chunk_ms" in span.attributes):
+                span.set("adk.first_chunk_ms", round((time.time_ns() - span.start_ns) / 1e6, 3))
+            return None
+        span = self._models.pop(key, None)
+        if span is None:
+            return None
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            span.input_tokens = usage.prompt_token_count or 0
+            span.output_tokens = usage.candidates_token_count or 0
+            span.cached_tokens = usage.cached_content_token_count or 0
+        span.response = llm_response.content
+        if llm_response.finish_reason is not None:
+            span.set("gen_ai.response.finish_reason", str(llm_response.finish_reason.value))
+        if llm_response.error_code:
+            span.error = f"{llm_response.error_code}: {llm_response.error_message or ''}".strip()
+        self._end(span)
+        return None
+
+    async def on_model_error_callback(self, *, callback_context: CallbackContext, llm_request: LlmRequest,
+                                      error: Exception) -> None:
+        if not self.enabled:
+            return None
+        span = self._models.pop(id(callback_context._invocation_context), None)
+        if span is not None:
+            span.error = f"{type(error).__name__}: {error}"
+            self._end(span)
+        return None
+
+    # ------------------------------------------------------------
+    # Tool callbacks
+    # ------------------------------------------------------------
+
+    async def before_tool_callback(self, *, tool: Any, tool_args: Dict[str, Any], tool_context: ToolContext) -> None:
+        if not self.enabled:
+            return None
+        parent = self._agents.get(id(tool_context._invocation_context))
+        if parent is None:
+            return None
+        call_id = tool_context.function_call_id or ""
+        span = self._tools[call_id] = Span(parent.trace, parent, "tool", tool.name, parent.agent, call_id,
+                                           {"gen_ai.tool.call.id": call_id})
+        span.request = tool_args
+        # Tools run in their own task per call, so an AgentTool's run nests under this span.
+        _current_span.set(span)
+        return None
+
+    async def after_tool_callback(self, *, tool: Any, tool_args: Dict[str, Any], tool_context: ToolContext,
+                                  result: Any) -> None:
+        if not self.enabled:
+            return None
+        span = self._tools.pop(tool_context.function_call_id or "", None)
+        if span is None:
+            return None
+        # What the tool returned; an after-tool callback may still shrink what the model sees.
+        span.response = result
+        if isinstance(result, dict) and result.get("status") == "error":
+            span.error = str(result.get("error_message") or result.get("message") or "status: error")
+        self._end(span)
+        _current_span.set(span.parent)
+        return None
+
+    async def on_tool_error_callback(self, *, tool: Any, tool_args: Dict[str, Any], tool_context: ToolContext,
+                                     error: Exception) -> None:
+        if not self.enabled:
+            return None
+        span = self._tools.pop(tool_context.function_call_id or "", None)
+        if span is not None:
+            span.error = f"{type(error).__name__}: {error}"
+            self._end(span)
+            _current_span.set(span.parent)
+        return None
+
+    # ------------------------------------------------------------
+    # Span bookkeeping
+    # ------------------------------------------------------------
+
+    def _end(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        span.trace.ended += 1
+
+    def _drop(self, span: Span) -> None:
+        span.trace.spans.remove(span)
+
+    def _finish(self, trace: Trace, unfinished: bool = False) -> None:
+        """Close what is still open in `trace`, forget its open-span entries and hand it to processing."""
+        if trace.ended < len(trace.spans):
+            end_ns = time.time_ns()
+            open_spans = {"agent": self._agents, "model": self._models, "tool": self._tools}
+            for span in trace.spans:
+                if span.end_ns:
+                    continue
+                # Its end callback never ran: a before-agent callback answered for the agent
+                # (e.g. a checkpoint restore), or the run is still going (`unfinished`).
+                span.end_ns = end_ns
+                span.set("adk.closed_with_trace", True)
+                entries = open_spans.get(span.kind)
+                if entries is not None and entries.get(span.key) is span:
+                    del entries[span.key]
+        for invocation_id in trace.invocations:
+            self._invocations.pop(invocation_id, None)
+        if unfinished:
+            trace.unfinished = True
+            self.stats["unfinished"] += 1
+        self.stats["spans"] += len(trace.spans)
+        if self._processor is not None:
+            self._processor.submit(trace)
+        else:
+            self.process(trace)
+            trace.release()
+
+    def process(self, trace: Trace) -> None:
+        """Measure the payloads of a finished trace and add its spans to the metrics."""
+        sizes = _PayloadSizes()
+        for span in trace.spans:
+            _measure(span, sizes)
+            # Spans closed with their trace have no real end, except the root of an unfinished run.
+            if not (span.attributes and "adk.closed_with_trace" in span.attributes) or (
+                    trace.unfinished and span is trace.root):
+                self.metrics.observe(span)
+        self.metrics.traces += 1
+
+    def open_spans(self) -> int:
+        return len(self._agents) + len(self._models) + len(self._tools) + len(self._invocations)
+
+
+# ============================================================================
+# Prometheus metrics
+# ============================================================================
+
+class _Series:
+    """Everything /metrics reports for one (kind, agent, name): duration histogram, errors, tokens, bytes."""
+
+    __slots__ = ("buckets", "seconds", "errors", "input_tokens", "output_tokens", "cached_tokens",
+                 "request_bytes", "response_bytes", "has_tokens")
+
+    def __init__(self):
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.seconds = 0.0
+        self.errors = 0
+        self.input_tokens = self.output_tokens = self.cached_tokens = 0
+        self.request_bytes = self.response_bytes = 0
+        self.has_tokens = False
+
+
+class Metrics:
+    """Per-(kind, agent, name) series rendered in Prometheus text format.
+
+    `observe` runs on the processing thread for every span and takes no lock: one
+    dict lookup and a few integer updates. The metrics thread renders from a
+    snapshot of the series dict (copying a dict is atomic under the GIL); a scrape
+    may see a span's duration but not yet its tokens, which the next scrape corrects.
+    """
+
+    def __init__(self):
+        self.series: Dict[Tuple[str, str, str], _Series] = {}
+        self.traces = 0
+
+    def observe(self, span: Span) -> None:
+        labels = (span.kind, span.agent, span.name)
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = _Series()
+        seconds = (span.end_ns - span.start_ns) / 1e9
+        series.buckets[bisect_left(DURATION_BUCKETS, seconds)] += 1
+        series.seconds += seconds
+        if span.error is not None:
+            series.errors += 1
+        if span.input_tokens is not None:
+            series.has_tokens = True
+            series.input_tokens += span.input_tokens
+            series.output_tokens += span.output_tokens
+            series.cached_tokens += span.cached_tokens
+        if span.request_bytes:
+            series.request_bytes += span.request_bytes
+        if span.response_bytes:
+            series.response_bytes += span.response_bytes
+
+    def render(self, open_spans: int = 0) -> str:
+        series = sorted(dict(self.series).items())
+        lines = [
+            "# HELP adk_span_duration_seconds Duration of invocations, agent runs, model calls and tool calls.",
+            "# TYPE adk_span_duration_seconds histogram",
+        ]
+        for (kind, agent, name), entry in series:
+            labels = f'kind="{kind}",agent="{_escape(agent)}",name="{_escape(name)}"'
+            cumulative = 0
+            for index, bound in enumerate(DURATION_BUCKETS):
+                cumulative += entry.buckets[index]
+                lines.append(f'adk_span_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += entry.buckets[len(DURATION_BUCKETS)]
+            lines.append(f'adk_span_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"adk_span_duration_seconds_sum{{{labels}}} {entry.seconds:.6f}")
+            lines.append(f"adk_span_duration_seconds_count{{{labels}}} {cumulative}")
+        lines += ["# HELP adk_span_errors_total Spans that ended with an error.",
+                  "# TYPE adk_span_errors_total counter"]
+        for (kind, agent, name), entry in series:
+            if entry.errors:
+                lines.append(f'adk_span_errors_total{{kind="{kind}",agent="{_escape(agent)}",'
+                             f'name="{_escape(name)}"}} {entry.errors}')
+        lines += ["# HELP adk_model_tokens_total Model tokens by agent, model and type (input, output, cached).",
+                  "# TYPE adk_model_tokens_total counter"]
+        for (_, agent, model), entry in series:
+            if entry.has_tokens:
+                for token_type, count in (("cached", entry.cached_tokens), ("input", entry.input_tokens),
+                                          ("output", entry.output_tokens)):
+                    lines.append(f'adk_model_tokens_total{{agent="{_escape(agent)}",model="{_escape(model)}",'
+                                 f'type="{token_type}"}} {count}')
+        lines += ["# HELP adk_payload_bytes_total Model/tool request and response payload bytes.",
+                  "# TYPE adk_payload_bytes_total counter"]
+        for (kind, agent, name), entry in series:
+            for direction, size in (("request", entry.request_bytes), ("response", entry.response_bytes)):
+                if size:
+                    lines.append(f'adk_payload_bytes_total{{kind="{kind}",agent="{_escape(agent)}",'
+                                 f'name="{_escape(name)}",direction="{direction}"}} {size}')
+        lines += ["# HELP adk_traces_total Runs finished and processed.",
+                  "# TYPE adk_traces_total counter",
+                  f"adk_traces_total {self.traces}",
+                  "# HELP adk_open_spans Spans and invocations currently open.",
+                  "# TYPE adk_open_spans gauge",
+                  f"adk_open_spans {open_spans}"]
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(tracer: Tracer, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve `tracer.metrics` at http://host:port/metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.metrics.render(tracer.open_spans()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="trace-metrics", daemon=True).start()
+    return server
+
+
+# ============================================================================
+# Trace processing and OTLP/JSON file export
+# ============================================================================
+
+class _Processor:
+    """Processes finished traces in batches from a background thread: measure, aggregate, export."""
+
+    def __init__(self, tracer: Tracer, directory: str, interval: float):
+        self.tracer = tracer
+        self.directory = directory
+        self.interval = interval
+        # deque.append is atomic, so the event loop hands traces over without taking a lock.
+        self._pending: "deque[Trace]" = deque()
+        self._stop = threading.Event()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="trace-processor", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, trace: Trace) -> None:
+        self._pending.append(trace)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._drain()
+        self._drain()
+
+    def _drain(self) -> None:
+        batch: List[Trace] = []
+        while self._pending:
+            batch.append(self._pending.popleft())
+        if not batch:
+            return
+        for trace in batch:
+            self.tracer.process(trace)
+        if self.directory:
+            self._write(batch)
+        for trace in batch:
+            trace.release()
+
+    def _write(self, batch: List[Trace]) -> None:
+        path = os.path.join(self.directory, f"traces-{time.strftime('%Y%m%d')}.jsonl")
+        try:
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write("".join(otlp_json(trace) + "\n" for trace in batch))
+            self.tracer.stats["exported"] += len(batch)
+        except OSError:
+            self.tracer.stats["export_errors"] += len(batch)
+
+
+def otlp_json(trace: Trace) -> str:
+    """One ExportTraceServiceRequest (OTLP/JSON encoding) holding the spans of `trace`, as compact JSON.
+
+    Written out directly rather than built as dicts for json.dumps, with the
+    per-series part of each span (name, kind, label attributes) encoded once.
+    Durations are the difference of the start and end times, as in any OTLP span.
+    """
+    count = len(trace.spans)
+    ids = random.getrandbits(64 * (count + 2)).to_bytes(8 * (count + 2), "big").hex()
+    trace_id = ids[:32]
+    span_ids = {id(span): ids[32 + 16 * index:48 + 16 * index] for index, span in enumerate(trace.spans)}
+    spans = []
+    for span in trace.spans:
+        labels = _series_json.get((span.kind, span.agent, span.name))
+        if labels is None:
+            labels = _series_json[(span.kind, span.agent, span.name)] = _span_labels(span)
+        attributes = [labels]
+        for key, value in (("adk.payload.request_bytes", span.request_bytes),
+                           ("adk.payload.response_bytes", span.response_bytes),
+                           ("gen_ai.usage.input_tokens", span.input_tokens),
+                           ("gen_ai.usage.output_tokens", span.output_tokens),
+                           ("gen_ai.usage.cached_tokens", span.cached_tokens)):
+            if value is not None:
+                attributes.append(f'{{"key":"{key}","value":{{"intValue":"{value}"}}}}')
+        if span.attributes:
+            attributes += [_attribute(key, value) for key, value in span.attributes.items()]
+        parent = f'"parentSpanId":"{span_ids[id(span.parent)]}",' if span.parent is not None else ""
+        status = '{"code":1}' if span.error is None else f'{{"code":2,"message":{_quote(span.error)}}}'
+        spans.append(
+            f'{{"traceId":"{trace_id}","spanId":"{span_ids[id(span)]}",{parent}'
+            f'"startTimeUnixNano":"{span.start_ns}","endTimeUnixNano":"{span.end_ns}",'
+            f'{",".join(attributes)}],"status":{status}}}'
+        )
+    return (f'{{"resourceSpans":[{{"resource":{{"attributes":[{_SERVICE_ATTRIBUTE}]}},'
+            f'"scopeSpans":[{{"scope":{{"name":"common.tracing"}},"spans":[{",".join(spans)}]}}]}}]}}')
+
+
+def _span_labels(span: Span) -> str:
+    """Name, kind and the opening of the attribute list with the label attributes of `span`'s series."""
+    attributes = [_attribute("adk.span.kind", span.kind), _attribute("adk.agent.name", span.agent)]
+    if span.kind == "model":
+        attributes += [_attribute("gen_ai.operation.name", "generate_content"),
+                       _attribute("gen_ai.request.model", span.name)]
+    elif span.kind == "tool":
+        attributes.append(_attribute("gen_ai.tool.name", span.name))
+    return (f'"name":{_quote(f"{span.kind} {span.name}")},'
+            f'"kind":{KIND_CLIENT if span.kind == "model" else KIND_INTERNAL},'
+            f'"attributes":[{",".join(attributes)}')
+
+
+def _attribute(key: str, value: Any) -> str:
+    """One OTLP KeyValue as JSON."""
+    if isinstance(value, bool):
+        typed = '{"boolValue":true}' if value else '{"boolValue":false}'
+    elif isinstance(value, int):
+        typed = f'{{"intValue":"{value}"}}'
+    elif isinstance(value, float) and math.isfinite(value):
+        typed = f'{{"doubleValue":{value!r}}}'
+    else:
+        typed = f'{{"stringValue":{_quote(str(value))}}}'
+    return f'{{"key":{_quote(key)},"value":{typed}}}'
+
+
+_quote = json.encoder.encode_basestring_ascii  # what json.dumps uses for strings
+# (kind, agent, name) -> _span_labels(); as many entries as /metrics has series. Processing thread only.
+_series_json: Dict[Tuple[str, str, str], str] = {}
+_SERVICE_ATTRIBUTE = _attribute("service.name", SERVICE_NAME)
+
+
+# ============================================================================
+# Helpers
+# ============================================================================
+
+def _measure(span: Span, sizes: "_PayloadSizes") -> None:
+    """Turn the payloads a span holds into sizes (once; a dropped model span is measured on demand)."""
+    if span.request_bytes is not None or span.request is None:
+        return
+    if span.kind == "model":
+        span.request_bytes = sizes.contents(span.request)
+        if span.previous is not None:
+            _measure(span.previous, sizes)
+            span.request_bytes += span.previous.request_bytes or 0
+        if span.response is not None:
+            span.response_bytes = sizes.contents((span.response,))
+    else:
+        span.request_bytes = sizes.json(span.request)
+        if span.response is not None:
+            span.response_bytes = sizes.tool_result(span.name, span.response)
+
+
+class _PayloadSizes:
+    """JSON lengths of the payloads of one trace, each payload encoded once.
+
+    The model's function call arguments reappear as the same object in the
+    agent's next request; a tool's result reappears there as an equal copy (or
+    as whatever an after-tool callback replaced it with), so it is matched by
+    tool name and ==. The trace's spans keep every payload alive while it is
+    processed, so ids are not reused.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[int, int] = {}
+        self._results: Dict[str, List[Tuple[Any, int]]] = {}
+
+    def json(self, value: Any) -> int:
+        size = self._by_id.get(id(value))
+        if size is None:
+            size = self._by_id[id(value)] = _json_bytes(value)
+        return size
+
+    def tool_result(self, name: str, value: Any) -> int:
+        size = self.json(value)
+        self._results.setdefault(name, []).append((value, size))
+        return size
+
+    def function_response(self, name: str, value: Any) -> int:
+        for result, size in self._results.get(name, ()):
+            try:
+                if result is value or result == value:
+                    return size
+            except (TypeError, ValueError):  # e.g. an array inside, whose == is elementwise
+                pass
+        return self.json(value)
+
+    def contents(self, contents: Any) -> int:
+        """Approximate wire size of Contents: text, inline data and function call/response JSON."""
+        size = 0
+        for content in contents:
+            for part in content.parts or ():
+                text = part.text
+                if text:
+                    size += len(text)
+                elif part.function_call is not None:
+                    size += self.json(part.function_call.args)
+                elif part.function_response is not None:
+                    size += self.function_response(part.function_response.name or "", part.function_response.response)
+                elif part.inline_data is not None and part.inline_data.data:
+                    size += len(part.inline_data.data)
+        return size
+
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _json_bytes(value: Any) -> int:
+    """Length of `value` as compact JSON (objects json can't encode count as their str())."""
+    try:
+        return len(_json_encoder.encode(value))
+    except ValueError:  # a circular reference
+        return len(str(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Shared by all agent packages in the process, so /metrics covers every app.
+tracer = Tracer()
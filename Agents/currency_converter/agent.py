@@ -1,13 +1,17 @@
-"""Currency Converter Agent using ADK Code Execution.
+"""Currency Converter Agent with a local exchange-rate cache.
 
-This agent uses Google's built-in code execution tool to perform currency conversions
-by executing Python code that fetches real-time exchange rates and calculates conversions.
+`currency_fetcher_agent` looks up exchange rates with Google Search. Every rate it
+returns is stored in a local cache (rates.py) with a TTL, and conversions are done
+by plain Python function tools. A repeated currency pair needs no search, and the
+arithmetic needs no model-generated code.
 
 Features:
-- Real-time exchange rate fetching via code execution
-- Support for multiple currency pairs
-- Historical rate queries
-- Currency information lookup
+- Real-time exchange rate fetching via Google Search (only on a cache miss)
+- Deterministic conversion tool (Decimal arithmetic, rounded to cents)
+- Single-flight fetcher: concurrent lookups of one pair share one search call
+- Bulk conversion tool: CSV/JSON rows, one lookup per pair, same rounding as convert_currency (bulk.py)
+- Rate cache with TTL and staleness metadata (CURRENCY_RATE_TTL_SECONDS)
+- Offline fixture rates for testing (CURRENCY_RATE_SOURCE=fixture)
 
 Run:
     adk run currency_converter
@@ -17,76 +21,201 @@ Web UI:
 Select agent: currency_converter
 Requires: google-adk installed & API key
 """
-from typing import Dict
-from google.genai import types
+import os
+import re
+from typing import Any, Dict, Optional
 
 from google.adk.agents import LlmAgent
-from google.adk.tools import google_search, AgentTool
-from google.adk.code_executors import BuiltInCodeExecutor
-from google.adk.models.google_llm import Gemini
+from google.adk.tools import google_search, BaseTool, ToolContext
+
+from common.models import get_model
+from common.profiling import profiler
+from common.single_flight import SingleFlightAgentTool, default_key
+from common.tracing import tracer
+
+from .bulk import convert_rows, parse_conversion_rows
+from .rates import (
+    ISO_CURRENCY_CODES, FixtureRateSource, RateCache, check_amount, convert_amount, normalize_currency,
+    parse_rate_payload,
+)
 
 MODEL = "gemini-2.0-flash"
 
-retry_config=types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504] # Retry on these HTTP errors
+# Models come from the shared client registry (common/models.py): one pooled HTTP client,
+# and every call goes through the process-wide rate limiter / retry / circuit breaker
+# (common/resilience.py) instead of per-instance retry options.
+
+RATE_SOURCE = os.environ.get("CURRENCY_RATE_SOURCE", "search")  # "search" or "fixture"
+rate_cache = RateCache(
+    path=os.environ.get("CURRENCY_RATE_CACHE", os.path.join(os.path.dirname(__file__), ".rate_cache.json")),
+    source=FixtureRateSource() if RATE_SOURCE == "fixture" else None,
 )
 
 
 currency_agent = LlmAgent(
     name="currency_fetcher_agent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
+    model=get_model("gemini-2.5-flash-lite"),
     instruction="""You are a helpful currency conversion assistant. You utilize google_search 
     fucntion to get uptodate currency exchange rates
-    return the base currency, target currency, exchange rates and return those values in a json format""",
+    return the base currency, target currency, exchange rates and return those values in a json format
+    like {"base_currency": "USD", "target_currency": "EUR", "exchange_rate": 0.92}""",
     tools=[google_search],
     description="Currency result fetch using google search for real-time exchange rates and calculations.",
 
 )
-calculation_agent = LlmAgent(
-      name="CalculationAgent",
-      model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-      ),
-      instruction="""You are a specialized calculator that ONLY responds with Python code. You are forbidden from providing any text, explanations, or conversational responses.
- 
-     Your task is to take a request for a calculation and translate it into a single block of Python code that calculates the answer.
-     
-     **RULES:**
-    1.  Your output MUST be ONLY a Python code block.
-    2.  Do NOT write any text before or after the code block.
-    3.  The Python code MUST calculate the result.
-    4.  The Python code MUST print the final result to stdout.
-    5.  You are PROHIBITED from performing the calculation yourself. Your only job is to generate the code that will perform the calculation.
-   
-    Failure to follow these rules will result in an error.
-       """,
-        code_executor=BuiltInCodeExecutor(),  # Use the built-in Code Executor Tool. This gives the agent code execution capabilities
-    )
+
+
+def rate_request_key(args: Dict[str, Any]) -> str:
+    """Fetcher requests for the same currency pair share one key ('USD/EUR').
+
+    Only a request naming exactly one pair of ISO currency codes gets a pair key;
+    "USD to EUR and GBP" or "GET THE USD rate" fall back to the full request text,
+    so they never share an answer with a plain "USD to EUR".
+    """
+    codes = []
+    for token in re.findall(r"\b[A-Z]{3}\b", args.get("request", "")):
+        if token in ISO_CURRENCY_CODES and token not in codes:
+            codes.append(token)
+    if len(codes) == 2:
+        return f"{codes[0]}/{codes[1]}"
+    return default_key(args)
+
+
+# Concurrent lookups of the same pair (many sessions asking USD->EUR at once)
+# share one search-backed fetcher call; see rate_fetcher_tool.flight.stats.
+rate_fetcher_tool = SingleFlightAgentTool(agent=currency_agent, key_fn=rate_request_key)
+
+
+# ============================================================
+# Rate Cache Tools
+# ============================================================
+
+def get_exchange_rate(
+    tool_context: ToolContext,
+    from_currency: str,
+    to_currency: str
+) -> Dict[str, Any]:
+    """
+    Look up a cached exchange rate (no search, no model call).
+    
+    Args:
+        from_currency: ISO code of the currency to convert from (e.g., 'USD')
+        to_currency: ISO code of the currency to convert to (e.g., 'EUR')
+    """
+    try:
+        quote = rate_cache.get(from_currency, to_currency, allow_stale=True)
+    except ValueError as exc:
+        return {"status": "error", "message": str(exc)}
+    if quote is None:
+        return {
+            "status": "not_cached",
+            "message": f"No cached rate for {from_currency}->{to_currency}; ask currency_fetcher_agent for it",
+        }
+    return {
+        "status": "stale" if quote["stale"] else "success",
+        "from_currency": normalize_currency(from_currency),
+        "to_currency": normalize_currency(to_currency),
+        **quote,
+    }
+
+
+def convert_currency(
+    tool_context: ToolContext,
+    amount: float,
+    from_currency: str,
+    to_currency: str
+) -> Dict[str, Any]:
+    """
+    Convert an amount using the cached exchange rate. Exact arithmetic, rounded to 2 decimals.
+    
+    Args:
+        amount: The amount to convert
+        from_currency: ISO code of the currency to convert from (e.g., 'USD')
+        to_currency: ISO code of the currency to convert to (e.g., 'EUR')
+    """
+    try:
+        amount = check_amount(amount)
+    except (TypeError, ValueError) as exc:
+        return {"status": "error", "message": str(exc)}
+    rate_info = get_exchange_rate(tool_context, from_currency, to_currency)
+    if rate_info["status"] not in ("success", "stale"):
+        return rate_info
+    result = {
+        "status": rate_info["status"],
+        "amount": amount,
+        "from_currency": rate_info["from_currency"],
+        "to_currency": rate_info["to_currency"],
+        "rate": round(rate_info["rate"], 6),
+        "converted_amount": convert_amount(amount, rate_info["rate"]),
+        "rate_age_seconds": rate_info["age_seconds"],
+        "rate_source": rate_info["source"],
+    }
+    if rate_info["stale"]:
+        result["message"] = "Rate is older than the cache TTL; refresh it with currency_fetcher_agent if possible"
+    return result
+
+
+def convert_currency_bulk(
+    tool_context: ToolContext,
+    rows: str
+) -> Dict[str, Any]:
+    """
+    Convert many amounts at once (e.g. invoice line items) with cached rates.
+    
+    Args:
+        rows: CSV text with one 'amount,from,to' row per line (e.g. '100,USD,EUR'),
+              or a JSON list like [[100, "USD", "EUR"], {"amount": 5, "from": "GBP", "to": "EUR"}]
+    """
+    try:
+        parsed, errors = parse_conversion_rows(rows)
+    except ValueError as exc:
+        return {"status": "error", "message": str(exc)}
+    result = convert_rows(rate_cache, parsed)
+    if errors:
+        result["row_errors"] = errors[:20]
+    if result["missing_pairs"]:
+        result["status"] = "partial"
+        result["message"] = (
+            "Ask currency_fetcher_agent for each missing pair, then call convert_currency_bulk again"
+        )
+    else:
+        result["status"] = "stale" if result["stale_pairs"] else "success"
+    return result
+
+
+def cache_fetched_rates(
+    tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+) -> Optional[Dict[str, Any]]:
+    """after_tool_callback: store every rate the fetcher agent returns in the cache."""
+    if tool.name == currency_agent.name:
+        for from_currency, to_currency, rate in parse_rate_payload(tool_response):
+            rate_cache.put(from_currency, to_currency, rate, source="google_search")
+    return None
+
 
 root_agent = LlmAgent(
     name="currency_converter_agent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
+    model=get_model("gemini-2.5-flash-lite"),
     instruction="""You are a helpful currency conversion assistant. You can:
 
 1. Convert amounts between different currencies using real-time exchange rates
 2. Provide current exchange rates for currency pairs
 3. Calculate multi-currency conversions
 
-use the currency_fetcher_agent to get exchange rates and convert currencies returned from it using
-the calculation_agent tool to generate Python code that calculates the final converted amount.
+Always call convert_currency (or get_exchange_rate for a rate only) first: it uses cached rates
+and does the arithmetic exactly. Only if it returns status 'not_cached' or 'stale', ask
+currency_fetcher_agent for that currency pair, then call convert_currency again.
+For several amounts (invoices, lists, tables) call convert_currency_bulk ONCE with all rows
+instead of converting them one by one; fetch only the pairs it lists in missing_pairs.
+Never do the arithmetic yourself. Mention the rate and how old it is.
 """,
     tools=[
-        AgentTool(agent=currency_agent)
-        ,AgentTool(agent=calculation_agent)],
+        convert_currency,
+        convert_currency_bulk,
+        get_exchange_rate,
+        rate_fetcher_tool],
+    after_tool_callback=cache_fetched_rates,
 )
 
+profiler.install(root_agent)
+app = tracer.app("currency_converter", root_agent)
@@ -0,0 +1,145 @@
+"""
+Bulk currency conversion: many (amount, from, to) rows in one tool call.
+
+- `parse_conversion_rows`: accepts CSV text (`amount,from,to` per line, an
+  optional header, `;` or tab also work) or a JSON list of rows, either
+  `[100, "USD", "EUR"]` or `{"amount": 100, "from": "USD", "to": "EUR"}`.
+- `convert_rows`: looks up each unique currency pair once in the
+  `RateCache` (direct, inverse or crossed through USD) and converts every row
+  in one vectorized NumPy pass. Rounding matches `convert_currency` exactly:
+  NumPy rounds every row whose product is clearly not a half cent, and only
+  the near-ties (where float64 error could flip 1.005 to 1.00) are redone
+  with `convert_amount`'s decimal arithmetic. Rows whose pair is not cached
+  are reported in `missing_pairs` so the agent can fetch just those pairs.
+- Amounts that are NaN, infinite or above MAX_AMOUNT are row errors, like
+  any other unparseable row.
+
+A 1,000-row invoice therefore costs the same model calls as a single
+conversion: one tool call, plus one fetch per pair the cache does not know.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .rates import RateCache, check_amount, convert_amount, normalize_currency
+
+MAX_ROWS = 10000
+MAX_TABLE_ROWS = 200  # Rows echoed back in the table; totals always cover every row.
+
+# Relative float64 error of amount * rate * 100 is a few 1e-16; anything this close to
+# a half cent is rounded in Decimal instead.
+TIE_TOLERANCE = 1e-12
+
+Row = Tuple[float, str, str]
+
+
+def _row_from_values(values: Any) -> Row:
+    if isinstance(values, dict):
+        lowered = {str(key).lower(): value for key, value in values.items()}
+        values = [
+            lowered.get("amount"),
+            lowered.get("from") or lowered.get("from_currency"),
+            lowered.get("to") or lowered.get("to_currency"),
+        ]
+    if not isinstance(values, (list, tuple)) or len(values) < 3:
+        raise ValueError(f"Expected amount, from, to; got {values!r}")
+    amount = check_amount(str(values[0]).replace(",", "").strip())
+    return amount, normalize_currency(str(values[1])), normalize_currency(str(values[2]))
+
+
+def parse_conversion_rows(rows: str) -> Tuple[List[Row], List[str]]:
+    """Parse CSV or JSON rows. Returns (rows, errors); bad rows are skipped, not fatal."""
+    text = (rows or "").strip()
+    if text.startswith("["):
+        raw: List[Any] = json.loads(text)
+    else:
+        first_line = text.splitlines()[0] if text else ""
+        delimiter = next((sep for sep in ";\t" if sep in first_line), ",")
+        reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+        raw = [line for line in reader if any(cell.strip() for cell in line)]
+
+    parsed: List[Row] = []
+    errors: List[str] = []
+    for number, values in enumerate(raw, start=1):
+        try:
+            parsed.append(_row_from_values(values))
+        except (TypeError, ValueError) as exc:
+            if number == 1 and not text.startswith("["):
+                continue  # CSV header line
+            errors.append(f"row {number}: {exc}")
+    if len(parsed) > MAX_ROWS:
+        raise ValueError(f"Too many rows ({len(parsed)}); the limit is {MAX_ROWS}")
+    return parsed, errors
+
+
+def round_to_cents(amounts: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    """amounts * rates rounded ROUND_HALF_UP to cents, identical to `convert_amount` per row."""
+    scaled = np.abs(amounts * rates) * 100
+    whole = np.floor(scaled)
+    fraction = scaled - whole
+    cents = whole + (fraction > 0.5)
+    rounded = np.copysign(cents / 100, amounts * rates)
+    near_tie = np.abs(fraction - 0.5) <= TIE_TOLERANCE * np.maximum(scaled, 1.0)
+    for index in np.flatnonzero(near_tie):
+        rounded[index] = convert_amount(float(amounts[index]), float(rates[index]))
+    return rounded
+
+
+def convert_rows(cache: RateCache, rows: List[Row]) -> Dict[str, Any]:
+    """Convert all rows with one rate lookup per unique pair and one NumPy pass.
+
+    `rows` come from `parse_conversion_rows`, so every amount has passed `check_amount`.
+    """
+    if not rows:
+        return {"rows": 0, "table": "", "totals": {}, "missing_pairs": [], "stale_pairs": []}
+
+    amounts = np.fromiter((row[0] for row in rows), dtype=np.float64, count=len(rows))
+    pair_labels = np.array([f"{row[1]}/{row[2]}" for row in rows])
+    unique_pairs, pair_index = np.unique(pair_labels, return_inverse=True)
+
+    pair_rates = np.full(len(unique_pairs), np.nan)
+    missing: List[str] = []
+    stale: List[str] = []
+    for position, label in enumerate(unique_pairs.tolist()):
+        from_currency, to_currency = label.split("/")
+        quote = cache.get(from_currency, to_currency, allow_stale=True)
+        if quote is None:
+            missing.append(label)
+            continue
+        pair_rates[position] = quote["rate"]
+        if quote["stale"]:
+            stale.append(label)
+
+    rates = pair_rates[pair_index]
+    converted = round_to_cents(amounts, rates)
+
+    to_codes = np.array([row[2] for row in rows])
+    known = ~np.isnan(converted)
+    totals = {
+        str(code): round(float(converted[known & (to_codes == code)].sum()), 2)
+        for code in np.unique(to_codes[known])
+    }
+
+    lines = ["amount,from,to,rate,converted"]
+    for (amount, from_currency, to_currency), rate, value in zip(
+        rows[:MAX_TABLE_ROWS], rates[:MAX_TABLE_ROWS], converted[:MAX_TABLE_ROWS]
+    ):
+        if np.isnan(value):
+            lines.append(f"{amount:g},{from_currency},{to_currency},,")
+        else:
+            lines.append(f"{amount:g},{from_currency},{to_currency},{rate:.6g},{value:.2f}")
+
+    return {
+        "rows": len(rows),
+        "converted_rows": int(known.sum()),
+        "unique_pairs": len(unique_pairs),
+        "table": "\n".join(lines),
+        "table_truncated": len(rows) > MAX_TABLE_ROWS,
+        "totals": totals,
+        "missing_pairs": missing,
+        "stale_pairs": stale,
+    }
@@ -0,0 +1,297 @@
+"""
+Exchange-rate cache and rate sources for the Currency Converter Agent.
+
+- `RateCache`: rates per currency pair with a TTL. Every lookup returns
+  staleness metadata (`fetched_at`, `age_seconds`, `stale`, `source`). It is
+  filled from the `currency_fetcher_agent` results and read by the plain
+  Python conversion tools, so a repeated pair needs no search and no model
+  call. A pair can also be answered from its inverse or through the base
+  currency (USD). The cache is persisted as one JSON file.
+- `FixtureRateSource`: deterministic offline rates from `fixtures/rates.json`,
+  for tests and demos without network access (CURRENCY_RATE_SOURCE=fixture).
+- `parse_rate_payload`: pulls (from, to, rate) triples out of the fetcher's
+  JSON-ish answer.
+- `convert_amount`: amount * rate in exact decimal arithmetic, rounded
+  half-up to cents. Both conversion tools use it so they always agree.
+- `check_amount`: rejects NaN, infinities and amounts above MAX_AMOUNT
+  before any arithmetic, so a bad amount is a ValueError, not a crash.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE_CURRENCY = "USD"
+MAX_AMOUNT = 1e13  # Cents stay exact in a float64 up to 2**53 / 100 (~9e13).
+DEFAULT_TTL_SECONDS = float(os.environ.get("CURRENCY_RATE_TTL_SECONDS", "3600"))
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "rates.json")
+
+_CODE_RE = re.compile(r"^[A-Z]{3}$")
+
+# Active ISO 4217 currency codes, used to tell "USD" from "GET" or "THE" in free text.
+ISO_CURRENCY_CODES = frozenset("""
+    AED AFN ALL AMD ANG AOA ARS AUD AWG AZN BAM BBD BDT BGN BHD BIF BMD BND BOB BRL
+    BSD BTN BWP BYN BZD CAD CDF CHF CLP CNY COP CRC CUC CUP CVE CZK DJF DKK DOP DZD
+    EGP ERN ETB EUR FJD FKP GBP GEL GHS GIP GMD GNF GTQ GYD HKD HNL HTG HUF IDR ILS
+    INR IQD IRR ISK JMD JOD JPY KES KGS KHR KMF KPW KRW KWD KYD KZT LAK LBP LKR LRD
+    LSL LYD MAD MDL MGA MKD MMK MNT MOP MRU MUR MVR MWK MXN MYR MZN NAD NGN NIO NOK
+    NPR NZD OMR PAB PEN PGK PHP PKR PLN PYG QAR RON RSD RUB RWF SAR SBD SCR SDG SEK
+    SGD SHP SLE SOS SRD SSP STN SVC SYP SZL THB TJS TMT TND TOP TRY TTD TWD TZS UAH
+    UGX USD UYU UZS VES VND VUV WST XAF XCD XOF XPF YER ZAR ZMW ZWL
+""".split())
+_JSON_BLOCK_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+Pair = Tuple[str, str]
+
+
+def normalize_currency(code: str) -> str:
+    """'usd ' -> 'USD'. Raises ValueError for anything that is not a 3-letter code."""
+    normalized = (code or "").strip().upper()
+    if not _CODE_RE.match(normalized):
+        raise ValueError(f"Invalid currency code: {code!r}")
+    return normalized
+
+
+def check_amount(amount: Any) -> float:
+    """float(amount); ValueError for NaN, infinities and anything larger than MAX_AMOUNT."""
+    value = float(amount)
+    if not math.isfinite(value) or abs(value) > MAX_AMOUNT:
+        raise ValueError(f"Amount must be a finite number up to {MAX_AMOUNT:g}, got {amount!r}")
+    return value
+
+
+def convert_amount(amount: float, rate: float) -> float:
+    """amount * rate computed on the decimal literals (1.005 stays 1.005), rounded ROUND_HALF_UP to cents."""
+    converted = Decimal(str(check_amount(amount))) * Decimal(repr(rate))
+    return float(converted.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+class FixtureRateSource:
+    """Offline rates: a JSON file of `rates` relative to one `base` currency."""
+
+    def __init__(self, path: str = FIXTURE_PATH):
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        self.name = f"fixture:{os.path.basename(path)}"
+        self.base = data.get("base", BASE_CURRENCY)
+        self.rates: Dict[str, float] = {code.upper(): float(rate) for code, rate in data["rates"].items()}
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        if from_currency not in self.rates or to_currency not in self.rates:
+            return None
+        return self.rates[to_currency] / self.rates[from_currency]
+
+
+class RateCache:
+    """Thread-safe TTL cache of exchange rates with staleness metadata."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        source: Optional[FixtureRateSource] = None,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.source = source
+        self._lock = threading.Lock()
+        self._rates: Dict[Pair, Dict[str, Any]] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "stale": 0, "stores": 0, "source_fills": 0}
+        self._load()
+
+    # ------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------
+
+    def put(self, from_currency: str, to_currency: str, rate: float, source: str,
+            fetched_at: Optional[float] = None) -> None:
+        pair = (normalize_currency(from_currency), normalize_currency(to_currency))
+        if rate <= 0:
+            raise ValueError(f"Exchange rate must be positive, got {rate}")
+        with self._lock:
+            self._rates[pair] = {"rate": float(rate), "fetched_at": fetched_at or time.time(), "source": source}
+            self.stats["stores"] += 1
+            self._save_locked()
+
+    # ------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------
+
+    def get(self, from_currency: str, to_currency: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Quote for a pair: direct, inverse, or crossed through BASE_CURRENCY.
+
+        Returns None when no (fresh, unless `allow_stale`) rate is known and
+        the offline source (if any) cannot answer either.
+        """
+        pair = (normalize_currency(from_currency), normalize_currency(to_currency))
+        with self._lock:
+            quote = self._quote_locked(pair)
+            if quote is not None and (not quote["stale"] or allow_stale):
+                self.stats["stale" if quote["stale"] else "hits"] += 1
+                return quote
+            self.stats["misses"] += 1
+        return self._fill_from_source(pair)
+
+    def _quote_locked(self, pair: Pair) -> Optional[Dict[str, Any]]:
+        from_currency, to_currency = pair
+        if from_currency == to_currency:
+            return {"rate": 1.0, "fetched_at": time.time(), "age_seconds": 0.0, "stale": False,
+                    "source": "identity", "derived": "identity"}
+        candidates = []
+        direct = self._rates.get(pair)
+        if direct:
+            candidates.append(([direct], direct["rate"], "direct"))
+        inverse = self._rates.get((to_currency, from_currency))
+        if inverse:
+            candidates.append(([inverse], 1.0 / inverse["rate"], "inverse"))
+        if BASE_CURRENCY not in pair:
+            from_base = self._base_rate_locked(from_currency)
+            to_base = self._base_rate_locked(to_currency)
+            if from_base and to_base:
+                # rate(from -> to) = rate(BASE -> to) / rate(BASE -> from)
+                candidates.append(([from_base[1], to_base[1]], to_base[0] / from_base[0], "cross"))
+        if not candidates:
+            return None
+        # Prefer the freshest answer; a cross rate is as old as its older leg.
+        entries, rate, derived = max(candidates, key=lambda c: min(e["fetched_at"] for e in c[0]))
+        fetched_at = min(entry["fetched_at"] for entry in entries)
+        age = time.time() - fetched_at
+        return {
+            "rate": rate,
+            "fetched_at": fetched_at,
+            "age_seconds": round(age, 1),
+            "stale": age > self.ttl_seconds,
+            "source": "+".join(sorted({entry["source"] for entry in entries})),
+            "derived": derived,
+        }
+
+    def _base_rate_locked(self, currency: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """(rate BASE -> currency, entry) from a direct or inverse BASE pair."""
+        if currency == BASE_CURRENCY:
+            return 1.0, {"fetched_at": time.time(), "source": "identity"}
+        entry = self._rates.get((BASE_CURRENCY, currency))
+        if entry:
+            return entry["rate"], entry
+        entry = self._rates.get((currency, BASE_CURRENCY))
+        if entry:
+            return 1.0 / entry["rate"], entry
+        return None
+
+    def _fill_from_source(self, pair: Pair) -> Optional[Dict[str, Any]]:
+        if self.source is None:
+            return None
+        rate = self.source.rate(*pair)
+        if rate is None:
+            return None
+        self.put(pair[0], pair[1], rate, source=self.source.name)
+        with self._lock:
+            self.stats["source_fills"] += 1
+            return self._quote_locked(pair)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """All cached pairs with their staleness (for the backend view)."""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "from": pair[0],
+                    "to": pair[1],
+                    "rate": entry["rate"],
+                    "source": entry["source"],
+                    "age_seconds": round(now - entry["fetched_at"], 1),
+                    "stale": now - entry["fetched_at"] > self.ttl_seconds,
+                }
+                for pair, entry in sorted(self._rates.items())
+            ]
+
+    # ------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                stored = json.load(handle)
+        except (OSError, ValueError):
+            return  # A damaged cache only costs a few lookups.
+        for item in stored.get("rates", []):
+            self._rates[(item["from"], item["to"])] = {
+                "rate": item["rate"], "fetched_at": item["fetched_at"], "source": item["source"],
+            }
+
+    def _save_locked(self) -> None:
+        if not self.path:
+            return
+        items = [{"from": pair[0], "to": pair[1], **entry} for pair, entry in self._rates.items()]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"rates": items}, handle)
+        os.replace(tmp_path, self.path)
+
+
+# ============================================================
+# Fetcher output parsing
+# ============================================================
+
+_FROM_KEYS = ("base_currency", "base", "from_currency", "from", "source_currency")
+_TO_KEYS = ("target_currency", "target", "to_currency", "to", "quote_currency")
+_RATE_KEYS = ("exchange_rate", "rate", "conversion_rate", "exchange_rates")
+
+
+def parse_rate_payload(payload: Any) -> List[Tuple[str, str, float]]:
+    """Extract (from, to, rate) triples from the fetcher's answer.
+
+    Accepts a dict or text containing a JSON object (optionally in a ```json
+    fence) shaped like {"base_currency": "USD", "target_currency": "EUR",
+    "exchange_rate": 0.92} or {"base": "USD", "rates": {"EUR": 0.92, ...}}.
+    Anything unparseable yields an empty list.
+    """
+    if isinstance(payload, dict) and "result" in payload and len(payload) == 1:
+        payload = payload["result"]
+    if isinstance(payload, str):
+        match = _JSON_BLOCK_RE.search(payload)
+        if not match:
+            return []
+        try:
+            payload = json.loads(match.group(0))
+        except ValueError:
+            return []
+    if isinstance(payload, list):
+        return [triple for item in payload for triple in parse_rate_payload(item)]
+    if not isinstance(payload, dict):
+        return []
+
+    lowered = {str(key).lower(): value for key, value in payload.items()}
+    base = next((lowered[key] for key in _FROM_KEYS if isinstance(lowered.get(key), str)), None)
+    triples: List[Tuple[str, str, float]] = []
+    try:
+        base = normalize_currency(base) if base else None
+    except ValueError:
+        return []
+
+    rates = lowered.get("rates") or lowered.get("exchange_rates")
+    if base and isinstance(rates, dict):
+        for code, rate in rates.items():
+            try:
+                triples.append((base, normalize_currency(code), float(rate)))
+            except (TypeError, ValueError):
+                continue
+        return [triple for triple in triples if triple[2] > 0]
+
+    target = next((lowered[key] for key in _TO_KEYS if isinstance(lowered.get(key), str)), None)
+    rate = next((lowered[key] for key in _RATE_KEYS if key in lowered), None)
+    if base and target and rate is not None:
+        try:
+            triple = (base, normalize_currency(target), float(rate))
+        except (TypeError, ValueError):
+            return []
+        if triple[2] > 0:
+            triples.append(triple)
+    return triples
@@ -1,7 +1,17 @@
 """Loop multi-agent workflow example using ADK.
 
 Pattern: Initial draft -> Loop (critic, refiner) until quality phrase or max iterations.
-Termination: custom exit tool escalates loop when critique indicates completion.
+Termination: the refiner escalates the loop when the critique indicates completion,
+or, checked right after each rewrite so no extra critic call is made, when the
+document has converged (LOOP_SIMILARITY_THRESHOLD between the versions before and
+after the rewrite) or the wall-clock (LOOP_TIME_BUDGET_SECONDS) or token
+(LOOP_TOKEN_BUDGET) budget is spent.
+Every iteration's decision is logged and kept in state['loop_log'].
+
+Refinement replaces `current_doc` with a rewritten document capped at
+LOOP_MAX_DOC_CHARS; past critiques go to a separate list capped at
+LOOP_CRITIQUE_HISTORY. The critic reads only that bounded state (not the
+conversation), so its input stays the same size however many iterations run.
 
 Run:
     adk run loop_workflow
@@ -10,53 +20,219 @@ Web UI:
 Select agent: loop_workflow
 Requires: google-adk installed & API key.
 """
-from typing import AsyncGenerator
+import difflib
+import logging
+import os
+import time
+from typing import AsyncGenerator, Optional
 from google.adk.agents import LoopAgent, SequentialAgent, LlmAgent, BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.events import Event, EventActions
 from google.adk.agents.invocation_context import InvocationContext
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from common.models import get_model
+from common.profiling import profiler
+from common.tracing import tracer
 
 MODEL = "gemini-2.0-flash"
+llm = get_model(MODEL)
 COMPLETION_PHRASE = "No major issues found."
+MAX_DOC_CHARS = int(os.environ.get("LOOP_MAX_DOC_CHARS", "1200"))
+CRITIQUE_HISTORY_LIMIT = int(os.environ.get("LOOP_CRITIQUE_HISTORY", "3"))
+MAX_CRITIQUE_CHARS = 400
+
+logger = logging.getLogger(__name__)
+
+
+def bound_text(text: str, limit: int) -> str:
+    """Cut `text` to at most `limit` chars, preferably at a sentence end."""
+    text = text.strip()
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "), cut.rfind("\n"))
+    return cut[:sentence_end + 1].rstrip() if sentence_end >= limit // 2 else cut.rstrip()
+
+
+def bound_document(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    """Hold model-written documents to MAX_DOC_CHARS before they are saved to state."""
+    content = llm_response.content
+    if llm_response.partial or not content or not content.parts:
+        return None
+    text = "".join(part.text or "" for part in content.parts)
+    bounded = bound_text(text, MAX_DOC_CHARS)
+    if bounded == text:
+        return None
+    return llm_response.model_copy(update={
+        "content": types.Content(role=content.role, parts=[types.Part(text=bounded)]),
+    })
+
 
 initial_writer = LlmAgent(
     name="InitialWriter",
-    model=MODEL,
+    model=llm,
     instruction="""Write a concise (2-3 sentence) overview about the user topic. Store text only.""",
     description="Generates initial draft.",
     output_key="current_doc",
+    after_model_callback=bound_document,
 )
 
+
+def critic_instruction(context: ReadonlyContext) -> str:
+    """Constant-size critic input: the bounded document plus the capped critique history."""
+    history = context.state.get("critique_history") or []
+    earlier = "\n".join(f"- {item}" for item in history) or "- (none)"
+    return f"""Assess the document for clarity and quality. If satisfactory respond EXACTLY with '{COMPLETION_PHRASE}'. Otherwise provide 1-2 bullet improvements only.
+Do not repeat earlier critiques that the document already addresses.
+
+Document:
+{context.state.get("current_doc", "")}
+
+Earlier critiques:
+{earlier}"""
+
+
 critic = LlmAgent(
     name="CriticAgent",
-    model=MODEL,
-    instruction=f"""Assess the document for clarity and quality. If satisfactory respond EXACTLY with '{COMPLETION_PHRASE}'. Otherwise provide 1-2 bullet improvements only.""",
+    model=llm,
+    instruction=critic_instruction,
     description="Critiques current draft, may signal completion.",
+    include_contents="none",
     output_key="critique",
 )
 
+
+def refiner_instruction(context: ReadonlyContext) -> str:
+    return f"""Rewrite the document so it applies the critique. Keep the topic and the facts; do not add a preamble.
+Output ONLY the revised document, at most {MAX_DOC_CHARS} characters.
+
+Document:
+{context.state.get("current_doc", "")}
+
+Critique:
+{context.state.get("critique", "")}"""
+
+
+document_refiner = LlmAgent(
+    name="DocumentRefiner",
+    model=llm,
+    instruction=refiner_instruction,
+    description="Produces a replacement document that applies the critique.",
+    include_contents="none",
+    output_key="current_doc",
+    after_model_callback=bound_document,
+)
+
+def document_similarity(previous: str, current: str) -> float:
+    """0..1 similarity of two document versions (1.0 = unchanged)."""
+    return difflib.SequenceMatcher(None, previous, current, autojunk=False).ratio()
+
+
+def start_loop(callback_context: CallbackContext) -> None:
+    """Reset the per-run loop bookkeeping before the first iteration."""
+    callback_context.state["loop_started_at"] = time.time()
+    callback_context.state["loop_iteration"] = 0
+    callback_context.state["previous_doc"] = None
+    callback_context.state["loop_log"] = []
+    callback_context.state["loop_stop_reason"] = None
+    callback_context.state["critique_history"] = []
+    return None
+
+
+def finish_loop(callback_context: CallbackContext) -> None:
+    """Record why the loop ended when it ran out of iterations without escalating."""
+    if not callback_context.state.get("loop_stop_reason"):
+        callback_context.state["loop_stop_reason"] = "max_iterations"
+    log = callback_context.state.get("loop_log") or []
+    saved = max(0, refinement_loop.max_iterations - len(log))
+    callback_context.state["loop_critic_calls_saved"] = saved
+    logger.info("RefinementLoop stopped (%s) after %d critic calls; %d saved",
+                callback_context.state["loop_stop_reason"], len(log), saved)
+    return None
+
+
 class RefinerOrExit(BaseAgent):
     name: str = "RefinerAgent"
     description: str = "Refines based on critique or escalates loop if complete."
+    similarity_threshold: float = float(os.environ.get("LOOP_SIMILARITY_THRESHOLD", "0.95"))
+    time_budget_seconds: float = float(os.environ.get("LOOP_TIME_BUDGET_SECONDS", "60"))
+    token_budget: int = int(os.environ.get("LOOP_TOKEN_BUDGET", "20000"))
 
-    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
-        critique = ctx.session.state.get("critique", "")
-        current = ctx.session.state.get("current_doc", "")
+    def _tokens_used(self, ctx: InvocationContext) -> int:
+        """Model tokens spent by this invocation so far (from event usage metadata)."""
+        return sum(
+            event.usage_metadata.total_token_count or 0
+            for event in ctx.session.events
+            if event.invocation_id == ctx.invocation_id and event.usage_metadata
+        )
+
+    def _stop_reason(self, critique: str, similarity: Optional[float], elapsed: float, tokens: int) -> Optional[str]:
         if critique.strip() == COMPLETION_PHRASE:
+            return "critic_satisfied"
+        if similarity is not None and similarity >= self.similarity_threshold:
+            return "converged"
+        if elapsed >= self.time_budget_seconds:
+            return "time_budget"
+        if tokens >= self.token_budget:
+            return "token_budget"
+        return None
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        critique = state.get("critique", "")
+        current = state.get("current_doc", "")
+        iteration = (state.get("loop_iteration") or 0) + 1
+        log = list(state.get("loop_log") or [])
+
+        reason = self._stop_reason(critique, None, time.time() - (state.get("loop_started_at") or time.time()),
+                                   self._tokens_used(ctx))
+        if not reason:
+            # Keep the critique outside the document, in a capped list
+            history = list(state.get("critique_history") or []) + [bound_text(critique, MAX_CRITIQUE_CHARS)]
+            yield Event(author=self.name, invocation_id=ctx.invocation_id, actions=EventActions(state_delta={
+                "critique_history": history[-CRITIQUE_HISTORY_LIMIT:],
+                "previous_doc": current,
+            }))
+            # The refiner replaces current_doc with a bounded rewrite
+            for refiner in self.sub_agents:
+                async for event in refiner.run_async(ctx):
+                    yield event
+
+        # Checked right after the refiner, so a converged or over-budget loop stops
+        # before the critic is called again.
+        similarity = None if reason else document_similarity(current, state.get("current_doc", ""))
+        elapsed = time.time() - (state.get("loop_started_at") or time.time())
+        tokens = self._tokens_used(ctx)
+        reason = reason or self._stop_reason("", similarity, elapsed, tokens)
+        entry = {
+            "iteration": iteration,
+            "decision": reason or "refine",
+            "similarity": None if similarity is None else round(similarity, 3),
+            "elapsed_s": round(elapsed, 2),
+            "tokens": tokens,
+        }
+        logger.info("RefinementLoop iteration %d: %s", iteration, entry)
+        delta = {"loop_iteration": iteration, "loop_log": log + [entry]}
+        if reason:
             # escalate to stop loop
-            yield Event(author=self.name, actions=EventActions(escalate=True))
+            delta["loop_stop_reason"] = reason
+            actions = EventActions(escalate=True, state_delta=delta)
         else:
-            # produce refined text (LLM-like transformation can be delegated to an LlmAgent; here we emulate inline)
-            improved = f"REFINED VERSION (apply suggestions):\nOriginal: {current}\nCritique: {critique}"
-            ctx.session.state["current_doc"] = improved
-            yield Event(author=self.name, actions=EventActions())
+            actions = EventActions(state_delta=delta)
+        yield Event(author=self.name, invocation_id=ctx.invocation_id, actions=actions)
 
-refiner_exit = RefinerOrExit()
+refiner_exit = RefinerOrExit(sub_agents=[document_refiner])
 
 refinement_loop = LoopAgent(
     name="RefinementLoop",
     sub_agents=[critic, refiner_exit],  # order: critique then refine/exit
     max_iterations=5,
-    description="Iteratively critiques and refines until completion or limit.",
+    description="Iteratively critiques and refines until completion, convergence, budget or limit.",
+    before_agent_callback=start_loop,
+    after_agent_callback=finish_loop,
 )
 
 root_agent = SequentialAgent(
@@ -64,3 +240,6 @@ root_agent = SequentialAgent(
     sub_agents=[initial_writer, refinement_loop],
     description="Initial draft then iterative refinement loop.",
 )
+
+profiler.install(root_agent)
+app = tracer.app("loop_workflow", root_agent)
@@ -7,6 +7,10 @@ Features:
 - Connects to MCP servers using stdio communication
 - Uses the Everything MCP server for content generation
 - Demonstrates MCP tool integration patterns
+- Keeps warm, supervised MCP server processes shared by all sessions
+  (pool.py); set MCP_POOL=0 to fall back to a plain McpToolset
+- Stores large tool results (images, long text) as artifacts and passes the
+  model a short reference instead (common/artifacts.py)
 
 Run:
     adk run mcp_generator
@@ -23,29 +27,54 @@ from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
 from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
 from mcp import StdioServerParameters
 
+from common.artifacts import ArtifactOffloader
+from common.models import get_model
+from common.profiling import profiler
+from common.tracing import tracer
+
+from .pool import McpServerPool, PooledMcpToolset
+
 MODEL = "gemini-2.0-flash"
+llm = get_model(MODEL)
 
 # Compute path to the local MCP server script relative to this file.
 # This lets the agent spawn the server using a path that's valid
 # whether ADK is run from the repo root or from the Agents folder.
 SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "simple_mcp_server.js")
 
+SERVER_PARAMS = StdioServerParameters(
+    command='node',  # Run our local MCP server
+    args=[SCRIPT_PATH],  # Path to our local server script (computed at runtime)
+)
+TOOL_FILTER = ['getTinyImage', 'echo', 'addNumbers']  # Filter to specific tools
+USE_POOL = os.environ.get("MCP_POOL", "1") != "0"
+
 # MCP integration with local Simple Content Server
-# This provides various tools including content generation capabilities
-mcp_content_server = McpToolset(
-    connection_params=StdioConnectionParams(
-        server_params=StdioServerParameters(
-                command='node',  # Run our local MCP server
-                args=[SCRIPT_PATH],  # Path to our local server script (computed at runtime)
-                tool_filter=['getTinyImage', 'echo', 'addNumbers']  # Filter to specific tools
-            ),
-        timeout=30,  # Shorter timeout for local server
+# This provides various tools including content generation capabilities.
+# By default the server processes are pooled: started once, health-checked and
+# restarted by the supervisor, shared by every session, with the tool list cached.
+# The pool belongs to this module (process lifetime): the toolset only borrows it,
+# and the servers start as soon as ADK loads the agent.
+mcp_pool = McpServerPool(SERVER_PARAMS, timeout=30)
+if USE_POOL:
+    mcp_content_server = PooledMcpToolset(mcp_pool, tool_filter=TOOL_FILTER)
+    mcp_pool.warm_soon()
+else:
+    mcp_content_server = McpToolset(
+        connection_params=StdioConnectionParams(
+            server_params=SERVER_PARAMS,
+            timeout=30,  # Shorter timeout for local server
+        ),
+        tool_filter=TOOL_FILTER,
     )
-)
+
+# Large results (getTinyImage's ~33 KB base64 PNG, long echo text) are saved as
+# session artifacts; the model only sees a short reference the frontend can fetch.
+artifact_offloader = ArtifactOffloader()
 
 # Main agent with MCP integration
 root_agent = Agent(
-    model=MODEL,
+    model=llm,
     name="mcp_generator_agent",
     description="Content generator using MCP servers for external tool integration.",
     instruction="""You are a content generator assistant that uses MCP (Model Context Protocol) tools.
@@ -77,4 +106,8 @@ Examples:
 
 Be helpful and demonstrate MCP tool capabilities clearly.""",
     tools=[mcp_content_server],
-)
\ No newline at end of file
+    after_tool_callback=artifact_offloader.after_tool,
+)
+
+profiler.install(root_agent)
+app = tracer.app("mcp_generator", root_agent)
@@ -0,0 +1,345 @@
+"""
+Persistent, pooled MCP server processes for the MCP generator agent.
+
+`McpToolset` opens a stdio connection per toolset session, so a fresh
+deployment (and every session that lands on a cold toolset) pays for
+spawning `node simple_mcp_server.js`, the MCP handshake and a `tools/list`
+round trip before the first tool call. This module keeps the servers warm
+instead:
+
+- `McpServerPool` supervises MCP_POOL_SIZE (default 2) long-lived server
+  processes. Each worker is started once, answers a `ping` health check
+  every MCP_HEALTH_INTERVAL seconds (default 15) and is restarted with
+  backoff when the process exits or a health check fails.
+- Sessions are multiplexed onto the workers: a call goes to the least busy
+  healthy worker, with at most MCP_WORKER_CONCURRENCY (default 4) calls in
+  flight per process. A call that dies with its worker is retried once on
+  another worker (the demo tools are side-effect free).
+- The `tools/list` result is cached for MCP_TOOLS_TTL_SECONDS (default 300),
+  so new sessions do not ask the server for its tools again.
+- `mcp_pool.stats()` reports process starts/restarts, health failures,
+  calls, retries and tool-list cache hits.
+
+`PooledMcpToolset` is the drop-in ADK toolset used by agent.py. The pool is
+shared by every session and runner of the process, so a toolset only borrows
+it: closing a runner (and its toolsets) leaves the workers running. agent.py
+calls `warm_soon()` when it is loaded, so the servers start with the agent
+rather than on its first tool call. Whoever created the pool stops it with
+`await pool.close()`.
+
+Usage:
+    from mcp_generator.pool import McpServerPool, PooledMcpToolset
+    pool = McpServerPool(StdioServerParameters(command="node", args=[SCRIPT_PATH]))
+    tools = PooledMcpToolset(pool, tool_filter=["echo"])
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.environ.get("MCP_POOL_SIZE", "2"))
+DEFAULT_WORKER_CONCURRENCY = int(os.environ.get("MCP_WORKER_CONCURRENCY", "4"))
+DEFAULT_HEALTH_INTERVAL = float(os.environ.get("MCP_HEALTH_INTERVAL", "15"))
+DEFAULT_TOOLS_TTL_SECONDS = float(os.environ.get("MCP_TOOLS_TTL_SECONDS", "300"))
+HEALTH_TIMEOUT_SECONDS = 5.0
+MAX_RESTART_BACKOFF_SECONDS = 30.0
+
+
+class _Worker:
+    """One supervised server process and its MCP client session."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.broken = False
+        self.wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.session is not None and not self.broken
+
+
+class McpServerPool:
+    """Supervises a warm pool of stdio MCP servers and routes tool calls to them."""
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        size: int = DEFAULT_POOL_SIZE,
+        worker_concurrency: int = DEFAULT_WORKER_CONCURRENCY,
+        health_interval: float = DEFAULT_HEALTH_INTERVAL,
+        tools_ttl_seconds: float = DEFAULT_TOOLS_TTL_SECONDS,
+        timeout: float = 30.0,
+    ):
+        self.server_params = server_params
+        self.size = max(1, size)
+        self.worker_concurrency = max(1, worker_concurrency)
+        self.health_interval = health_interval
+        self.tools_ttl_seconds = tools_ttl_seconds
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[_Worker] = []
+        self._changed: Optional[asyncio.Condition] = None
+        self._tools_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self._warming: Optional[asyncio.Task] = None
+        self._tools: Optional[List[Any]] = None
+        self._tools_fetched_at = 0.0
+        self._counters: Dict[str, int] = {
+            "process_starts": 0,
+            "restarts": 0,
+            "health_failures": 0,
+            "calls": 0,
+            "call_retries": 0,
+            "waited_for_worker": 0,
+            "tool_list_fetches": 0,
+            "tool_list_cache_hits": 0,
+        }
+
+    # ------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Spawn the workers on the running loop (no-op when already running)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            raise RuntimeError("McpServerPool is already running on another event loop")
+        # A previous loop (e.g. an earlier asyncio.run) took its processes down with it.
+        self._loop = loop
+        self._stopping = False
+        self._changed = asyncio.Condition()
+        self._tools_lock = asyncio.Lock()
+        self._workers = [_Worker(index) for index in range(self.size)]
+        for worker in self._workers:
+            worker.task = asyncio.create_task(self._supervise(worker), name=f"mcp-worker-{worker.index}")
+
+    async def warm(self) -> None:
+        """Start the pool and wait until every worker has finished its handshake."""
+        await self.start()
+        async with asyncio.timeout(self.timeout), self._changed:
+            await self._changed.wait_for(lambda: all(w.healthy for w in self._workers))
+
+    def warm_soon(self) -> None:
+        """Warm the pool in the background if a loop is running (ADK loads agents on its loop).
+
+        Without a running loop this does nothing and the first call starts the pool.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._warming = loop.create_task(self._warm_in_background(), name="mcp-pool-warm")
+
+    async def _warm_in_background(self) -> None:
+        try:
+            await self.warm()
+        except Exception as error:  # calls wait for the supervisors to bring workers up
+            logger.warning("MCP pool did not warm up: %r", error)
+
+    async def close(self) -> None:
+        """Stop every worker process."""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        self._stopping = True
+        for worker in self._workers:
+            worker.wake.set()
+        await asyncio.gather(*(w.task for w in self._workers if w.task), return_exceptions=True)
+        self._loop = None
+
+    async def _supervise(self, worker: _Worker) -> None:
+        backoff = 0.5
+        while not self._stopping:
+            started = time.monotonic()
+            try:
+                async with stdio_client(self.server_params) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        async with asyncio.timeout(self.timeout):
+                            await session.initialize()
+                        self._counters["process_starts"] += 1
+                        worker.session, worker.broken = session, False
+                        await self._notify()
+                        await self._health_loop(worker)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:  # crashed, failed its health check or never came up
+                logger.warning("MCP worker %d went down: %r", worker.index, error)
+            finally:
+                worker.session = None
+                worker.wake.clear()
+            if self._stopping:
+                break
+            self._counters["restarts"] += 1
+            backoff = 0.5 if time.monotonic() - started > 60 else min(backoff * 2, MAX_RESTART_BACKOFF_SECONDS)
+            await asyncio.sleep(backoff)
+        await self._notify()
+
+    async def _health_loop(self, worker: _Worker) -> None:
+        while True:
+            try:
+                async with asyncio.timeout(self.health_interval):
+                    await worker.wake.wait()
+            except TimeoutError:
+                pass
+            if self._stopping:
+                return
+            worker.wake.clear()
+            if worker.broken or not await self._ping(worker):
+                self._counters["health_failures"] += 1
+                raise ConnectionError(f"MCP worker {worker.index} failed its health check")
+
+    async def _ping(self, worker: _Worker) -> bool:
+        try:
+            async with asyncio.timeout(HEALTH_TIMEOUT_SECONDS):
+                await worker.session.send_ping()
+            return True
+        except Exception:
+            return False
+
+    async def _notify(self) -> None:
+        if self._changed is not None:
+            async with self._changed:
+                self._changed.notify_all()
+
+    # ------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------
+
+    def _pick(self) -> Optional[_Worker]:
+        ready = [w for w in self._workers if w.healthy and w.in_flight < self.worker_concurrency]
+        return min(ready, key=lambda w: w.in_flight) if ready else None
+
+    async def _acquire(self) -> _Worker:
+        await self.start()
+        worker = self._pick()
+        if worker is None:
+            self._counters["waited_for_worker"] += 1
+            async with asyncio.timeout(self.timeout), self._changed:
+                await self._changed.wait_for(lambda: self._pick() is not None)
+                worker = self._pick()
+        worker.in_flight += 1
+        return worker
+
+    async def _release(self, worker: _Worker) -> None:
+        worker.in_flight -= 1
+        await self._notify()
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> Any:
+        """Run one `tools/call` on the least busy healthy worker.
+
+        Args:
+            name: MCP tool name.
+            arguments: Tool arguments.
+        """
+        self._counters["calls"] += 1
+        for attempt in (1, 2):
+            worker = await self._acquire()
+            try:
+                async with asyncio.timeout(self.timeout):
+                    return await worker.session.call_tool(name, arguments or {})
+            except Exception:
+                # Tool-level errors come back as results; an exception plus a dead ping means
+                # the process went away under the call, so hand the worker to its supervisor.
+                if attempt == 2 or await self._ping(worker):
+                    raise
+                worker.broken = True
+                worker.wake.set()
+                self._counters["call_retries"] += 1
+            finally:
+                await self._release(worker)
+
+    async def list_tools(self) -> List[Any]:
+        """The server's MCP tool definitions, cached for `tools_ttl_seconds`."""
+        await self.start()
+        async with self._tools_lock:
+            if self._tools is not None and time.monotonic() - self._tools_fetched_at < self.tools_ttl_seconds:
+                self._counters["tool_list_cache_hits"] += 1
+                return self._tools
+            worker = await self._acquire()
+            try:
+                async with asyncio.timeout(self.timeout):
+                    result = await worker.session.list_tools()
+            finally:
+                await self._release(worker)
+            self._tools, self._tools_fetched_at = list(result.tools), time.monotonic()
+            self._counters["tool_list_fetches"] += 1
+            return self._tools
+
+    # ------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "size": self.size,
+            "healthy_workers": sum(1 for w in self._workers if w.healthy),
+            "in_flight": [w.in_flight for w in self._workers],
+        }
+
+
+def _input_schema(mcp_tool: Any) -> Dict[str, Any]:
+    # mcp 1.x names the field inputSchema, mcp 2.x input_schema.
+    schema = getattr(mcp_tool, "inputSchema", None)
+    return schema if schema is not None else getattr(mcp_tool, "input_schema", {})
+
+
+class PooledMcpTool(BaseTool):
+    """One MCP tool whose calls are routed through an `McpServerPool`."""
+
+    def __init__(self, pool: McpServerPool, mcp_tool: Any):
+        super().__init__(name=mcp_tool.name, description=mcp_tool.description or "")
+        self._pool = pool
+        self._mcp_tool = mcp_tool
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        from google.adk.tools._gemini_schema_util import _to_gemini_schema
+
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters=_to_gemini_schema(_input_schema(self._mcp_tool)),
+        )
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        result = await self._pool.call_tool(self.name, args)
+        return result.model_dump(exclude_none=True, mode="json")
+
+
+class PooledMcpToolset(BaseToolset):
+    """ADK toolset over a shared `McpServerPool` (warm processes, cached tool list)."""
+
+    def __init__(self, pool: McpServerPool, tool_filter: Optional[List[str]] = None, owns_pool: bool = False):
+        """
+        Args:
+            pool: The shared pool the tools run on
+            tool_filter: MCP tool names to expose (all when None)
+            owns_pool: Stop the pool when this toolset is closed; borrowers leave it running
+        """
+        super().__init__(tool_filter=tool_filter)
+        self.pool = pool
+        self.owns_pool = owns_pool
+
+    async def get_tools(self, readonly_context=None) -> List[BaseTool]:
+        tools = [PooledMcpTool(self.pool, tool) for tool in await self.pool.list_tools()]
+        return [tool for tool in tools if self._is_tool_selected(tool, readonly_context)]
+
+    async def close(self) -> None:
+        # Called when a runner shuts down; other runners and sessions still use a borrowed pool.
+        if self.owns_pool:
+            await self.pool.close()
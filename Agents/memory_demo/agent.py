@@ -2,28 +2,77 @@
 Memory Demo Agent - Day 3b Implementation
 
 Demonstrates:
-- Long-term memory storage using TinyDB
-- Memory search and retrieval
+- Long-term memory storage (SQLite + FTS5 index by default, TinyDB optional)
+- Ranked memory search and retrieval
+- Offline semantic (vector) search over memories
 - Backend helper agent for returning memory data
 """
 
 import os
-import json
+import numpy as np
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from tinydb import TinyDB, Query
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.tools.tool_context import ToolContext
 from google.genai import types
 
+from common.models import get_model
+from common.profiling import profiler
+from common.storage_executor import read_tool, write_tool
+from common.tracing import tracer
+
+from .storage import open_backend
+from .summary import MemorySummary
+from .vectors import HashingEmbedder, SemanticIndex
+
 # Configuration
 MODEL = "gemini-2.0-flash"
-DB_PATH = os.path.join(os.path.dirname(__file__), "memory_store.db")
+DB_DIR = os.environ.get("MEMORY_DB_DIR", os.path.dirname(__file__))
+MEMORY_BACKEND = os.environ.get("MEMORY_BACKEND", "sqlite")
+SEARCH_LIMIT = int(os.environ.get("MEMORY_SEARCH_LIMIT", "20"))
+
+# Initialize memory storage (migrates a legacy TinyDB memory_store.db on first start)
+memory_store = open_backend(MEMORY_BACKEND, DB_DIR)
+
+# Dashboard summary, built once here and then kept current by the write tools
+memory_summary = MemorySummary(memory_store)
+
+# Local embeddings + ANN index for semantic search (no network access needed)
+embedder = HashingEmbedder()
+semantic_index = SemanticIndex(dim=embedder.dim)
+
+
+def _embedding_text(memory_key: str, memory_content: str) -> str:
+    # Keys like 'favorite_food' carry meaning too, so embed them with the content.
+    return f"{memory_key.replace('_', ' ')} {memory_content}"
+
+
+def _load_semantic_index() -> None:
+    """Load stored embeddings into the index, backfilling memories that lack one."""
+    keys, vectors, missing = [], [], []
+    for key, blob in list(memory_store.embeddings()):
+        vector = embedder.from_bytes(blob)
+        if vector is None:
+            missing.append(key)
+        else:
+            keys.append(key)
+            vectors.append(vector)
+
+    backfilled = []
+    for key in missing:
+        record = memory_store.get(key)
+        if record:
+            vector = embedder.embed(_embedding_text(key, record['content']))
+            keys.append(key)
+            vectors.append(vector)
+            backfilled.append((key, embedder.to_bytes(vector)))
+    if backfilled:
+        memory_store.set_embeddings(backfilled)
+    if keys:
+        semantic_index.add_many(keys, np.vstack(vectors))
+
 
-# Initialize TinyDB for memory storage
-db = TinyDB(DB_PATH)
-memory_table = db.table('memories')
+_load_semantic_index()
 
 # ============================================================
 # Memory Management Tools
@@ -51,8 +100,10 @@ def save_memory(
         'user_id': tool_context.state.get('user_id', 'default_user')
     }
     
-    MemQuery = Query()
-    memory_table.upsert(memory_record, MemQuery.key == memory_key)
+    embedding = embedder.embed(_embedding_text(memory_key, memory_content))
+    memory_store.upsert(memory_record, embedding=embedder.to_bytes(embedding))
+    memory_summary.record_upsert(memory_record)
+    semantic_index.add(memory_key, embedding)
     
     return {
         "status": "success",
@@ -67,21 +118,48 @@ def search_memories(
     category: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    Search for memories containing the query string.
+    Search for memories matching the query words, best matches first.
     
     Args:
         query: Search query string
         category: Optional category filter
     """
-    MemQuery = Query()
+    results = memory_store.search(query, category=category, limit=SEARCH_LIMIT)
     
-    # Build search condition
-    if category:
-        results = memory_table.search(
-            (MemQuery.content.search(query, flags=0)) & (MemQuery.category == category)
-        )
-    else:
-        results = memory_table.search(MemQuery.content.search(query, flags=0))
+    return {
+        "status": "success",
+        "query": query,
+        "count": len(results),
+        "memories": results
+    }
+
+
+def semantic_search_memories(
+    tool_context: ToolContext,
+    query: str,
+    category: Optional[str] = None,
+    top_k: int = 5
+) -> Dict[str, Any]:
+    """
+    Find memories whose meaning is similar to the query, even if the exact words differ.
+    
+    Args:
+        query: Natural-language description of what to look for
+        category: Optional category filter
+        top_k: Maximum number of memories to return
+    """
+    query_vector = embedder.embed(query)
+    # Over-fetch when filtering so the category filter still leaves top_k results.
+    fetch = top_k * 4 if category else top_k
+    results = []
+    for key, similarity in semantic_index.search(query_vector, k=fetch):
+        memory = memory_store.get(key)
+        if memory is None or (category and memory.get('category') != category):
+            continue
+        memory['similarity'] = round(similarity, 4)
+        results.append(memory)
+        if len(results) == top_k:
+            break
     
     return {
         "status": "success",
@@ -101,13 +179,12 @@ def get_memory_by_key(
     Args:
         memory_key: The unique key of the memory to retrieve
     """
-    MemQuery = Query()
-    result = memory_table.search(MemQuery.key == memory_key)
+    result = memory_store.get(memory_key)
     
     if result:
         return {
             "status": "success",
-            "memory": result[0]
+            "memory": result
         }
     else:
         return {
@@ -126,11 +203,7 @@ def list_all_memories(
     Args:
         category: Optional category filter
     """
-    if category:
-        MemQuery = Query()
-        results = memory_table.search(MemQuery.category == category)
-    else:
-        results = memory_table.all()
+    results = memory_store.list(category)
     
     # Group by category
     by_category = {}
@@ -158,8 +231,10 @@ def delete_memory(
     Args:
         memory_key: The key of the memory to delete
     """
-    MemQuery = Query()
-    removed = memory_table.remove(MemQuery.key == memory_key)
+    removed = memory_store.delete(memory_key)
+    if removed:
+        memory_summary.record_delete(memory_key)
+        semantic_index.remove(memory_key)
     
     if removed:
         return {
@@ -182,47 +257,9 @@ def get_backend_memory_data(tool_context: ToolContext) -> str:
     Backend helper tool that returns memory data in BACKEND_PROCESSES format.
     This data will be parsed by the frontend for special rendering.
     """
-    # Get all memories
-    all_memories = memory_table.all()
-    
-    # Group by category
-    by_category = {}
-    for mem in all_memories:
-        cat = mem.get('category', 'general')
-        if cat not in by_category:
-            by_category[cat] = []
-        by_category[cat].append({
-            'key': mem['key'],
-            'content': mem['content'],
-            'timestamp': mem['timestamp']
-        })
-    
-    # Get statistics
-    total_count = len(all_memories)
-    categories = list(by_category.keys())
-    
-    # Recent memories (last 5)
-    recent = sorted(all_memories, key=lambda x: x['timestamp'], reverse=True)[:5]
-    
-    # Build backend data structure
-    backend_data = {
-        "type": "memory_store",
-        "total_memories": total_count,
-        "categories": categories,
-        "memories_by_category": by_category,
-        "recent_memories": [
-            {
-                'key': m['key'],
-                'content': m['content'][:100] + '...' if len(m['content']) > 100 else m['content'],
-                'category': m['category'],
-                'timestamp': m['timestamp']
-            }
-            for m in recent
-        ]
-    }
-    
-    # Return in BACKEND_PROCESSES format (strict marker)
-    return f"BACKEND_PROCESSES: {json.dumps(backend_data, indent=2)}"
+    # Summary is maintained incrementally by save_memory/delete_memory and the
+    # serialized payload is cached until the next mutation.
+    return f"BACKEND_PROCESSES: {memory_summary.payload()}"
 
 
 # ============================================================
@@ -230,8 +267,8 @@ def get_backend_memory_data(tool_context: ToolContext) -> str:
 # ============================================================
 
 memory_demo_agent = LlmAgent(
-    model=Gemini(
-        model=MODEL,
+    model=get_model(
+        MODEL,
         generation_config=types.GenerateContentConfig(
             temperature=0.7,
             top_p=0.95,
@@ -243,11 +280,12 @@ memory_demo_agent = LlmAgent(
 
 Your capabilities:
 1. Save memories using save_memory tool - use meaningful keys like 'birthday', 'favorite_color', 'hobby_guitar'
-2. Search memories using search_memories tool - find memories by content
-3. Retrieve specific memories using get_memory_by_key tool
-4. List all memories using list_all_memories tool
-5. Delete memories using delete_memory tool
-6. Provide backend memory data using get_backend_memory_data tool
+2. Search memories using search_memories tool - find memories by words in their content (results are ranked)
+3. Find memories by meaning using semantic_search_memories tool - works even when the wording differs
+4. Retrieve specific memories using get_memory_by_key tool
+5. List all memories using list_all_memories tool
+6. Delete memories using delete_memory tool
+7. Provide backend memory data using get_backend_memory_data tool
 
 When users share information that should be remembered long-term (birthdays, preferences, facts),
 automatically save them as memories with descriptive keys and appropriate categories.
@@ -258,19 +296,26 @@ Categories to use:
 - 'facts': general knowledge, learned information
 - 'goals': user goals, aspirations
 
-When asked about past information, search memories to retrieve it.
+When asked about past information, prefer semantic_search_memories (one call usually finds the
+fact regardless of wording); use search_memories for exact words or names.
 
 If the user asks to see backend data or memory store, use get_backend_memory_data tool.
 """,
+    # Async variants: storage I/O runs off the event loop (reads on a bounded
+    # pool, writes on a single writer thread).
     tools=[
-        save_memory,
-        search_memories,
-        get_memory_by_key,
-        list_all_memories,
-        delete_memory,
-        get_backend_memory_data,
+        write_tool(save_memory),
+        read_tool(search_memories),
+        read_tool(semantic_search_memories),
+        read_tool(get_memory_by_key),
+        read_tool(list_all_memories),
+        write_tool(delete_memory),
+        read_tool(get_backend_memory_data),
     ],
 )
 
 # Export as root_agent for ADK
 root_agent = memory_demo_agent
+
+profiler.install(root_agent)
+app = tracer.app("memory_demo", root_agent)
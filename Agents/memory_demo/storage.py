@@ -0,0 +1,426 @@
+"""
+Storage backends for the Memory Demo Agent.
+
+Two interchangeable backends implement the same `MemoryBackend` interface:
+- `SQLiteMemoryBackend` (default): SQLite table with secondary indexes on
+  `key`, `category` and `user_id`, plus an FTS5 inverted index over the memory
+  text so searches are ranked (bm25) index lookups instead of full scans.
+  Each row also carries the memory's embedding for semantic search.
+- `TinyDBMemoryBackend`: the original TinyDB table with regex scans, stored
+  through the append-only `common.log_storage.AppendLogStorage`.
+
+Select the backend with the MEMORY_BACKEND environment variable
+(`sqlite` or `tinydb`). On first start the SQLite backend imports any records
+found in the legacy TinyDB `memory_store.db` file.
+"""
+
+import base64
+import os
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from tinydb import TinyDB, Query
+
+from common.log_storage import AppendLogStorage, sidecar_paths
+
+MEMORY_FIELDS = ('key', 'content', 'category', 'timestamp', 'user_id')
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class MemoryBackend(ABC):
+    """Interface shared by all memory storage backends."""
+
+    name = "base"
+
+    @abstractmethod
+    def upsert(self, record: Dict[str, Any], embedding: Optional[bytes] = None) -> None:
+        """Insert or replace the memory identified by record['key'] (and its embedding)."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the memory stored under `key`, or None."""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Delete the memory stored under `key`. Returns True if one was removed."""
+
+    @abstractmethod
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        user_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return memories matching `query`, best matches first."""
+
+    @abstractmethod
+    def list(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return all memories, optionally restricted to one category."""
+
+    @abstractmethod
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """Return the `limit` most recently saved memories, newest first."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Return the number of stored memories."""
+
+    @abstractmethod
+    def embeddings(self) -> Iterator[Tuple[str, Optional[bytes]]]:
+        """Yield (key, embedding) for every memory; embedding is None if never stored."""
+
+    @abstractmethod
+    def set_embeddings(self, items: List[Tuple[str, bytes]]) -> None:
+        """Store embeddings for existing memories (used to backfill old records)."""
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+# ============================================================
+# TinyDB backend (original behaviour)
+# ============================================================
+
+class TinyDBMemoryBackend(MemoryBackend):
+    """Memories in a TinyDB table; searches are regex scans over every record.
+
+    Writes are appended to a log instead of rewriting the whole file.
+    """
+
+    name = "tinydb"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = TinyDB(path, storage=AppendLogStorage)
+        # No query cache: reads run concurrently on the storage read pool and
+        # TinyDB's cache is not thread-safe.
+        self.table = self.db.table('memories', cache_size=0)
+        self.vectors = self.db.table('memory_vectors', cache_size=0)
+
+    def upsert(self, record: Dict[str, Any], embedding: Optional[bytes] = None) -> None:
+        MemQuery = Query()
+        self.table.upsert(record, MemQuery.key == record['key'])
+        if embedding is not None:
+            self.set_embeddings([(record['key'], embedding)])
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        MemQuery = Query()
+        result = self.table.search(MemQuery.key == key)
+        return dict(result[0]) if result else None
+
+    def delete(self, key: str) -> bool:
+        MemQuery = Query()
+        self.vectors.remove(MemQuery.key == key)
+        return bool(self.table.remove(MemQuery.key == key))
+
+    def search(self, query, category=None, user_id=None, limit=None):
+        MemQuery = Query()
+        condition = MemQuery.content.search(query, flags=0)
+        if category:
+            condition &= MemQuery.category == category
+        if user_id:
+            condition &= MemQuery.user_id == user_id
+        results = [dict(doc) for doc in self.table.search(condition)]
+        return results[:limit] if limit else results
+
+    def list(self, category=None):
+        if category:
+            MemQuery = Query()
+            return [dict(doc) for doc in self.table.search(MemQuery.category == category)]
+        return [dict(doc) for doc in self.table.all()]
+
+    def recent(self, limit):
+        return sorted(self.list(), key=lambda m: m['timestamp'], reverse=True)[:limit]
+
+    def count(self) -> int:
+        return len(self.table)
+
+    def embeddings(self):
+        stored = {doc['key']: doc['embedding'] for doc in self.vectors.all()}
+        for doc in self.table.all():
+            encoded = stored.get(doc['key'])
+            yield doc['key'], base64.b64decode(encoded) if encoded else None
+
+    def set_embeddings(self, items):
+        MemQuery = Query()
+        for key, embedding in items:
+            self.vectors.upsert(
+                {'key': key, 'embedding': base64.b64encode(embedding).decode('ascii')},
+                MemQuery.key == key,
+            )
+
+    def close(self) -> None:
+        self.db.close()
+
+
+# ============================================================
+# SQLite + FTS5 backend
+# ============================================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    id        INTEGER PRIMARY KEY,
+    key       TEXT NOT NULL UNIQUE,
+    content   TEXT NOT NULL,
+    category  TEXT NOT NULL DEFAULT 'general',
+    timestamp TEXT NOT NULL,
+    user_id   TEXT NOT NULL DEFAULT 'default_user',
+    embedding BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_memories_category ON memories(category);
+CREATE INDEX IF NOT EXISTS idx_memories_user_id ON memories(user_id);
+CREATE INDEX IF NOT EXISTS idx_memories_timestamp ON memories(timestamp);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+    content, key,
+    content='memories', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+    INSERT INTO memories_fts(rowid, content, key) VALUES (new.id, new.content, new.key);
+END;
+CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+    INSERT INTO memories_fts(memories_fts, rowid, content, key)
+    VALUES ('delete', old.id, old.content, old.key);
+END;
+CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE ON memories BEGIN
+    INSERT INTO memories_fts(memories_fts, rowid, content, key)
+    VALUES ('delete', old.id, old.content, old.key);
+    INSERT INTO memories_fts(rowid, content, key) VALUES (new.id, new.content, new.key);
+END;
+
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_COLUMNS = ", ".join(f"m.{field}" for field in MEMORY_FIELDS)
+
+
+def build_fts_query(query: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term and the terms are OR-ed together,
+    so partial matches are still returned and bm25 ranks records matching more
+    terms first. Returns None when the query contains no searchable words.
+    """
+    tokens = _TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    return " OR ".join(f'"{token}"*' for token in dict.fromkeys(tokens))
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+    """Memories in SQLite with secondary indexes and an FTS5 inverted index."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, legacy_tinydb_path: Optional[str] = None):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            conn = self._conn()
+            conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(memories)")}
+            if 'embedding' not in columns:
+                conn.execute("ALTER TABLE memories ADD COLUMN embedding BLOB")
+            if legacy_tinydb_path:
+                self._migrate_from_tinydb(conn, legacy_tinydb_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers run alongside the writer.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate_from_tinydb(self, conn: sqlite3.Connection, legacy_path: str) -> None:
+        """Import records from a TinyDB memory_store.db file exactly once.
+
+        The file is opened through AppendLogStorage, like the TinyDB backend
+        does, so writes still in its .log/.log.old sidecars are replayed too.
+        """
+        done = conn.execute(
+            "SELECT value FROM meta WHERE name = 'migrated_from_tinydb'"
+        ).fetchone()
+        if done or not any(os.path.exists(path) for path in [legacy_path, *sidecar_paths(legacy_path)]):
+            return
+
+        try:
+            storage = AppendLogStorage(legacy_path, commit_window_ms=0)
+            try:
+                data = storage.read() or {}
+            finally:
+                storage.close()
+        except (OSError, ValueError):
+            data = {}
+
+        records = list(data.get('memories', {}).values())
+        vectors = {doc.get('key'): doc.get('embedding') for doc in data.get('memory_vectors', {}).values()}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for record in records:
+                if record.get('key') and 'content' in record:
+                    encoded = vectors.get(record['key'])
+                    self._upsert(conn, record, base64.b64decode(encoded) if encoded else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta(name, value) VALUES ('migrated_from_tinydb', ?)",
+                (str(len(records)),),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _upsert(
+        conn: sqlite3.Connection, record: Dict[str, Any], embedding: Optional[bytes] = None
+    ) -> None:
+        conn.execute(
+            """
+            INSERT INTO memories(key, content, category, timestamp, user_id, embedding)
+            VALUES (:key, :content, :category, :timestamp, :user_id, :embedding)
+            ON CONFLICT(key) DO UPDATE SET
+                content = excluded.content,
+                category = excluded.category,
+                timestamp = excluded.timestamp,
+                user_id = excluded.user_id,
+                embedding = excluded.embedding
+            """,
+            {
+                'key': record['key'],
+                'content': record['content'],
+                'category': record.get('category', 'general'),
+                'timestamp': record.get('timestamp', ''),
+                'user_id': record.get('user_id', 'default_user'),
+                'embedding': embedding,
+            },
+        )
+
+    def upsert(self, record: Dict[str, Any], embedding: Optional[bytes] = None) -> None:
+        with self._write_lock:
+            self._upsert(self._conn(), record, embedding)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            f"SELECT {_COLUMNS} FROM memories m WHERE m.key = ?", (key,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def delete(self, key: str) -> bool:
+        with self._write_lock:
+            cursor = self._conn().execute("DELETE FROM memories WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def search(self, query, category=None, user_id=None, limit=None):
+        filters, params = [], []
+        if category:
+            filters.append("m.category = ?")
+            params.append(category)
+        if user_id:
+            filters.append("m.user_id = ?")
+            params.append(user_id)
+
+        match = build_fts_query(query)
+        if match is None:
+            # Nothing indexable (e.g. punctuation only): fall back to a substring scan.
+            sql = f"SELECT {_COLUMNS} FROM memories m WHERE instr(m.content, ?) > 0"
+            params.insert(0, query)
+            order = " ORDER BY m.timestamp DESC"
+        else:
+            sql = (
+                f"SELECT {_COLUMNS}, bm25(memories_fts, 1.0, 0.5) AS rank "
+                "FROM memories_fts JOIN memories m ON m.id = memories_fts.rowid "
+                "WHERE memories_fts MATCH ?"
+            )
+            params.insert(0, match)
+            order = " ORDER BY rank"
+
+        if filters:
+            sql += " AND " + " AND ".join(filters)
+        sql += order
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        results = []
+        for row in self._conn().execute(sql, params):
+            record = {field: row[field] for field in MEMORY_FIELDS}
+            if 'rank' in row.keys():
+                # bm25() is lower-is-better; expose a higher-is-better score.
+                record['score'] = round(-row['rank'], 4)
+            results.append(record)
+        return results
+
+    def list(self, category=None):
+        if category:
+            rows = self._conn().execute(
+                f"SELECT {_COLUMNS} FROM memories m WHERE m.category = ? ORDER BY m.id",
+                (category,),
+            )
+        else:
+            rows = self._conn().execute(f"SELECT {_COLUMNS} FROM memories m ORDER BY m.id")
+        return [dict(row) for row in rows]
+
+    def recent(self, limit):
+        rows = self._conn().execute(
+            f"SELECT {_COLUMNS} FROM memories m ORDER BY m.timestamp DESC LIMIT ?", (int(limit),)
+        )
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+
+    def embeddings(self):
+        for row in self._conn().execute("SELECT key, embedding FROM memories ORDER BY id"):
+            yield row['key'], row['embedding']
+
+    def set_embeddings(self, items):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("UPDATE memories SET embedding = ? WHERE key = ?",
+                                 [(embedding, key) for key, embedding in items])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_backend(kind: str, directory: str) -> MemoryBackend:
+    """
+    Create the memory backend named `kind` with its files under `directory`.
+
+    Args:
+        kind: 'sqlite' (indexed, default) or 'tinydb' (original regex scans)
+        directory: Folder holding the database files
+    """
+    legacy_path = os.path.join(directory, "memory_store.db")
+    if kind == "tinydb":
+        return TinyDBMemoryBackend(legacy_path)
+    if kind == "sqlite":
+        return SQLiteMemoryBackend(
+            os.path.join(directory, "memory_store.sqlite3"),
+            legacy_tinydb_path=legacy_path,
+        )
+    raise ValueError(f"Unknown memory backend '{kind}' (expected 'sqlite' or 'tinydb')")
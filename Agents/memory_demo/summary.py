@@ -0,0 +1,148 @@
+"""
+Incrementally maintained memory-store summary for get_backend_memory_data.
+
+`MemorySummary` is built once from the backend at startup and then updated by
+the write tools (`save_memory`, `delete_memory`) instead of re-reading and
+regrouping the whole store on every dashboard call. It keeps:
+- per-category entries and counts
+- a bounded min-heap of the most recent memories
+- the serialized BACKEND_PROCESSES payload, cached until the next mutation.
+  Each category's JSON fragment is cached separately, so a mutation only
+  re-serializes the category it touched.
+"""
+
+import heapq
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .storage import MemoryBackend
+
+RECENT_LIMIT = 5
+PREVIEW_CHARS = 100
+
+_dumps = json.JSONEncoder(separators=(',', ':')).encode
+
+
+def _preview(content: str) -> str:
+    return content[:PREVIEW_CHARS] + '...' if len(content) > PREVIEW_CHARS else content
+
+
+class MemorySummary:
+    """Dashboard view of the memory store, kept current by the write tools."""
+
+    def __init__(self, backend: MemoryBackend, recent_limit: int = RECENT_LIMIT):
+        self.backend = backend
+        self.recent_limit = recent_limit
+        self._lock = threading.Lock()
+        self._by_category: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._category_of: Dict[str, str] = {}
+        self._recent: List[Tuple[str, str]] = []  # min-heap of (timestamp, key)
+        self._category_json: Dict[str, str] = {}
+        self._payload: Optional[str] = None
+        self.rebuild()
+
+    # ------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------
+
+    def rebuild(self) -> None:
+        """Recompute everything from the backend (startup only)."""
+        with self._lock:
+            self._by_category.clear()
+            self._category_of.clear()
+            self._recent = []
+            for record in self.backend.list():
+                self._add(record)
+            self._category_json.clear()
+            self._payload = None
+
+    def record_upsert(self, record: Dict[str, Any]) -> None:
+        """Apply a saved (inserted or replaced) memory."""
+        with self._lock:
+            self._remove(record['key'])
+            self._add(record)
+
+    def record_delete(self, key: str) -> None:
+        """Apply a deleted memory."""
+        with self._lock:
+            if self._remove(key) and len(self._recent) < min(self.recent_limit, len(self._category_of)):
+                # A recent memory was deleted: refill the heap from the timestamp index.
+                self._recent = [(m['timestamp'], m['key']) for m in self.backend.recent(self.recent_limit)]
+                heapq.heapify(self._recent)
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        category = record.get('category', 'general')
+        self._by_category.setdefault(category, {})[record['key']] = {
+            'key': record['key'],
+            'content': record['content'],
+            'timestamp': record['timestamp'],
+        }
+        self._category_of[record['key']] = category
+        entry = (record['timestamp'], record['key'])
+        if len(self._recent) < self.recent_limit:
+            heapq.heappush(self._recent, entry)
+        elif entry > self._recent[0]:
+            heapq.heapreplace(self._recent, entry)
+        self._invalidate(category)
+
+    def _remove(self, key: str) -> bool:
+        """Drop `key` from the summary. Returns True if it was in the recent heap."""
+        category = self._category_of.pop(key, None)
+        if category is None:
+            return False
+        entries = self._by_category[category]
+        del entries[key]
+        if not entries:
+            del self._by_category[category]
+        self._invalidate(category)
+
+        for index, (_, recent_key) in enumerate(self._recent):
+            if recent_key == key:
+                self._recent[index] = self._recent[-1]
+                self._recent.pop()
+                heapq.heapify(self._recent)
+                return True
+        return False
+
+    def _invalidate(self, category: str) -> None:
+        self._category_json.pop(category, None)
+        self._payload = None
+
+    # ------------------------------------------------------------
+    # Payload
+    # ------------------------------------------------------------
+
+    def payload(self) -> str:
+        """Return the serialized backend data; cached until the next mutation."""
+        with self._lock:
+            if self._payload is None:
+                self._payload = self._serialize()
+            return self._payload
+
+    def _serialize(self) -> str:
+        fragments = []
+        for category, entries in self._by_category.items():
+            fragment = self._category_json.get(category)
+            if fragment is None:
+                fragment = self._category_json[category] = _dumps(list(entries.values()))
+            fragments.append(f"{_dumps(category)}:{fragment}")
+
+        recent = []
+        for timestamp, key in sorted(self._recent, reverse=True):
+            category = self._category_of[key]
+            entry = self._by_category[category][key]
+            recent.append({
+                'key': key,
+                'content': _preview(entry['content']),
+                'category': category,
+                'timestamp': timestamp,
+            })
+
+        return (
+            '{"type":"memory_store",'
+            f'"total_memories":{len(self._category_of)},'
+            f'"categories":{_dumps(list(self._by_category))},'
+            f'"memories_by_category":{{{",".join(fragments)}}},'
+            f'"recent_memories":{_dumps(recent)}}}'
+        )
@@ -0,0 +1,229 @@
+"""
+Offline embeddings and approximate-nearest-neighbour search for memories.
+
+- `HashingEmbedder`: turns text into a fixed-size, L2-normalised NumPy vector
+  with the hashing trick (words + character trigrams, signed feature hashing,
+  log-scaled term counts). No model download and no network calls.
+- `SemanticIndex`: inverted-file (IVF) index for cosine similarity that is
+  updated incrementally on add/remove. Candidates from the lists nearest the
+  query are re-ranked with exact cosine similarity. Small collections are
+  scanned exactly, which is faster anyway.
+"""
+
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+EMBEDDING_DIM = 256
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Very common words carry no meaning for matching memories.
+STOPWORDS = frozenset(
+    "a an and are as at be by do does for from has have i in is it its my me of on or "
+    "our the their to was were what when where which who will with you your".split()
+)
+
+
+class HashingEmbedder:
+    """Deterministic text -> vector embedding using feature hashing."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM, char_ngram: int = 3, ngram_weight: float = 0.3):
+        self.dim = dim
+        self.char_ngram = char_ngram
+        self.ngram_weight = ngram_weight
+
+    def _features(self, text: str) -> Iterable[Tuple[str, float]]:
+        for word in _WORD_RE.findall(text.lower()):
+            if word in STOPWORDS:
+                continue
+            yield word, 1.0
+            # Character n-grams let related word forms share features
+            # ("hobby" / "hobbies", "guitar" / "guitarist").
+            padded = f"<{word}>"
+            for start in range(len(padded) - self.char_ngram + 1):
+                yield "#" + padded[start:start + self.char_ngram], self.ngram_weight
+
+    def embed(self, text: str) -> np.ndarray:
+        counts: Dict[int, float] = {}
+        for feature, weight in self._features(text):
+            hashed = zlib.crc32(feature.encode("utf-8"))
+            index = hashed % self.dim
+            sign = weight if (hashed >> 31) & 1 else -weight
+            counts[index] = counts.get(index, 0.0) + sign
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if counts:
+            indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            vector[indices] = np.sign(values) * np.log1p(np.abs(values))
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector
+
+    def to_bytes(self, vector: np.ndarray) -> bytes:
+        return vector.astype(np.float32).tobytes()
+
+    def from_bytes(self, blob: Optional[bytes]) -> Optional[np.ndarray]:
+        """Decode a stored embedding, or None if it was made with another dimension."""
+        if not blob or len(blob) != self.dim * 4:
+            return None
+        return np.frombuffer(blob, dtype=np.float32)
+
+
+class SemanticIndex:
+    """Incremental cosine-similarity index (IVF: coarse centroids + exact re-rank).
+
+    Vectors live in one contiguous float32 matrix; each vector is also filed in
+    the inverted list of its nearest centroid. A search scores the query against
+    the centroids, gathers the `n_probe` closest lists and re-ranks those
+    candidates exactly. Adds and removes only touch one list. Centroids are
+    (re)trained with spherical k-means when the index first reaches
+    `train_threshold` vectors and again whenever it has grown 4x since.
+    Below the threshold every search is an exact scan.
+    """
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        n_probe: int = 16,
+        train_threshold: int = 2000,
+        seed: int = 7,
+    ):
+        self.dim = dim
+        self.n_probe = n_probe
+        self.train_threshold = train_threshold
+        self._rng = np.random.default_rng(seed)
+
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((1024, dim), dtype=np.float32)
+        self._slot_of: Dict[str, int] = {}
+        self._key_of: Dict[int, str] = {}
+        self._free: List[int] = []
+        self._size = 0  # high-water mark of used slots
+
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._list_of = np.zeros(1024, dtype=np.int64)
+        self._lists: List[Set[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def add(self, key: str, vector: np.ndarray) -> None:
+        """Insert or replace the vector stored for `key`."""
+        self.add_many([key], vector.reshape(1, -1))
+
+    def add_many(self, keys: List[str], vectors: np.ndarray) -> None:
+        """Bulk insert; assigns all vectors to centroids in one matrix product."""
+        if not keys:
+            return
+        with self._lock:
+            slots = []
+            for key, vector in zip(keys, vectors):
+                self._remove_locked(key)
+                slot = self._free.pop() if self._free else self._grow()
+                self._vectors[slot] = vector
+                self._slot_of[key] = slot
+                self._key_of[slot] = key
+                slots.append(slot)
+
+            if self._centroids is None:
+                if len(self._slot_of) >= self.train_threshold:
+                    self._train_locked()
+            elif len(self._slot_of) >= 4 * self._trained_size:
+                self._train_locked()
+            else:
+                self._assign_locked(np.asarray(slots, dtype=np.int64))
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _grow(self) -> int:
+        if self._size == len(self._vectors):
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+            self._list_of = np.concatenate([self._list_of, np.zeros_like(self._list_of)])
+        self._size += 1
+        return self._size - 1
+
+    def _remove_locked(self, key: str) -> None:
+        slot = self._slot_of.pop(key, None)
+        if slot is None:
+            return
+        del self._key_of[slot]
+        if self._centroids is not None:
+            list_id = int(self._list_of[slot])
+            self._lists[list_id].discard(slot)
+            self._list_arrays.pop(list_id, None)
+        self._vectors[slot] = 0.0
+        self._free.append(slot)
+
+    def _assign_locked(self, slots: np.ndarray) -> None:
+        nearest = np.argmax(self._vectors[slots] @ self._centroids.T, axis=1)
+        for slot, list_id in zip(slots.tolist(), nearest.tolist()):
+            self._list_of[slot] = list_id
+            self._lists[list_id].add(slot)
+            self._list_arrays.pop(list_id, None)
+
+    def _train_locked(self, iterations: int = 8) -> None:
+        """Spherical k-means on a sample, then file every vector under its centroid."""
+        live = np.fromiter(self._key_of.keys(), dtype=np.int64, count=len(self._key_of))
+        n_lists = max(1, int(2 * np.sqrt(len(live))))
+        sample = self._vectors[self._rng.choice(live, min(len(live), n_lists * 40), replace=False)]
+        centroids = sample[self._rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+
+        self._centroids = centroids
+        self._trained_size = len(live)
+        self._lists = [set() for _ in range(n_lists)]
+        self._list_arrays = {}
+        for start in range(0, len(live), 50000):
+            self._assign_locked(live[start:start + 50000])
+
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        closeness = self._centroids @ vector
+        n_probe = min(self.n_probe, len(closeness))
+        probe = np.argpartition(-closeness, n_probe - 1)[:n_probe]
+        arrays = []
+        for list_id in probe.tolist():
+            array = self._list_arrays.get(list_id)
+            if array is None:
+                members = self._lists[list_id]
+                array = self._list_arrays[list_id] = np.fromiter(members, dtype=np.int64, count=len(members))
+            arrays.append(array)
+        return np.concatenate(arrays)
+
+    def search(self, vector: np.ndarray, k: int = 5, exact: bool = False) -> List[Tuple[str, float]]:
+        """Return up to `k` (key, cosine similarity) pairs, most similar first."""
+        with self._lock:
+            if not self._slot_of:
+                return []
+            slots = None
+            if not exact and self._centroids is not None:
+                slots = self._candidates(vector)
+                if len(slots) < k:
+                    slots = None
+            if slots is None:
+                # Exact scan over the contiguous block; freed slots are masked out.
+                slots = np.arange(self._size)
+                scores = self._vectors[:self._size] @ vector
+                if self._free:
+                    scores[self._free] = -np.inf
+            else:
+                scores = self._vectors[slots] @ vector
+            top = min(k, len(self._slot_of), len(slots))
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            return [(self._key_of[int(slots[i])], float(scores[i])) for i in best]
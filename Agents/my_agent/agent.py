@@ -1,5 +1,10 @@
 """Example ADK agent integrating existing add/multiply tools.
 
+Besides the scalar add/multiply tools it has `evaluate_expressions`, which
+evaluates whole arithmetic expressions (including sum/product/dot and
+elementwise operations over lists) in one tool call with a safe, AST-based
+evaluator (expressions.py), instead of one model round trip per operation.
+
 How to run:
 - CLI (from parent directory that contains the 'my_agent' folder):
         adk run my_agent
@@ -8,9 +13,15 @@ How to run:
     Then open http://127.0.0.1:8000/dev-ui/?app=my_agent
 """
 import os
-from typing import Dict
+from typing import Any, Dict, List
 from google.adk.agents.llm_agent import Agent
 
+from common.models import get_model
+from common.profiling import profiler
+from common.tracing import tracer
+
+from .expressions import ExpressionError, evaluate
+
 # Tool implementations (simple math) matching your earlier script
 
 def add_numbers(a: float, b: float) -> Dict[str, float]:
@@ -22,14 +33,46 @@ def multiply_numbers(a: float, b: float) -> Dict[str, float]:
     """Returns the product of two numbers."""
     return {"result": a * b}
 
+
+def evaluate_expressions(expressions: List[str]) -> Dict[str, Any]:
+    """Evaluates one or more arithmetic expressions in a single call.
+
+    Supports numbers, lists like [1, 2, 3], + - * / // % ** (elementwise on
+    lists), and the functions sum, product, dot, mean, min, max, abs, round,
+    sqrt, len and cumsum, plus the constants pi and e.
+
+    Args:
+        expressions: Expressions to evaluate, e.g.
+            ["sum([12, 7.5, 3]) * 1.2", "dot([1, 2, 3], [4, 5, 6])", "[10, 20] * 1.1"]
+
+    Returns:
+        Dictionary with status and one entry per expression, holding either
+        its result (a number or list of numbers) or an error message.
+    """
+    results = []
+    for expression in expressions:
+        try:
+            results.append({"expression": expression, "result": evaluate(expression)})
+        except ExpressionError as error:
+            results.append({"expression": expression, "error": str(error)})
+    failed = sum(1 for result in results if "error" in result)
+    status = "success" if not failed else ("error" if failed == len(results) else "partial")
+    return {"status": status, "results": results}
+
 # Root agent definition. ADK automatically exposes tools when listed.
 root_agent = Agent(
-    model="gemini-2.0-flash",  # You can switch to gemini-2.5-flash when available
+    model=get_model("gemini-2.0-flash"),  # You can switch to gemini-2.5-flash when available
     name="math_chat_agent",
     description="Conversational agent that can chat and do basic math using tools.",
     instruction=(
-        "You are a friendly assistant. For math operations use the provided tools: "
-        "add_numbers and multiply_numbers. Keep responses concise unless asked to expand."
+        "You are a friendly assistant. For math operations use the provided tools. "
+        "Prefer evaluate_expressions: write the whole calculation as one expression "
+        "(e.g. 'sum([4, 8, 15]) * 1.2') and put independent calculations in the same call, "
+        "instead of chaining add_numbers and multiply_numbers one operation at a time. "
+        "Keep responses concise unless asked to expand."
     ),
-    tools=[add_numbers, multiply_numbers],
+    tools=[add_numbers, multiply_numbers, evaluate_expressions],
 )
+
+profiler.install(root_agent)
+app = tracer.app("my_agent", root_agent)
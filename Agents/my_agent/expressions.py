@@ -0,0 +1,198 @@
+"""
+Safe arithmetic evaluation for the math agent.
+
+`evaluate(expression)` parses the expression with `ast` and walks the tree
+itself; only the node types below are accepted, so there are no attribute
+lookups, calls to arbitrary names, comprehensions or imports. Allowed:
+
+- numbers and list literals of numbers/expressions: `[1, 2.5, 3]`
+- `+ - * / // % **` and unary `-`/`+`, elementwise with broadcasting over
+  lists (`[1, 2, 3] * 1.2`, `[1, 2] + [3, 4]`)
+- the functions in FUNCTIONS: sum, product, dot, mean, min, max, abs,
+  round, sqrt, len, cumsum
+- the constants pi and e
+
+Scalar subtrees made only of integer literals and `+ - * // % **` (with a
+non-negative exponent) are evaluated with exact Python ints, so `2**60 + 1` is
+exact; everything else (lists, functions, `/`, floats, constants) is float64
+numpy arrays/scalars, which are exact for integers only up to 2**53.
+Division by zero, overflow and invalid operations raise `ExpressionError`
+instead of returning inf/nan, mean/min/max of an empty list are rejected, and
+list sizes, exponents, integer sizes and expression length are capped.
+"""
+
+import ast
+import math
+import operator
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+
+MAX_EXPRESSION_CHARS = 5000
+MAX_ELEMENTS = 10_000
+MAX_EXPONENT = 1000
+MAX_ROUND_DIGITS = 15
+MAX_INT_BITS = 1024  # same range as float64, which would overflow here anyway
+
+Number = Union[int, float]
+
+
+class ExpressionError(ValueError):
+    """The expression is invalid, not allowed, or cannot be evaluated."""
+
+
+def _round(value: Any, digits: Any = 0) -> Any:
+    if np.ndim(digits) or not np.isfinite(digits) or digits != int(digits):
+        raise ExpressionError("round() digits must be a whole number")
+    if abs(digits) > MAX_ROUND_DIGITS:
+        raise ExpressionError(f"round() digits are limited to +/-{MAX_ROUND_DIGITS}")
+    return np.round(value, int(digits))
+
+
+def _nonempty(name: str, reduce: Callable[..., Any]) -> Callable[..., Any]:
+    def checked(*values: Any) -> Any:
+        if any(np.size(value) == 0 for value in values):
+            raise ExpressionError(f"{name}() of an empty list is undefined")
+        return reduce(*values)
+    return checked
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "sum": lambda values: np.sum(values),
+    "product": lambda values: np.prod(values),
+    "dot": lambda left, right: np.dot(left, right),
+    "mean": _nonempty("mean", lambda values: np.mean(values)),
+    "min": _nonempty("min", lambda *values: np.min(values[0]) if len(values) == 1 else np.min(np.stack(np.broadcast_arrays(*values)), axis=0)),
+    "max": _nonempty("max", lambda *values: np.max(values[0]) if len(values) == 1 else np.max(np.stack(np.broadcast_arrays(*values)), axis=0)),
+    "abs": np.abs,
+    "round": _round,
+    "sqrt": np.sqrt,
+    "len": lambda values: np.float64(np.size(values)),
+    "cumsum": np.cumsum,
+}
+CONSTANTS = {"pi": math.pi, "e": math.e}
+
+BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+UNARY_OPERATORS: Dict[type, Callable[[Any], Any]] = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+# Operators that keep two ints an int; `/` and negative powers go through float64.
+INT_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.FloorDiv, ast.Mod, ast.Pow)
+
+
+def evaluate(expression: str) -> Union[Number, List[Number]]:
+    """Evaluate `expression` and return a number or a list of numbers.
+
+    Args:
+        expression: e.g. "sum([12, 7.5, 3]) * 1.2" or "dot([1, 2, 3], [4, 5, 6])"
+
+    Raises:
+        ExpressionError: for syntax errors, disallowed constructs, shape
+            mismatches and non-finite results.
+    """
+    if len(expression) > MAX_EXPRESSION_CHARS:
+        raise ExpressionError(f"expression longer than {MAX_EXPRESSION_CHARS} characters")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as error:
+        raise ExpressionError(f"invalid syntax: {error.msg}") from None
+    except (RecursionError, MemoryError):
+        raise ExpressionError("expression is nested too deeply") from None
+    try:
+        with np.errstate(all="raise"):
+            value = _eval(tree.body)
+    except ArithmeticError as error:  # FloatingPointError, OverflowError, ZeroDivisionError
+        raise ExpressionError(f"arithmetic error: {error}") from None
+    except RecursionError:
+        raise ExpressionError("expression is nested too deeply") from None
+    except (ValueError, TypeError, IndexError) as error:
+        if isinstance(error, ExpressionError):
+            raise
+        raise ExpressionError(str(error) or type(error).__name__) from None
+    return _to_python(value)
+
+
+def _eval(node: ast.AST) -> Any:
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"unsupported constant: {node.value!r}")
+        return _check_int(node.value) if isinstance(node.value, int) else np.float64(node.value)
+    if isinstance(node, (ast.List, ast.Tuple)):
+        if len(node.elts) > MAX_ELEMENTS:
+            raise ExpressionError(f"lists are limited to {MAX_ELEMENTS} elements")
+        values = [_float(_eval(element)) for element in node.elts]
+        if any(np.ndim(value) for value in values):
+            raise ExpressionError("nested lists are not supported")
+        return np.array(values, dtype=np.float64)
+    if isinstance(node, ast.Name):
+        if node.id not in CONSTANTS:
+            raise ExpressionError(f"unknown name: {node.id}")
+        return np.float64(CONSTANTS[node.id])
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        left, right = _eval(node.left), _eval(node.right)
+        if isinstance(node.op, ast.Pow) and np.any(np.abs(right) > MAX_EXPONENT):
+            raise ExpressionError(f"exponents are limited to {MAX_EXPONENT}")
+        operation = BINARY_OPERATORS[type(node.op)]
+        if isinstance(left, int) and isinstance(right, int) and isinstance(node.op, INT_OPERATORS):
+            if not isinstance(node.op, ast.Pow):
+                return _check_int(operation(left, right))
+            if right >= 0:
+                # Lower bound on the result's size, so huge powers are refused
+                # before computing them; _check_int does the exact check.
+                if (abs(left).bit_length() - 1) * right > MAX_INT_BITS:
+                    raise OverflowError("integer result too large")
+                return _check_int(operation(left, right))
+        return _check_size(operation(_float(left), _float(right)))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](_eval(node.operand))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        function = FUNCTIONS.get(node.func.id)
+        if function is None:
+            raise ExpressionError(f"unknown function: {node.func.id}")
+        return _check_size(function(*[_float(_eval(argument)) for argument in node.args]))
+    raise ExpressionError(f"unsupported syntax: {type(node).__name__}")
+
+
+def _check_int(value: int) -> int:
+    if value.bit_length() > MAX_INT_BITS:
+        raise OverflowError("integer result too large")
+    return value
+
+
+def _float(value: Any) -> Any:
+    # Python ints only live in int-only subtrees; anything else is float64.
+    return np.float64(value) if isinstance(value, int) else value
+
+
+def _check_size(value: Any) -> Any:
+    if np.size(value) > MAX_ELEMENTS:
+        raise ExpressionError(f"results are limited to {MAX_ELEMENTS} elements")
+    return value
+
+
+def _to_python(value: Any) -> Union[Number, List[Number]]:
+    if isinstance(value, int):
+        return value
+    values = np.asarray(value, dtype=np.float64)
+    if not np.all(np.isfinite(values)):
+        raise ExpressionError("result is not a finite number")
+    if values.ndim == 0:
+        return _plain(float(values))
+    return [_plain(float(item)) for item in values.ravel()]
+
+
+def _plain(value: float) -> Number:
+    # Hide float noise (0.1 + 0.2 -> 0.3) only when the 12-digit form is within a
+    # few ulps of the result; anything further apart is a real digit and is kept.
+    # 12.0 -> 12 reads naturally; float64 integers are only exact below 2**53,
+    # so larger ones stay floats rather than posing as exact ints.
+    short = float(f"{value:.12g}")
+    if abs(short - value) <= 4 * math.ulp(value):
+        value = short
+    return int(value) if value.is_integer() and abs(value) < 2 ** 53 else value
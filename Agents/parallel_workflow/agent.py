@@ -1,6 +1,6 @@
 """Parallel multi-agent workflow example using ADK with Google Search.
 
-Pattern: Parallel fan-out (3 researchers) -> Sequential gather (synthesizer)
+Pattern: Parallel fan-out (N researchers) -> Sequential gather (synthesizer)
 At least one agent uses Google Search built-in tool.
 
 Run (from parent directory):
@@ -10,66 +10,86 @@ Web UI:
 Select agent: parallel_workflow
 Requires: pip install google-adk (and GOOGLE_API_KEY in .env)
 Note: Google Search tool requires Gemini 2.x models and you'll need to display Search suggestions in UI per policy.
+
+The fan-out builds one researcher per topic at runtime (see fanout.py). Topics
+come from the `research_topics` state key, a "Topics: a, b, c" line in the
+prompt, or RESEARCH_TOPICS / the three defaults, capped at FANOUT_MAX_TOPICS
+(default 20) per request. At most FANOUT_MAX_CONCURRENCY
+researchers run at once and each has FANOUT_BRANCH_TIMEOUT_SECONDS to answer;
+late branches reach the synthesizer as "[TIMEOUT]" markers.
+
+The researchers have fixed instructions, so their answers are cached for
+MODEL_CACHE_TTL_SECONDS (default 1 hour) in `.model_cache.json`. The
+synthesizer is never cached: it always runs on this run's researcher outputs.
+
+HEDGE_RESEARCH=1 wraps the researchers' model in HedgedLlm: a call still running
+at the model's own p95 latency is duplicated and the first answer wins.
 """
-from google.adk.agents import ParallelAgent, SequentialAgent, LlmAgent
-from google.adk.tools import google_search
+import os
+
+from google.adk.agents import SequentialAgent, LlmAgent
+from google.adk.agents.readonly_context import ReadonlyContext
+
+from common.hedging import HedgedLlm
+from common.model_cache import ModelResponseCache
+from common.models import get_model
+from common.profiling import profiler
+from common.tracing import tracer
+
+from .fanout import ERROR_MARKER, TIMEOUT_MARKER, FanOutResearch, parse_topics
 
 MODEL = "gemini-2.0-flash"
+llm = get_model(MODEL)
 
-renewables = LlmAgent(
-    name="RenewableEnergyResearcher",
-    model=MODEL,
-    instruction=(
-        "You research 'renewable energy sources'. Use Google Search tool when helpful. "
-        "Return 1-2 sentence summary only."
-    ),
-    description="Researches renewable energy sources.",
-    tools=[google_search],
-    output_key="renewable_energy_result",
-)
+# Opt-in: duplicate researcher calls that run past their own p95 latency (see common/hedging.py).
+HEDGE_RESEARCH = os.environ.get("HEDGE_RESEARCH", "").lower() in ("1", "true", "yes")
+research_model = HedgedLlm.wrap(llm) if HEDGE_RESEARCH else llm
 
-ev = LlmAgent(
-    name="EVResearcher",
-    model=MODEL,
-    instruction=(
-        "You research 'electric vehicle technology'. Use Google Search tool when helpful. "
-        "Return 1-2 sentence summary only."
-    ),
-    description="Researches electric vehicle technology.",
-    tools=[google_search],
-    output_key="ev_technology_result",
+research_cache = ModelResponseCache(
+    path=os.environ.get("MODEL_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".model_cache.json")),
 )
 
-carbon = LlmAgent(
-    name="CarbonCaptureResearcher",
-    model=MODEL,
-    instruction=(
-        "You research 'carbon capture methods'. Use Google Search tool when helpful. "
-        "Return 1-2 sentence summary only."
-    ),
-    description="Researches carbon capture methods.",
-    tools=[google_search],
-    output_key="carbon_capture_result",
-)
+DEFAULT_TOPICS = [
+    "renewable energy sources",
+    "electric vehicle technology",
+    "carbon capture methods",
+]
 
-parallel_research = ParallelAgent(
+parallel_research = FanOutResearch(
     name="ParallelWebResearch",
-    sub_agents=[renewables, ev, carbon],
-    description="Runs three researchers concurrently; writes results into session state.",
+    model=research_model,
+    topics=parse_topics(os.environ.get("RESEARCH_TOPICS", "")) or DEFAULT_TOPICS,
+    max_concurrency=int(os.environ.get("FANOUT_MAX_CONCURRENCY", "5")),
+    max_topics=int(os.environ.get("FANOUT_MAX_TOPICS", "20")),
+    branch_timeout=float(os.environ.get("FANOUT_BRANCH_TIMEOUT_SECONDS", "30")),
+    response_cache=research_cache,
+    profiler=profiler,
+    description="Runs one researcher per topic concurrently; writes research_results into session state.",
 )
 
-synthesizer = LlmAgent(
-    name="SynthesisAgent",
-    model=MODEL,
-    instruction="""
-You will receive three summaries from state:
-- Renewable: {renewable_energy_result}
-- EV Tech: {ev_technology_result}
-- Carbon Capture: {carbon_capture_result}
+
+def synthesis_instruction(context: ReadonlyContext) -> str:
+    """Lists this run's summaries per topic (built at runtime, so any number of topics)."""
+    results = context.state.get("research_results") or {}
+    summaries = "\n".join(f"- {topic}: {summary}" for topic, summary in results.items())
+    dropped = context.state.get("research_dropped") or []
+    if dropped:
+        summaries += f"\nNot researched (over the per-request topic limit): {', '.join(dropped)}"
+    return f"""
+You will receive {len(results)} summaries from state:
+{summaries}
 
 Write a cohesive, structured report with headings per topic and a brief conclusion. Do not invent facts.
+A summary starting with {TIMEOUT_MARKER} or {ERROR_MARKER} means that research did not finish:
+keep its heading and say the result is unavailable.
 Output ONLY the report text.
-""",
+"""
+
+
+synthesizer = LlmAgent(
+    name="SynthesisAgent",
+    model=llm,
+    instruction=synthesis_instruction,
     description="Synthesizes parallel research into a short report.",
 )
 
@@ -78,3 +98,6 @@ root_agent = SequentialAgent(
     sub_agents=[parallel_research, synthesizer],
     description="Orchestrates parallel research then synthesis.",
 )
+
+profiler.install(root_agent)
+app = tracer.app("parallel_workflow", root_agent)
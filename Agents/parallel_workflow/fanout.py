@@ -0,0 +1,208 @@
+"""
+Dynamic N-way research fan-out for the parallel workflow.
+
+`FanOutResearch` replaces a fixed `ParallelAgent`: it builds one researcher
+`LlmAgent` per topic at runtime and runs them on isolated branches.
+- Topics come from session state (`research_topics`, a list or a
+  comma-separated string), a "Topics: a, b, c" line in the user message, or
+  the agent's default topics, in that order. Topics that differ only in case
+  or punctuation ("AI" and "ai") share one slug and run once, and a request
+  gets at most `max_topics` researchers (FANOUT_MAX_TOPICS); the rest are
+  dropped and listed in `research_dropped`.
+- A semaphore caps how many branches (model calls) are in flight at once;
+  the cap is shared by every request this agent serves, so 20+ topics per
+  request do not turn into 20+ simultaneous Gemini calls.
+- Each branch gets a deadline once it starts. A branch that misses it (or
+  fails) is cancelled and recorded with a marker instead of blocking the
+  others.
+- A researcher's instruction is an instruction provider, not a string, so ADK
+  never applies `{state_key}` templating to it: a topic like "{user:email}"
+  stays literal text instead of pulling session state into the prompt.
+
+When all branches have finished or timed out, the agent writes
+`research_results` ({topic: summary or marker}, in topic order) and
+`research_incomplete` (topics that have no summary) to session state for the
+synthesizer.
+"""
+
+import asyncio
+import logging
+import re
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.events import Event, EventActions
+from google.adk.tools import google_search
+from pydantic import PrivateAttr
+
+TIMEOUT_MARKER = "[TIMEOUT]"
+ERROR_MARKER = "[ERROR]"
+MAX_CACHED_RESEARCHERS = 256
+
+logger = logging.getLogger(__name__)
+
+_TOPICS_LINE_RE = re.compile(r"^\s*topics\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+
+
+def topic_slug(topic: str) -> str:
+    """Identifier-safe form of a topic, used for agent names and state keys."""
+    return re.sub(r"\W+", "_", topic.lower()).strip("_")[:48] or "topic"
+
+
+def parse_topics(value: Any) -> List[str]:
+    """Accept a list of topics or a comma-separated string; drop blanks and duplicates.
+
+    Duplicates are topics with the same slug ("AI", "ai", "A.I."): they would share
+    one researcher name and output key, so only the first spelling is kept.
+    """
+    items = value.split(",") if isinstance(value, str) else list(value or [])
+    topics: List[str] = []
+    slugs = set()
+    for item in items:
+        topic = str(item).strip()
+        if topic and topic_slug(topic) not in slugs:
+            slugs.add(topic_slug(topic))
+            topics.append(topic)
+    return topics
+
+
+def _literal_instruction(text: str):
+    """Instruction provider returning `text` as-is (ADK skips state templating for providers)."""
+    def instruction(context: ReadonlyContext) -> str:
+        return text
+
+    return instruction
+
+
+class FanOutResearch(BaseAgent):
+    """Runs one researcher per topic with bounded concurrency and per-branch deadlines."""
+
+    model: Any
+    topics: List[str]
+    max_concurrency: int = 5
+    max_topics: int = 20
+    branch_timeout: float = 30.0
+    topics_state_key: str = "research_topics"
+    results_key: str = "research_results"
+    response_cache: Optional[Any] = None  # common.model_cache.ModelResponseCache
+    profiler: Optional[Any] = None  # common.profiling.Profiler, for the researchers built at runtime
+
+    _researchers: Dict[str, LlmAgent] = PrivateAttr(default_factory=dict)
+    _semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = PrivateAttr(default=None)
+
+    # ------------------------------------------------------------
+    # Branch construction
+    # ------------------------------------------------------------
+
+    def resolve_topics(self, ctx: InvocationContext) -> Tuple[List[str], List[str]]:
+        """(topics to research, topics dropped over `max_topics`)."""
+        topics = parse_topics(ctx.session.state.get(self.topics_state_key))
+        if not topics and ctx.user_content and ctx.user_content.parts:
+            text = "\n".join(part.text for part in ctx.user_content.parts if part.text)
+            match = _TOPICS_LINE_RE.search(text)
+            if match:
+                topics = parse_topics(match.group(1))
+        topics = topics or list(self.topics)
+        if len(topics) > self.max_topics:
+            logger.warning("%s: %d topics requested, researching the first %d",
+                           self.name, len(topics), self.max_topics)
+        return topics[:self.max_topics], topics[self.max_topics:]
+
+    def researcher_for(self, topic: str) -> LlmAgent:
+        """Build (once) the researcher for `topic`; it writes `<slug>_result` to state."""
+        researcher = self._researchers.get(topic)
+        if researcher is None:
+            slug = topic_slug(topic)
+            researcher = LlmAgent(
+                name=f"Researcher_{slug}",
+                model=self.model,
+                instruction=_literal_instruction(
+                    f"You research '{topic}'. Use Google Search tool when helpful. "
+                    "Return 1-2 sentence summary only."
+                ),
+                description=f"Researches {topic}.",
+                tools=[google_search],
+                output_key=f"{slug}_result",
+            )
+            if self.response_cache is not None:
+                self.response_cache.install(researcher)
+            if self.profiler is not None:
+                self.profiler.install_agent(researcher)
+            if len(self._researchers) >= MAX_CACHED_RESEARCHERS:
+                self._researchers.pop(next(iter(self._researchers)))
+            self._researchers[topic] = researcher
+        return researcher
+
+    def _branch_ctx(self, ctx: InvocationContext, researcher: LlmAgent) -> InvocationContext:
+        """Isolate each branch's conversation history, like ParallelAgent does."""
+        branch_ctx = ctx.model_copy()
+        suffix = f"{self.name}.{researcher.name}"
+        branch_ctx.branch = f"{ctx.branch}.{suffix}" if ctx.branch else suffix
+        return branch_ctx
+
+    def _limiter(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore[0] is not loop:
+            self._semaphore = (loop, asyncio.Semaphore(self.max_concurrency))
+        return self._semaphore[1]
+
+    # ------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        topics, dropped = self.resolve_topics(ctx)
+        limiter = self._limiter()
+        queue: asyncio.Queue = asyncio.Queue()
+        results: Dict[str, str] = {}
+        done = object()
+
+        async def run_branch(topic: str) -> None:
+            researcher = self.researcher_for(topic)
+            branch_ctx = self._branch_ctx(ctx, researcher)
+            try:
+                async with limiter:
+                    async with asyncio.timeout(self.branch_timeout):
+                        async for event in researcher.run_async(branch_ctx):
+                            if event.is_final_response() and event.content and event.content.parts:
+                                text = "".join(part.text or "" for part in event.content.parts).strip()
+                                if text:
+                                    results[topic] = text
+                            # Wait until the runner has processed the event, as ParallelAgent does.
+                            processed = asyncio.Event()
+                            await queue.put((event, processed))
+                            await processed.wait()
+            except TimeoutError:
+                results.setdefault(topic, f"{TIMEOUT_MARKER} No result within {self.branch_timeout:g}s.")
+            except Exception as exc:  # one failing branch must not sink the others
+                results.setdefault(topic, f"{ERROR_MARKER} {type(exc).__name__}: {exc}")
+            finally:
+                await queue.put((done, None))
+
+        tasks = [asyncio.create_task(run_branch(topic)) for topic in topics]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event, processed = await queue.get()
+                if event is done:
+                    remaining -= 1
+                    continue
+                yield event
+                processed.set()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        ordered = {topic: results.get(topic, f"{ERROR_MARKER} No result.") for topic in topics}
+        incomplete = [topic for topic, text in ordered.items() if text.startswith((TIMEOUT_MARKER, ERROR_MARKER))]
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={
+                self.results_key: ordered, "research_incomplete": incomplete, "research_dropped": dropped,
+            }),
+        )
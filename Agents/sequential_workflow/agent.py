@@ -11,15 +11,29 @@ Web UI:
     adk web . --port 8000
 Select agent: sequential_workflow
 Requires: pip install google-adk (and GOOGLE_API_KEY in .env)
+
+Each stage's output is checkpointed (`.checkpoints.sqlite3`, keyed by a hash of
+the stage's inputs and scoped to the user's session, see CHECKPOINT_SCOPE).
+Re-sending the same topic in the same session after a failure resumes at the
+first stage without a checkpoint; editing one instruction only reruns the
+stages whose inputs changed.
 """
+import os
+
 from google.adk.agents import SequentialAgent, LlmAgent
 
+from common.checkpoint import StageCheckpointer
+from common.models import get_model
+from common.profiling import profiler
+from common.tracing import tracer
+
 MODEL = "gemini-2.0-flash"
+llm = get_model(MODEL)
 
 # Step 1: expand topic
 expand_agent = LlmAgent(
     name="TopicExpander",
-    model=MODEL,
+    model=llm,
     instruction="""You expand a short user topic into 3-5 concise bullet points capturing key aspects.
 Output ONLY the bullet points (no intro).""",
     description="Expands topic into key points.",
@@ -29,7 +43,7 @@ Output ONLY the bullet points (no intro).""",
 # Step 2: draft based on expansion
 draft_agent = LlmAgent(
     name="ResearchDraft",
-    model=MODEL,
+    model=llm,
     instruction="""Write a cohesive paragraph synthesizing the points: {expanded_points}.
 Do not list bullets; integrate them naturally. Output ONLY the paragraph.""",
     description="Generates draft paragraph from expanded points.",
@@ -39,7 +53,7 @@ Do not list bullets; integrate them naturally. Output ONLY the paragraph.""",
 # Step 3: critique & improve
 improve_agent = LlmAgent(
     name="CritiqueImprove",
-    model=MODEL,
+    model=llm,
     instruction="""You are a writing quality improver. Read draft: {draft}
 Provide an improved version focusing on clarity & concision. If already excellent, return it unchanged.
 Output ONLY improved paragraph.""",
@@ -52,3 +66,11 @@ root_agent = SequentialAgent(
     sub_agents=[expand_agent, draft_agent, improve_agent],
     description="Sequential pipeline: expand -> draft -> improve.",
 )
+
+checkpointer = StageCheckpointer(
+    os.environ.get("CHECKPOINT_DB", os.path.join(os.path.dirname(__file__), ".checkpoints.sqlite3"))
+)
+checkpointer.install(root_agent)
+
+profiler.install(root_agent)
+app = tracer.app("sequential_workflow", root_agent)
@@ -0,0 +1,242 @@
+"""
+Batch mode for the sequential pipeline: many topics, all stages busy at once.
+
+Instead of running expand -> draft -> improve for one topic at a time, topics
+flow through the three stages like an assembly line:
+
+    topics -> [TopicExpander xN] -> queue -> [ResearchDraft xN] -> queue -> [CritiqueImprove xN] -> progress.jsonl
+
+- Each stage has its own worker count (`--concurrency`), so a slow stage can
+  get more workers than a fast one.
+- Queues between stages are bounded (`--queue-size`): a fast stage waits
+  instead of piling up work the next stage cannot take yet.
+- Every finished topic is appended to the JSONL progress file. A rerun skips
+  topics already in it, so an interrupted batch resumes where it stopped.
+  Stage checkpoints (see agent.py) also make a retried topic reuse the stages
+  it had already finished: every stage of a topic runs in a session whose id
+  is derived from the topic, so the session-scoped checkpoints of an earlier
+  run still apply.
+- Progress and throughput (topics per minute) are printed to stderr; a final
+  JSON summary goes to stdout.
+
+Run (from the Agents folder):
+    python -m sequential_workflow.batch topics.txt --progress results.jsonl
+    python -m sequential_workflow.batch topics.txt --concurrency 2,4,4 --queue-size 16
+    cat topics.txt | python -m sequential_workflow.batch - --progress results.jsonl
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from .agent import root_agent
+
+APP_NAME = "sequential_workflow_batch"
+USER_ID = "batch"
+
+_DONE = object()
+
+
+def topic_session_id(topic: str) -> str:
+    """Same id for the same topic in every run, so its stage checkpoints are found again."""
+    return "topic-" + hashlib.sha256(topic.encode("utf-8")).hexdigest()[:24]
+
+
+def load_completed(progress_path: Optional[str]) -> Set[str]:
+    """Topics already finished successfully according to the progress file."""
+    completed: Set[str] = set()
+    if not progress_path or not os.path.exists(progress_path):
+        return completed
+    with open(progress_path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from an interrupted run.
+            if record.get("status") == "success":
+                completed.add(record["topic"])
+    return completed
+
+
+class BatchPipeline:
+    """Runs the pipeline stages as concurrent workers connected by bounded queues."""
+
+    def __init__(
+        self,
+        stages: Optional[List[Any]] = None,
+        concurrency: Optional[List[int]] = None,
+        queue_size: int = 8,
+        progress_path: Optional[str] = None,
+    ):
+        # Clones run standalone under their own Runner; they keep the stage callbacks.
+        self.stages = [stage.clone() for stage in (stages or root_agent.sub_agents)]
+        self.concurrency = concurrency or [1] * len(self.stages)
+        if len(self.concurrency) != len(self.stages):
+            raise ValueError(f"Expected {len(self.stages)} concurrency values, got {len(self.concurrency)}")
+        self.queue_size = queue_size
+        self.progress_path = progress_path
+        self.session_service = InMemorySessionService()
+        self.runners = [
+            Runner(app_name=APP_NAME, agent=stage, session_service=self.session_service)
+            for stage in self.stages
+        ]
+        self.stats: Dict[str, Any] = {
+            "completed": 0,
+            "failed": 0,
+            "skipped": 0,
+            "stage_busy_s": {stage.name: 0.0 for stage in self.stages},
+        }
+
+    async def _run_stage(self, index: int, item: Dict[str, Any]) -> None:
+        """Run one stage for one topic in a short-lived session seeded with the earlier outputs."""
+        stage = self.stages[index]
+        start = time.perf_counter()
+        session = await self.session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, state=dict(item["state"]), session_id=topic_session_id(item["topic"])
+        )
+        try:
+            message = types.Content(role="user", parts=[types.Part(text=item["topic"])])
+            async for _ in self.runners[index].run_async(
+                user_id=USER_ID, session_id=session.id, new_message=message
+            ):
+                pass
+            session = await self.session_service.get_session(
+                app_name=APP_NAME, user_id=USER_ID, session_id=session.id
+            )
+            item["state"][stage.output_key] = session.state.get(stage.output_key)
+        finally:
+            await self.session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+            self.stats["stage_busy_s"][stage.name] += time.perf_counter() - start
+
+    async def _worker(self, index: int, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            if "error" not in item:
+                try:
+                    await self._run_stage(index, item)
+                except Exception as exc:  # keep the line moving; the topic is retried next run
+                    item["error"] = f"{self.stages[index].name}: {type(exc).__name__}: {exc}"
+            await outbox.put(item)
+
+    async def _produce(self, topics: AsyncIterator[str], outbox: asyncio.Queue, completed: Set[str]) -> None:
+        seen: Set[str] = set()
+        async for topic in topics:
+            topic = topic.strip()
+            if not topic or topic in seen:
+                continue
+            seen.add(topic)
+            if topic in completed:
+                self.stats["skipped"] += 1
+                continue
+            await outbox.put({"topic": topic, "state": {}, "started": time.perf_counter()})
+
+    async def _sink(self, inbox: asyncio.Queue, progress: Any, started: float) -> None:
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            record: Dict[str, Any] = {"topic": item["topic"]}
+            if "error" in item:
+                record.update(status="error", error=item["error"])
+                self.stats["failed"] += 1
+            else:
+                record["status"] = "success"
+                record.update({stage.output_key: item["state"].get(stage.output_key) for stage in self.stages})
+                self.stats["completed"] += 1
+            record["elapsed_s"] = round(time.perf_counter() - item["started"], 3)
+            if progress is not None:
+                progress.write(json.dumps(record) + "\n")
+                progress.flush()
+            done = self.stats["completed"] + self.stats["failed"]
+            minutes = (time.perf_counter() - started) / 60
+            print(
+                f"[batch] {done} done ({self.stats['failed']} failed), "
+                f"{done / minutes if minutes else 0:.1f} topics/min",
+                file=sys.stderr,
+            )
+
+    async def run(self, topics: Iterable[str]) -> Dict[str, Any]:
+        """Process `topics` (any iterable, consumed lazily) and return a summary."""
+        completed = load_completed(self.progress_path)
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        started = time.perf_counter()
+        progress = open(self.progress_path, "a", encoding="utf-8") if self.progress_path else None
+        try:
+            sink = asyncio.create_task(self._sink(queues[-1], progress, started))
+            stage_tasks = [
+                [asyncio.create_task(self._worker(index, queues[index], queues[index + 1])) for _ in range(workers)]
+                for index, workers in enumerate(self.concurrency)
+            ]
+            await self._produce(_aiter(topics), queues[0], completed)
+            # Shut the line down stage by stage so every queued topic is finished.
+            for index, workers in enumerate(stage_tasks):
+                for _ in workers:
+                    await queues[index].put(_DONE)
+                await asyncio.gather(*workers)
+            await queues[-1].put(_DONE)
+            await sink
+        finally:
+            if progress is not None:
+                progress.close()
+
+        elapsed = time.perf_counter() - started
+        processed = self.stats["completed"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "elapsed_s": round(elapsed, 2),
+            "topics_per_minute": round(processed / (elapsed / 60), 2) if elapsed else 0.0,
+            "stage_utilization": {
+                name: round(busy / (elapsed * workers), 3) if elapsed else 0.0
+                for (name, busy), workers in zip(self.stats["stage_busy_s"].items(), self.concurrency)
+            },
+            "stage_busy_s": {name: round(busy, 2) for name, busy in self.stats["stage_busy_s"].items()},
+        }
+
+
+async def _aiter(topics: Iterable[str]) -> AsyncIterator[str]:
+    # Pull from the iterable on a thread: a stdin stream may block between topics.
+    iterator = iter(topics)
+    while True:
+        topic = await asyncio.to_thread(next, iterator, None)
+        if topic is None:
+            return
+        yield topic
+
+
+def _read_topics(source: str) -> Iterable[str]:
+    handle = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    with handle:
+        for line in handle:
+            yield line
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics", help="file with one topic per line, or - for stdin")
+    parser.add_argument("--progress", default="batch_progress.jsonl", help="JSONL progress/results file")
+    parser.add_argument("--concurrency", default=os.environ.get("BATCH_STAGE_CONCURRENCY", "2,2,2"),
+                        help="workers per stage: one value for all stages or one per stage (expand,draft,improve)")
+    parser.add_argument("--queue-size", type=int, default=8, help="capacity of each queue between stages")
+    args = parser.parse_args()
+
+    values = [int(value) for value in args.concurrency.split(",")]
+    if len(values) == 1:
+        values = values * len(root_agent.sub_agents)
+    pipeline = BatchPipeline(concurrency=values, queue_size=args.queue_size, progress_path=args.progress)
+    summary = asyncio.run(pipeline.run(_read_topics(args.topics)))
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
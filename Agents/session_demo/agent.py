@@ -3,40 +3,59 @@ Session Demo Agent - Day 3a Implementation
 
 Demonstrates:
 - Session state management (user preferences, context)
-- State persistence with TinyDB
+- State persistence with TinyDB, partitioned per user and session
 - Backend helper agent for returning session data
 """
 
 import os
-from typing import Dict, Any
-from tinydb import TinyDB, Query
+from typing import Dict, Any, Tuple
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.tools.tool_context import ToolContext
 from google.genai import types
 
+from common.models import get_model
+from common.profiling import profiler
+from common.storage_executor import read_tool, write_tool
+from common.tracing import tracer
+
+from .state_store import ShardedStateStore
+
 # Configuration
 MODEL = "gemini-2.0-flash"
-DB_PATH = os.path.join(os.path.dirname(__file__), "session_state.db")
+STATE_DIR = os.environ.get("SESSION_STATE_DIR", os.path.join(os.path.dirname(__file__), "session_state"))
+CACHE_PARTITIONS = int(os.environ.get("SESSION_CACHE_PARTITIONS", "256"))
+
+# Persistent state, one partition per (user, session) with an LRU cache in front
+state_store = ShardedStateStore(STATE_DIR, max_cached_partitions=CACHE_PARTITIONS)
 
-# Initialize TinyDB for persistent state storage
-# Delete if already exists
 
-def delete_db_if_exists():
-    try:
-        if os.path.exists(DB_PATH):
-            os.remove(DB_PATH)
-    except Exception as e:
-        return
+def _partition_key(tool_context: ToolContext) -> Tuple[str, str]:
+    """(user_id, session_id) of the conversation that called the tool."""
+    session = tool_context.session
+    return session.user_id, session.id
 
-delete_db_if_exists()
-db = TinyDB(DB_PATH)
-state_table = db.table('session_state')
 
 # ============================================================
 # State Management Tools
 # ============================================================
 
+def reset_session_state(tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Clear the saved preferences of the current user's current session.
+    Other users and sessions are not affected.
+    """
+    user_id, session_id = _partition_key(tool_context)
+    # Drop cached copies in session state too, so lookups don't resurrect them
+    for state_key in state_store.items(user_id, session_id):
+        tool_context.state[state_key] = None
+    state_store.reset(user_id, session_id)
+    
+    return {
+        "status": "success",
+        "message": "Session state cleared"
+    }
+
+
 def save_user_preference(
     tool_context: ToolContext,
     preference_key: str,
@@ -53,12 +72,8 @@ def save_user_preference(
     state_key = f"user:{preference_key}"
     tool_context.state[state_key] = preference_value
     
-    # Save to TinyDB (persistent)
-    UserQuery = Query()
-    state_table.upsert(
-        {'key': state_key, 'value': preference_value},
-        UserQuery.key == state_key
-    )
+    # Save to the caller's partition (write-through cache + persistent)
+    state_store.set(*_partition_key(tool_context), state_key, preference_value)
     
     return {
         "status": "success",
@@ -81,12 +96,10 @@ def get_user_preference(
     # Try session state first
     value = tool_context.state.get(state_key)
     
-    # Fall back to persistent storage
+    # Fall back to the caller's partition (cached, no table scan)
     if not value:
-        UserQuery = Query()
-        result = state_table.search(UserQuery.key == state_key)
-        if result:
-            value = result[0]['value']
+        value = state_store.get(*_partition_key(tool_context), state_key)
+        if value:
             # Restore to session state
             tool_context.state[state_key] = value
     
@@ -108,11 +121,11 @@ def list_all_preferences(tool_context: ToolContext) -> Dict[str, Any]:
     List all stored user preferences.
     """
     # Get from persistent storage (State object doesn't support .items())
-    all_records = state_table.all()
+    all_records = state_store.items(*_partition_key(tool_context))
     all_prefs = {
-        record['key'].replace('user:', ''): record['value']
-        for record in all_records
-        if record['key'].startswith('user:')
+        key.replace('user:', ''): value
+        for key, value in all_records.items()
+        if key.startswith('user:')
     }
     
     return {
@@ -131,9 +144,8 @@ def get_backend_session_data(tool_context: ToolContext) -> str:
     Backend helper tool that returns session state data in BACKEND_PROCESSES format.
     This data will be parsed by the frontend for special rendering.
     """
-    # Get persistent data from TinyDB
-    all_db_records = state_table.all()
-    persistent_data = {record['key']: record['value'] for record in all_db_records}
+    # Get the caller's persistent partition
+    persistent_data = state_store.items(*_partition_key(tool_context))
     
     # Build backend data structure
     backend_data = {
@@ -152,8 +164,8 @@ def get_backend_session_data(tool_context: ToolContext) -> str:
 # ============================================================
 
 session_demo_agent = LlmAgent(
-    model=Gemini(
-        model=MODEL,
+    model=get_model(
+        MODEL,
         generation_config=types.GenerateContentConfig(
             temperature=0.7,
             top_p=0.95,
@@ -163,7 +175,8 @@ session_demo_agent = LlmAgent(
     name="session_demo_agent",
     instruction="""You are a helpful assistant that demonstrates session state management.
 
-    Every Time a User Starts a new session (new conversation) call delete_db_if_exists tool to reset the session state.
+    Each session starts with empty state. If the user asks to forget everything or start over,
+    call reset_session_state to clear this session's saved preferences.
 
 Your capabilities:
 1. Save user preferences using save_user_preference tool
@@ -178,14 +191,19 @@ When asked about preferences, retrieve them from the session state.
 
 If the user asks to see backend data or session state, use get_backend_session_data tool.
 """,
+    # Async variants: storage I/O runs off the event loop (reads on a bounded
+    # pool, writes on a single writer thread).
     tools=[
-        delete_db_if_exists,
-        save_user_preference,
-        get_user_preference,
-        list_all_preferences,
-        get_backend_session_data,
+        write_tool(reset_session_state),
+        write_tool(save_user_preference),
+        read_tool(get_user_preference),
+        read_tool(list_all_preferences),
+        read_tool(get_backend_session_data),
     ],
 )
 
 # Export as root_agent for ADK
 root_agent = session_demo_agent
+
+profiler.install(root_agent)
+app = tracer.app("session_demo", root_agent)
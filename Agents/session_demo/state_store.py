@@ -0,0 +1,183 @@
+"""
+Per-user, per-session state store for the Session Demo Agent.
+
+State is partitioned by (user_id, session_id): every partition is its own small
+TinyDB file under `session_state/<user>/<session>.db`, written through
+`AppendLogStorage`. A bounded LRU cache keeps the most recently used partitions
+open with their values in memory:
+- reads are served from the cache (a cold partition is loaded once, and only
+  that partition is read, outside the store lock: other sessions never wait on
+  that load, and callers for the same partition wait for the one loading it)
+- writes are write-through: the cache and the partition file are updated together
+- resetting clears only the caller's partition, never other users' data
+- partitions pushed out of the cache are closed (flusher joined, log fsynced)
+  by the caller that evicted them, after the store lock is released, so other
+  sessions never wait on that I/O
+- all partition files share one group-commit thread (`LogFlusher`) instead of
+  running one each
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from tinydb import TinyDB, Query
+
+from common.log_storage import AppendLogStorage, LogFlusher, sidecar_paths
+
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def _safe_name(value: str) -> str:
+    """Readable, collision-free file name for an arbitrary user/session id."""
+    digest = hashlib.sha1(value.encode("utf-8")).hexdigest()[:10]
+    return f"{_UNSAFE_RE.sub('_', value)[:40]}-{digest}"
+
+
+class _Partition:
+    """One cached (user, session) partition; its file is only created on first write.
+
+    Cached before it is loaded: whoever created it calls load() once the store
+    lock is released, and everyone else waits for `loaded`.
+    """
+
+    def __init__(self, path: str, flusher: LogFlusher):
+        self.path = path
+        self.flusher = flusher
+        self.lock = threading.Lock()
+        self.closed = False
+        self.loaded = threading.Event()  # set once load() has finished, successfully or not
+        self.load_error: Optional[BaseException] = None
+        self.released = threading.Event()  # set once close() has flushed everything to disk
+        self.db = None
+        self.table = None
+        self.values: Dict[str, str] = {}
+
+    def load(self) -> None:
+        try:
+            if any(os.path.exists(file_path) for file_path in [self.path, *sidecar_paths(self.path)]):
+                self._open()
+                self.values = {doc['key']: doc['value'] for doc in self.table.all()}
+        except BaseException as exc:
+            self.load_error = exc
+            raise
+        finally:
+            self.loaded.set()
+
+    def _open(self) -> None:
+        self.db = TinyDB(self.path, storage=AppendLogStorage, create_dirs=True, flusher=self.flusher)
+        self.table = self.db.table('session_state', cache_size=0)
+
+    def set(self, key: str, value: str) -> None:
+        if self.db is None:
+            self._open()
+        StateQuery = Query()
+        self.table.upsert({'key': key, 'value': value}, StateQuery.key == key)
+        self.values[key] = value
+
+    def close(self) -> None:
+        self.loaded.wait()
+        self.closed = True
+        if self.db is not None:
+            self.db.close()
+        self.released.set()
+
+
+class ShardedStateStore:
+    """Partitioned key/value state with a write-through LRU cache of partitions."""
+
+    def __init__(self, root_dir: str, max_cached_partitions: int = 256):
+        self.root_dir = root_dir
+        self.max_cached_partitions = max_cached_partitions
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], _Partition]" = OrderedDict()
+        # Evicted partitions that are still being closed outside the lock.
+        self._closing: Dict[Tuple[str, str], _Partition] = {}
+        self._flusher = LogFlusher(name="state-store-flush")
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, user_id: str, session_id: str) -> str:
+        return os.path.join(self.root_dir, _safe_name(user_id), f"{_safe_name(session_id)}.db")
+
+    def _partition(self, user_id: str, session_id: str) -> _Partition:
+        key = (user_id, session_id)
+        while True:
+            evicted = []
+            created = False
+            with self._lock:
+                partition = self._cache.get(key)
+                if partition is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                else:
+                    closing = self._closing.get(key)
+                    if closing is None or closing.released.is_set():
+                        self.misses += 1
+                        partition = _Partition(self._path(user_id, session_id), self._flusher)
+                        created = True
+                        self._cache[key] = partition
+                        while len(self._cache) > self.max_cached_partitions:
+                            evicted.append(self._cache.popitem(last=False))
+                            self._closing[evicted[-1][0]] = evicted[-1][1]
+            if partition is None:
+                # Evicted moments ago: its last records may still be in flight to disk.
+                closing.released.wait()
+                continue
+            if created:
+                try:
+                    partition.load()
+                except BaseException:
+                    with self._lock:
+                        if self._cache.get(key) is partition:
+                            del self._cache[key]
+                    partition.close()
+                    raise
+                finally:
+                    self._close_evicted(evicted)
+                return partition
+            partition.loaded.wait()
+            if partition.load_error is not None:
+                continue  # the loader raised it and dropped the partition; try the load again
+            return partition
+
+    def _close_evicted(self, evicted: List[Tuple[Tuple[str, str], _Partition]]) -> None:
+        for key, partition in evicted:
+            with partition.lock:
+                partition.close()
+            with self._lock:
+                if self._closing.get(key) is partition:
+                    del self._closing[key]
+
+    def get(self, user_id: str, session_id: str, key: str) -> Optional[str]:
+        return self._partition(user_id, session_id).values.get(key)
+
+    def items(self, user_id: str, session_id: str) -> Dict[str, str]:
+        return dict(self._partition(user_id, session_id).values)
+
+    def set(self, user_id: str, session_id: str, key: str, value: str) -> None:
+        while True:
+            partition = self._partition(user_id, session_id)
+            with partition.lock:
+                # The partition may have been evicted between lookup and lock; reopen it.
+                if not partition.closed:
+                    partition.set(key, value)
+                    return
+
+    def reset(self, user_id: str, session_id: str) -> None:
+        """Delete one partition (cache entry and files); other partitions are untouched."""
+        with self._lock:
+            partition = self._cache.pop((user_id, session_id), None)
+            closing = self._closing.get((user_id, session_id))
+        if partition is not None:
+            with partition.lock:
+                partition.close()
+        if closing is not None:
+            closing.released.wait()
+        path = self._path(user_id, session_id)
+        for file_path in [path, *sidecar_paths(path)]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
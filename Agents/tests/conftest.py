@@ -0,0 +1,6 @@
+"""Run from the Agents folder: python -m pytest tests"""
+import os
+import sys
+
+# The agent packages and common/ are imported the way adk api_server does, from the Agents folder.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+"""Bulk conversion (currency_converter/bulk.py) must agree with convert_currency row by row."""
+import json
+
+import numpy as np
+import pytest
+
+from currency_converter import agent
+from currency_converter.bulk import convert_rows, parse_conversion_rows, round_to_cents
+from currency_converter.rates import RateCache
+
+RATES = [("USD", "EUR", 0.92), ("USD", "JPY", 149.37), ("GBP", "USD", 1.2705), ("EUR", "CHF", 0.955)]
+
+ROWS = [
+    (1.005, "USD", "USD"),
+    (2.675, "USD", "USD"),
+    (-1.005, "USD", "USD"),
+    (0.125, "USD", "EUR"),
+    (10.01, "USD", "EUR"),
+    (1234.565, "USD", "JPY"),
+    (3.3, "GBP", "USD"),
+    (19.99, "EUR", "CHF"),
+    (100, "EUR", "USD"),
+    (0.5, "GBP", "EUR"),
+]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    rates = RateCache(path=None)
+    for from_currency, to_currency, rate in RATES:
+        rates.put(from_currency, to_currency, rate, source="test")
+    monkeypatch.setattr(agent, "rate_cache", rates)
+    return rates
+
+
+def _bulk_values(result):
+    lines = result["table"].splitlines()[1:]
+    return [float(line.rsplit(",", 1)[1]) for line in lines]
+
+
+def test_bulk_matches_single_row(cache):
+    bulk = _bulk_values(convert_rows(cache, ROWS))
+    single = [agent.convert_currency(None, *row)["converted_amount"] for row in ROWS]
+    assert bulk == single
+
+
+@pytest.mark.parametrize("amount, expected", [(1.005, 1.01), (2.675, 2.68), (-1.005, -1.01)])
+def test_half_cents_round_up(cache, amount, expected):
+    assert _bulk_values(convert_rows(cache, [(amount, "USD", "USD")])) == [expected]
+
+
+def test_totals_sum_rounded_rows(cache):
+    rows = [(1.005, "USD", "USD")] * 3
+    assert convert_rows(cache, rows)["totals"] == {"USD": 3.03}
+
+
+def test_random_rows_match_single_row(cache):
+    rng = np.random.default_rng(7)
+    pairs = [("USD", "EUR"), ("USD", "JPY"), ("GBP", "USD"), ("EUR", "CHF"), ("USD", "USD")]
+    rows = [
+        (round(float(rng.uniform(-5000, 5000)), int(rng.integers(0, 4))), *pairs[int(rng.integers(0, len(pairs)))])
+        for _ in range(3000)
+    ]
+    rows += [(cents / 1000, "USD", "USD") for cents in range(-2005, 2005, 5)]  # every half cent
+    single = [agent.convert_currency(None, *row)["converted_amount"] for row in rows]
+    rates = np.array([cache.get(row[1], row[2])["rate"] for row in rows])
+    assert round_to_cents(np.array([row[0] for row in rows]), rates).tolist() == single
+    result = convert_rows(cache, rows)
+    assert result["converted_rows"] == len(rows)
+    totals = {}
+    for (_, _, to_currency), value in zip(rows, single):
+        totals[to_currency] = totals.get(to_currency, 0.0) + value
+    assert result["totals"] == {code: round(total, 2) for code, total in totals.items()}
+
+
+@pytest.mark.parametrize("amount", ["inf", "-inf", "nan", "1e400", "1e14"])
+def test_non_finite_amounts_are_row_errors(cache, amount):
+    rows, errors = parse_conversion_rows(f"10,USD,EUR\n{amount},USD,EUR\n5,USD,EUR")
+    assert [row[0] for row in rows] == [10.0, 5.0]
+    assert len(errors) == 1 and errors[0].startswith("row 2:")
+    result = agent.convert_currency_bulk(None, json.dumps([[10, "USD", "EUR"], [amount, "USD", "EUR"]]))
+    assert result["converted_rows"] == 1
+    assert result["row_errors"][0].startswith("row 2:")
+
+
+@pytest.mark.parametrize("amount", [float("inf"), float("nan"), 1e400])
+def test_single_row_rejects_non_finite_amounts(cache, amount):
+    assert agent.convert_currency(None, amount, "USD", "EUR")["status"] == "error"
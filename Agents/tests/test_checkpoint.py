@@ -0,0 +1,68 @@
+"""Stage checkpoint scoping (common/checkpoint.py)."""
+from types import SimpleNamespace
+
+import pytest
+from google.adk.agents import LlmAgent, SequentialAgent
+from google.genai import types
+
+from common.checkpoint import StageCheckpointer
+
+
+def _pipeline():
+    return SequentialAgent(name="Pipeline", sub_agents=[
+        LlmAgent(name="Expand", model="gemini-2.0-flash", instruction="Expand the topic.", output_key="points"),
+    ])
+
+
+def _context(user, session, text="solar power"):
+    return SimpleNamespace(
+        session=SimpleNamespace(app_name="app", user_id=user, id=session),
+        user_content=types.Content(role="user", parts=[types.Part(text=text)]),
+        state={},
+    )
+
+
+def _run_stage(stage, context, output):
+    """Call the checkpoint callbacks the way ADK does; returns True if the stage was restored."""
+    restore, save = stage.before_agent_callback[0], stage.after_agent_callback[-1]
+    if restore(context) is not None:
+        return True
+    context.state[stage.output_key] = output
+    save(context)
+    return False
+
+
+@pytest.fixture
+def stage_for(tmp_path):
+    def build(scope):
+        pipeline = StageCheckpointer(str(tmp_path / f"{scope}.sqlite3"), scope=scope).install(_pipeline())
+        return pipeline.sub_agents[0]
+    return build
+
+
+def test_session_scope_only_resumes_the_same_session(stage_for):
+    stage = stage_for("session")
+    assert not _run_stage(stage, _context("alice", "s1"), "alice's points")
+    retry = _context("alice", "s1")
+    assert _run_stage(stage, retry, "unused")
+    assert retry.state["points"] == "alice's points"
+    assert not _run_stage(stage, _context("alice", "s2"), "new points")
+    assert not _run_stage(stage, _context("bob", "s1"), "bob's points")
+
+
+def test_user_scope_spans_sessions_but_not_users(stage_for):
+    stage = stage_for("user")
+    _run_stage(stage, _context("alice", "s1"), "alice's points")
+    assert _run_stage(stage, _context("alice", "s2"), "unused")
+    assert not _run_stage(stage, _context("bob", "s1"), "bob's points")
+
+
+def test_shared_scope_is_a_cross_user_cache(stage_for):
+    stage = stage_for("shared")
+    _run_stage(stage, _context("alice", "s1"), "alice's points")
+    assert _run_stage(stage, _context("bob", "s9"), "unused")
+
+
+def test_unknown_scope_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        StageCheckpointer(str(tmp_path / "c.sqlite3"), scope="global")
@@ -0,0 +1,59 @@
+"""Regression tests for my_agent/expressions.py."""
+import pytest
+
+from my_agent.agent import evaluate_expressions
+from my_agent.expressions import ExpressionError, evaluate
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("2**40 + 1", 1099511627777),
+    ("sum([999999999999, 1, 1])", 1000000000001),
+    ("product([1000003, 1000033])", 1000036000099),
+    ("2**52 + 1", 4503599627370497),
+    ("2**60 + 1", 1152921504606846977),
+    ("3**40 * 7 // 2 - 5 % 3", 42551829106699250801),
+])
+def test_large_integers_are_exact(expression, expected):
+    result = evaluate(expression)
+    assert result == expected
+    assert isinstance(result, int)
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("12345678901.23", 12345678901.23),
+    ("1234567.891234567", 1234567.891234567),
+    ("1/3", 1 / 3),
+])
+def test_more_than_12_significant_digits_are_kept(expression, expected):
+    assert evaluate(expression) == expected
+
+
+def test_float_noise_is_stripped():
+    assert evaluate("0.1 + 0.2") == 0.3
+    assert evaluate("[10, 20] * 1.1") == [11, 22]
+
+
+@pytest.mark.parametrize("expression", ["10**309", "(10**300)**1000", "7 // 0"])
+def test_integer_overflow_and_division_by_zero_raise_expression_error(expression):
+    with pytest.raises(ExpressionError):
+        evaluate(expression)
+
+
+@pytest.mark.parametrize("expression", ["mean([])", "min([])", "max([])", "max([1], [])"])
+def test_empty_reductions_raise_expression_error(expression, recwarn):
+    with pytest.raises(ExpressionError, match="empty list"):
+        evaluate(expression)
+    assert not recwarn.list
+
+
+@pytest.mark.parametrize("expression", ["round(1, 1e400)", "round(1, 10**300)", "round(1, 0.5)"])
+def test_bad_round_digits_raise_expression_error(expression):
+    with pytest.raises(ExpressionError):
+        evaluate(expression)
+
+
+def test_one_bad_expression_does_not_fail_the_batch():
+    response = evaluate_expressions(["1 + 1", "round(1, 1e400)"])
+    assert response["status"] == "partial"
+    assert response["results"][0]["result"] == 2
+    assert "error" in response["results"][1]
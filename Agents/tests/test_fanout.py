@@ -0,0 +1,41 @@
+"""Topic resolution and researcher construction of parallel_workflow/fanout.py."""
+import asyncio
+from types import SimpleNamespace
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.genai import types
+
+from parallel_workflow.fanout import FanOutResearch, parse_topics
+
+
+def _fanout(**kwargs):
+    return FanOutResearch(name="Fanout", model="gemini-2.0-flash", topics=["default"], **kwargs)
+
+
+def _ctx(state=None, text=None):
+    content = types.Content(role="user", parts=[types.Part(text=text)]) if text else None
+    return SimpleNamespace(session=SimpleNamespace(state=state or {}), user_content=content)
+
+
+def test_topics_with_the_same_slug_run_once():
+    assert parse_topics("AI, ai, A.I., solar power, Solar-Power") == ["AI", "A.I.", "solar power"]
+
+
+def test_topic_count_is_capped():
+    fanout = _fanout(max_topics=3)
+    topics, dropped = fanout.resolve_topics(_ctx(text="Topics: " + ", ".join(f"topic {n}" for n in range(10))))
+    assert topics == ["topic 0", "topic 1", "topic 2"]
+    assert dropped == [f"topic {n}" for n in range(3, 10)]
+
+
+def test_defaults_when_no_topics_are_given():
+    assert _fanout().resolve_topics(_ctx()) == (["default"], [])
+
+
+def test_braces_in_a_topic_are_not_state_templates():
+    researcher = _fanout().researcher_for("{user:email} and {missing_key}")
+    context = ReadonlyContext(SimpleNamespace(session=SimpleNamespace(state={"user:email": "secret@example.com"})))
+    instruction, bypass_state_injection = asyncio.run(researcher.canonical_instruction(context))
+    assert bypass_state_injection
+    assert "{user:email} and {missing_key}" in instruction
+    assert "secret@example.com" not in instruction
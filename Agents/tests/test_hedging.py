@@ -0,0 +1,52 @@
+"""Hedged requests (common/hedging.py): the losing attempt is cancelled, not left running."""
+import asyncio
+from typing import List
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+from common.hedging import HedgedLlm
+
+
+class DelayedLlm(BaseLlm):
+    """Answers after the next scripted delay; records attempts that were cancelled."""
+
+    delays: List[float] = []
+    cancelled: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        try:
+            await asyncio.sleep(self.delays.pop(0))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="ok")]))
+
+
+def _request():
+    return LlmRequest(model="fake", contents=[types.Content(role="user", parts=[types.Part(text="hi")])])
+
+
+async def _call(model):
+    return [response async for response in model.generate_content_async(_request())]
+
+
+def test_outrun_first_attempt_is_cancelled_and_censored():
+    async def scenario():
+        inner = DelayedLlm(model="fake", delays=[0.01] * 20 + [5.0, 0.01])
+        model = HedgedLlm.wrap(inner, min_samples=20, budget=1.0)
+        for _ in range(20):
+            await _call(model)
+        assert model.hedge_delay() is not None
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert len(await _call(model)) == 1
+        assert loop.time() - start < 1.0
+        await asyncio.sleep(0)  # let the cancellation reach the slow attempt
+        return inner, model.stats()
+
+    inner, stats = asyncio.run(scenario())
+    assert inner.cancelled == 1
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    assert stats["censored"] == 1
@@ -0,0 +1,42 @@
+"""Loop workflow (loop_workflow/agent.py): convergence is caught before the critic runs again."""
+import asyncio
+from typing import List
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from loop_workflow import agent as loop_module
+
+
+class ScriptedLlm(BaseLlm):
+    """Always answers `text`; counts its calls."""
+
+    text: str
+    calls: List[int] = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls.append(1)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.text)]))
+
+
+def test_converged_rewrite_stops_without_another_critique(monkeypatch):
+    draft = "Coral reefs are marine ecosystems built by corals."
+    critic = ScriptedLlm(model="fake", text="- Mention why reefs matter.")
+    monkeypatch.setattr(loop_module.initial_writer, "model", ScriptedLlm(model="fake", text=draft))
+    monkeypatch.setattr(loop_module.critic, "model", critic)
+    monkeypatch.setattr(loop_module.document_refiner, "model", ScriptedLlm(model="fake", text=draft))
+    runner = InMemoryRunner(agent=loop_module.root_agent, app_name="loop_workflow")
+
+    async def scenario():
+        session = await runner.session_service.create_session(app_name="loop_workflow", user_id="u")
+        message = types.Content(role="user", parts=[types.Part(text="coral reefs")])
+        async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+            pass
+        return await runner.session_service.get_session(app_name="loop_workflow", user_id="u", session_id=session.id)
+
+    state = asyncio.run(scenario()).state
+    assert state["loop_stop_reason"] == "converged"
+    assert len(critic.calls) == 1
+    assert [entry["decision"] for entry in state["loop_log"]] == ["converged"]
+    assert state["loop_critic_calls_saved"] == loop_module.refinement_loop.max_iterations - 1
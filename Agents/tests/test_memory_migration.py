@@ -0,0 +1,19 @@
+"""SQLite memory backend import of the legacy TinyDB file (memory_demo/storage.py)."""
+import os
+
+from memory_demo.storage import SQLiteMemoryBackend, TinyDBMemoryBackend
+
+
+def test_migration_replays_the_append_log(tmp_path):
+    legacy = str(tmp_path / "memory_store.db")
+    tinydb = TinyDBMemoryBackend(legacy)
+    tinydb.upsert({"key": "k1", "content": "likes tea", "category": "food",
+                   "timestamp": "2026-01-01T00:00:00", "user_id": "u"}, embedding=b"\x01\x02")
+    tinydb.close()
+    # The write only lives in the sidecar log until the next compaction.
+    assert not os.path.exists(legacy) and os.path.exists(legacy + ".log")
+
+    backend = SQLiteMemoryBackend(str(tmp_path / "memories.sqlite3"), legacy_tinydb_path=legacy)
+    assert backend.get("k1")["content"] == "likes tea"
+    assert dict(backend.embeddings()) == {"k1": b"\x01\x02"}
+    backend.close()
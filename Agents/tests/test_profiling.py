@@ -0,0 +1,23 @@
+"""Profiler (common/profiling.py): who may request a profile, and how many are kept."""
+import os
+
+from common.profiling import Profiler
+
+
+def test_token_is_required_when_set():
+    profiler = Profiler(token="s3cret")
+    assert not profiler._requested(True)
+    assert not profiler._requested("true")
+    assert profiler._requested("s3cret")
+    assert Profiler(token="")._requested("true")
+
+
+def test_only_newest_profiles_are_kept(tmp_path):
+    for day in range(1, 5):
+        for suffix in (".collapsed", ".alloc.txt"):
+            (tmp_path / f"2026010{day}-120000-app-inv{day}{suffix}").write_text("")
+    Profiler(directory=str(tmp_path), max_files=2)._prune()
+    assert sorted(os.listdir(tmp_path)) == [
+        "20260103-120000-app-inv3.alloc.txt", "20260103-120000-app-inv3.collapsed",
+        "20260104-120000-app-inv4.alloc.txt", "20260104-120000-app-inv4.collapsed",
+    ]
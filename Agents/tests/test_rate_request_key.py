@@ -0,0 +1,30 @@
+"""Single-flight keys for currency_fetcher_agent requests (currency_converter/agent.py)."""
+import pytest
+
+from common.single_flight import default_key
+from currency_converter.agent import rate_request_key
+
+
+@pytest.mark.parametrize("request_text, expected", [
+    ("USD to EUR", "USD/EUR"),
+    ("What is the USD to EUR rate today?", "USD/EUR"),
+    ("GET THE USD to EUR rate", "USD/EUR"),
+    ("USD/EUR, then USD again", "USD/EUR"),
+])
+def test_one_pair_gets_a_pair_key(request_text, expected):
+    assert rate_request_key({"request": request_text}) == expected
+
+
+@pytest.mark.parametrize("request_text", [
+    "USD to EUR and GBP",
+    "GET THE rate for USD",
+    "usd to eur",
+    "",
+])
+def test_anything_else_uses_the_request_text(request_text):
+    args = {"request": request_text}
+    assert rate_request_key(args) == default_key(args)
+
+
+def test_extra_currency_does_not_collide_with_the_pair():
+    assert rate_request_key({"request": "USD to EUR and GBP"}) != rate_request_key({"request": "USD to EUR"})
@@ -0,0 +1,77 @@
+"""GuardedLlm retry and circuit-breaker policy (common/resilience.py)."""
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+from common.resilience import GuardedLlm, ModelGuard
+
+
+class UpstreamError(Exception):
+    def __init__(self, code, retry_after=None):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+        self.response = SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+
+
+class ScriptedLlm(BaseLlm):
+    """Raises the scripted errors in order, then answers."""
+
+    errors: List[Exception] = []
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="ok")]))
+
+
+def _guard(**kwargs):
+    options = dict(requests_per_minute=1_000_000, attempts=4, base_delay=0.01, max_delay=0.05,
+                   failure_threshold=2, reset_seconds=60)
+    options.update(kwargs)
+    return ModelGuard(**options)
+
+
+def _call(model):
+    async def run():
+        request = LlmRequest(model=model.model, contents=[types.Content(role="user", parts=[types.Part(text="hi")])])
+        return [response async for response in model.generate_content_async(request)]
+    return asyncio.run(run())
+
+
+def test_429s_are_retried_without_opening_the_breaker():
+    guard = _guard()
+    inner = ScriptedLlm(model="fake", errors=[UpstreamError(429), UpstreamError(429), UpstreamError(429)])
+    assert len(_call(GuardedLlm(model="fake", inner=inner, guard=guard))) == 1
+    stats = guard.stats()
+    assert inner.calls == 4
+    assert stats["rate_limited"] == 3
+    assert stats["failures"] == 0
+    assert stats["circuit"] == "closed"
+
+
+def test_429_honors_retry_after():
+    guard = _guard()
+    inner = ScriptedLlm(model="fake", errors=[UpstreamError(429, retry_after="0.3")])
+    start = time.perf_counter()
+    _call(GuardedLlm(model="fake", inner=inner, guard=guard))
+    assert time.perf_counter() - start >= 0.3
+    assert guard.stats()["backoff_s"] >= 0.3
+
+
+def test_5xx_and_timeouts_open_the_breaker():
+    guard = _guard(attempts=1)
+    model = GuardedLlm(model="fake", inner=ScriptedLlm(model="fake"), guard=guard)
+    for error in (UpstreamError(503), asyncio.TimeoutError()):
+        model.inner.errors = [error]
+        with pytest.raises(type(error)):
+            _call(model)
+    assert guard.stats()["failures"] == 2
+    assert guard.stats()["circuit"] == "open"
@@ -0,0 +1,91 @@
+"""Partitioned state store of session_demo (session_demo/state_store.py)."""
+import threading
+import time
+
+from session_demo import state_store as store_module
+from session_demo.state_store import ShardedStateStore
+
+
+def test_evicted_partitions_keep_their_values(tmp_path):
+    store = ShardedStateStore(str(tmp_path), max_cached_partitions=2)
+    for user in range(6):
+        store.set(f"user{user}", "s1", "color", f"color{user}")
+    assert {store.get(f"user{user}", "s1", "color") for user in range(6)} == {f"color{user}" for user in range(6)}
+    assert store.misses > 6
+
+
+def test_concurrent_writers_with_a_tiny_cache(tmp_path):
+    store = ShardedStateStore(str(tmp_path), max_cached_partitions=2)
+
+    def writer(user):
+        for round_number in range(20):
+            store.set(f"user{user}", "s1", "round", str(round_number))
+
+    threads = [threading.Thread(target=writer, args=(user,)) for user in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(store.get(f"user{user}", "s1", "round") == "19" for user in range(8))
+
+
+def test_closing_an_evicted_partition_does_not_block_other_sessions(tmp_path, monkeypatch):
+    store = ShardedStateStore(str(tmp_path), max_cached_partitions=2)
+    store.set("alice", "s1", "color", "blue")
+    store.set("bob", "s1", "color", "green")
+
+    close = store_module._Partition.close
+    closing = threading.Event()
+
+    def slow_close(partition):
+        closing.set()
+        time.sleep(0.5)
+        close(partition)
+
+    monkeypatch.setattr(store_module._Partition, "close", slow_close)
+    evictor = threading.Thread(target=store.set, args=("carol", "s1", "color", "red"))  # evicts alice
+    evictor.start()
+    assert closing.wait(1)
+    start = time.perf_counter()
+    assert store.get("bob", "s1", "color") == "green"
+    assert time.perf_counter() - start < 0.25
+    evictor.join()
+    assert store.get("carol", "s1", "color") == "red"
+    assert store.get("alice", "s1", "color") == "blue"
+
+
+def test_loading_a_cold_partition_does_not_block_other_sessions(tmp_path, monkeypatch):
+    store = ShardedStateStore(str(tmp_path), max_cached_partitions=4)
+    store.set("alice", "s1", "color", "blue")
+    store.set("bob", "s1", "color", "green")
+    store._cache.pop(("alice", "s1")).close()  # cold again, file on disk
+
+    load = store_module._Partition.load
+    loading = threading.Event()
+
+    def slow_load(partition):
+        loading.set()
+        time.sleep(0.5)
+        load(partition)
+
+    monkeypatch.setattr(store_module._Partition, "load", slow_load)
+    readers = [threading.Thread(target=store.get, args=("alice", "s1", "color")) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    assert loading.wait(1)
+    start = time.perf_counter()
+    assert store.get("bob", "s1", "color") == "green"
+    assert time.perf_counter() - start < 0.25
+    for reader in readers:
+        reader.join()
+    assert store.get("alice", "s1", "color") == "blue"
+    assert store.misses == 3  # alice, bob, then alice once more for all three readers
+
+
+def test_partitions_share_one_flush_thread(tmp_path):
+    store = ShardedStateStore(str(tmp_path), max_cached_partitions=16)
+    for user in range(8):
+        store.set(f"user{user}", "s1", "color", "blue")
+    names = [thread.name for thread in threading.enumerate()]
+    assert not [name for name in names if name.startswith("log-flush:s1-")]
+    assert "state-store-flush" in names
@@ -0,0 +1,60 @@
+"""Storage executor (common/storage_executor.py): write ordering and reads during group commits."""
+import asyncio
+import threading
+import time
+
+from tinydb import TinyDB
+
+from common.log_storage import AppendLogStorage
+from common.storage_executor import StorageExecutor
+
+
+def test_writes_run_one_at_a_time_in_arrival_order():
+    executor = StorageExecutor(max_readers=4)
+    applied, running, overlaps = [], [], []
+    lock = threading.Lock()
+
+    def write(index):
+        with lock:
+            running.append(index)
+            if len(running) > 1:
+                overlaps.append(list(running))
+        time.sleep(0.005 if index % 2 else 0.0)  # odd writes are slower
+        with lock:
+            applied.append(index)
+            running.remove(index)
+
+    async def scenario():
+        await asyncio.gather(*(executor.write(write, index) for index in range(20)))
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert applied == list(range(20))
+    assert overlaps == []
+
+
+def test_reads_are_not_blocked_by_a_pending_group_commit(tmp_path):
+    executor = StorageExecutor(max_readers=2)
+    db = TinyDB(str(tmp_path / "store.db"), storage=AppendLogStorage, commit_window_ms=500)
+    table = db.table("items", cache_size=0)
+    table.insert({"key": "existing"})
+
+    async def scenario():
+        write = asyncio.create_task(executor.write(table.insert, {"key": "new"}))
+        await asyncio.sleep(0.05)  # applied by the writer; now waiting for the fsync
+        assert not write.done()
+        start = time.perf_counter()
+        keys = await executor.read(lambda: sorted(doc["key"] for doc in table.all()))
+        read_seconds = time.perf_counter() - start
+        await write
+        return keys, read_seconds
+
+    try:
+        keys, read_seconds = asyncio.run(scenario())
+    finally:
+        db.close()
+        executor.shutdown()
+    assert keys == ["existing", "new"]
+    assert read_seconds < 0.25
@@ -0,0 +1,100 @@
+"""Tracing plugin (common/tracing.py): spans nest per run and export as OTLP/JSON."""
+import asyncio
+import json
+
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from common.tracing import Tracer, _PayloadSizes, otlp_json
+
+
+class ScriptedLlm(BaseLlm):
+    """Calls `lookup` once, then answers with text."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if llm_request.contents[-1].parts[0].function_response is None:
+            part = types.Part(function_call=types.FunctionCall(name="lookup", args={"key": "a"}))
+        else:
+            part = types.Part(text="done")
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=7, candidates_token_count=2),
+        )
+
+
+def lookup(key: str) -> dict:
+    """Looks up a key."""
+    return {"key": key, "value": 1}
+
+
+class Captured:
+    """Stands in for the processing thread: keeps the finished traces."""
+
+    def __init__(self):
+        self.traces = []
+
+    def submit(self, trace):
+        self.traces.append(trace)
+
+
+def _run(tracer):
+    agent = LlmAgent(name="root", model=ScriptedLlm(model="fake"), tools=[lookup])
+    runner = InMemoryRunner(app=tracer.app("tracing_test", agent))
+
+    async def scenario():
+        session = await runner.session_service.create_session(app_name="tracing_test", user_id="u")
+        message = types.Content(role="user", parts=[types.Part(text="hi")])
+        async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_run_becomes_one_nested_trace():
+    tracer = Tracer(export_dir="", metrics_port="")
+    tracer._processor = Captured()
+    _run(tracer)
+
+    [trace] = tracer._processor.traces
+    assert tracer.open_spans() == 0
+    kinds = [(span.kind, span.name, span.parent.kind if span.parent else None) for span in trace.spans]
+    assert kinds[0] == ("invocation", "tracing_test", None)
+    assert ("agent", "root", "invocation") in kinds
+    assert kinds.count(("model", "fake", "agent")) == 2
+    assert ("tool", "lookup", "agent") in kinds
+
+    tracer.process(trace)
+    model = [span for span in trace.spans if span.kind == "model"]
+    tool = next(span for span in trace.spans if span.kind == "tool")
+    assert model[0].input_tokens == 7 and model[0].response_bytes > 0
+    # The second call's request carries the first call's contents plus the tool exchange.
+    assert model[1].request_bytes > model[0].request_bytes
+    assert tool.request_bytes == len('{"key":"a"}')
+    assert "adk_traces_total 1" in tracer.metrics.render()
+
+
+def test_otlp_line_is_json_with_linked_parents():
+    tracer = Tracer(export_dir="", metrics_port="")
+    tracer._processor = Captured()
+    _run(tracer)
+    [trace] = tracer._processor.traces
+    tracer.process(trace)
+
+    document = json.loads(otlp_json(trace))
+    spans = document["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ids = {span["spanId"] for span in spans}
+    assert len(spans) == len(trace.spans) == len(ids)
+    assert {span["traceId"] for span in spans} == {spans[0]["traceId"]}
+    assert all(span["parentSpanId"] in ids for span in spans[1:])
+    assert all(int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"]) for span in spans)
+
+
+def test_tool_result_echoed_in_next_request_is_sized_once():
+    sizes = _PayloadSizes()
+    result = {"key": "a", "value": 1}
+    size = sizes.tool_result("lookup", result)
+    echoed, other = dict(result), {"other": True}  # held, as a trace holds its payloads
+    assert sizes.function_response("lookup", echoed) == size
+    assert sizes.function_response("lookup", other) == len('{"other":true}')
@@ -0,0 +1,80 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+const ADK_SERVER = process.env.ADK_SERVER_URL || 'http://127.0.0.1:8080';
+
+type Params = {
+  app: string;
+  user: string;
+  session: string;
+  name: string;
+  version: string;
+};
+
+// The MIME type comes from whatever a tool (e.g. an MCP server) stored, so only
+// raster images and plain text are served inline. Anything else (HTML, SVG,
+// scripts, ...) would run on this origin, so it is served as a download.
+const INLINE_TYPES = new Set([
+  'image/png',
+  'image/jpeg',
+  'image/gif',
+  'image/webp',
+  'image/avif',
+  'image/bmp',
+  'text/plain',
+]);
+
+function downloadName(name: string): string {
+  return name.replace(/[^\w.-]/g, '_') || 'artifact';
+}
+
+// Serves a tool-result artifact (Agents/common/artifacts.py references) as raw
+// bytes, so the chat can use the URL directly as an <img> src.
+export async function GET(
+  request: NextRequest,
+  context: { params: Promise<Params> }
+) {
+  const { app, user, session, name, version } = await context.params;
+  const path = [app, 'users', user, 'sessions', session, 'artifacts', name, 'versions', version]
+    .map(encodeURIComponent)
+    .join('/');
+
+  try {
+    const response = await fetch(`${ADK_SERVER}/apps/${path}`);
+    if (!response.ok) {
+      return NextResponse.json({ error: 'Artifact not found' }, { status: response.status });
+    }
+    // ADK returns the stored Part: {"inlineData": {"mimeType", "data" (base64url)}} or {"text"}
+    const part = await response.json();
+    const inline = part?.inlineData ?? part?.inline_data;
+    let body: Buffer;
+    let mimeType: string;
+    if (inline?.data) {
+      body = Buffer.from(String(inline.data), 'base64');  // accepts base64 and base64url
+      mimeType = inline.mimeType ?? inline.mime_type ?? 'application/octet-stream';
+    } else if (typeof part?.text === 'string') {
+      body = Buffer.from(part.text, 'utf-8');
+      mimeType = 'text/plain; charset=utf-8';
+    } else {
+      return NextResponse.json({ error: 'Artifact has no data' }, { status: 404 });
+    }
+
+    const essence = mimeType.split(';')[0].trim().toLowerCase();
+    const headers: Record<string, string> = {
+      // A saved artifact version never changes
+      'Cache-Control': 'private, max-age=86400, immutable',
+      'X-Content-Type-Options': 'nosniff',
+      'Content-Security-Policy': 'sandbox',
+    };
+    if (INLINE_TYPES.has(essence)) {
+      headers['Content-Type'] = essence === 'text/plain' ? 'text/plain; charset=utf-8' : essence;
+    } else {
+      headers['Content-Type'] = /^[\w.+-]+\/[\w.+-]+$/.test(essence) ? essence : 'application/octet-stream';
+      headers['Content-Disposition'] = `attachment; filename="${downloadName(name)}"`;
+    }
+
+    return new Response(new Uint8Array(body), { headers });
+  } catch (error) {
+    console.error('Error fetching artifact:', error);
+    return NextResponse.json({ error: 'Failed to fetch artifact' }, { status: 500 });
+  }
+}
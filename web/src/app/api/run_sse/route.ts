@@ -5,7 +5,7 @@ const ADK_SERVER = process.env.ADK_SERVER_URL || 'http://127.0.0.1:8080';
 export async function POST(request: NextRequest) {
   try {
     const body = await request.json();
-    
+
     const response = await fetch(`${ADK_SERVER}/run_sse`, {
       method: 'POST',
       headers: {
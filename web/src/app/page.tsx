@@ -24,6 +24,20 @@ interface Message {
   groundingMetadata?: GroundingMetadata;
 }
 
+// Tool results offloaded to the artifact service (Agents/common/artifacts.py) arrive as
+// {type: 'artifact', url: '/apps/.../artifacts/<name>/versions/<n>', mime_type, ...};
+// the /api proxy route serves the stored bytes at that URL.
+function renderArtifact(item: any): string {
+  if (typeof item?.url !== 'string' || !item.url.startsWith('/apps/')) return '';
+  const src = `${API_BASE}${item.url}`;
+  if (String(item.mime_type || '').startsWith('image/')) {
+    return `<img src="${src}" alt="Generated image" style="max-width: 200px; max-height: 200px; border-radius: 8px; margin: 8px 0;" />`;
+  }
+  const label = item.artifact || 'artifact';
+  const size = typeof item.size_bytes === 'number' ? ` (${Math.ceil(item.size_bytes / 1024)} KB)` : '';
+  return `\n[${label}${size}](${src})\n`;
+}
+
 export default function ChatPage() {
   const [agents, setAgents] = useState<string[]>([]);
   const [selectedAgent, setSelectedAgent] = useState('');
@@ -355,7 +369,9 @@ export default function ChatPage() {
               if (p.type === 'image') return true;
               // functionResponse may carry nested content with images
               if (p.functionResponse && Array.isArray(p.functionResponse.response?.content)) {
-                return p.functionResponse.response.content.some((inner: any) => inner?.type === 'image');
+                return p.functionResponse.response.content.some(
+                  (inner: any) => inner?.type === 'image' || inner?.type === 'artifact'
+                );
               }
               return false;
             });
@@ -382,6 +398,7 @@ export default function ChatPage() {
                       const payload = String(inner.data).replace(/\s+/g, '');
                       return `<img src="data:${inner.mimeType};base64,${payload}" alt="Generated image" style="max-width: 200px; max-height: 200px; border-radius: 8px; margin: 8px 0;" />`;
                     }
+                    if (inner.type === 'artifact') return renderArtifact(inner);
                     return '';
                   }).join('');
                 }
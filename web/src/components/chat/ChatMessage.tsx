@@ -130,7 +130,8 @@ export function ChatMessage({ msg }: ChatMessageProps) {
               // Check for embedded data URL images
               if (text.includes('<img')) {
                 const nodes: React.ReactNode[] = [];
-                const imgRegex = /<img\s+[^>]*src=(?:"|')data:([^;]+);base64,([^"']+)(?:"|')[^>]*>/g;
+                // data: URLs, or artifact URLs served by the /api/apps/.../artifacts proxy route
+                const imgRegex = /<img\s+[^>]*src=(?:"|')(?:data:([^;]+);base64,([^"']+)|(\/api\/apps\/[^"']+\/artifacts\/[^"']+))(?:"|')[^>]*>/g;
                 let lastIndex = 0;
                 let match: RegExpExecArray | null;
 
@@ -169,7 +170,7 @@ export function ChatMessage({ msg }: ChatMessageProps) {
                   const mime = match[1] || 'image/png';
                   // Remove any whitespace/newlines that could corrupt the data URL
                   const rawBase64 = (match[2] || '').replace(/\s+/g, '');
-                  const src = `data:${mime};base64,${rawBase64}`;
+                  const src = match[3] || `data:${mime};base64,${rawBase64}`;
 
                   nodes.push(
                     <img